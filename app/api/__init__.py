@@ -2,7 +2,14 @@ from .cities.router import router as cities_router
 from .stores.router import router as stores_router
 from .products.router import router as products_router
 from .sales.router import router as sales_router
+from .internal.router import router as internal_router
 
 __all__ = ("routers")
 
-routers = (cities_router, products_router, stores_router, sales_router)
+routers = (
+    cities_router,
+    products_router,
+    stores_router,
+    sales_router,
+    internal_router,
+)
@@ -1,6 +1,13 @@
 from .models import City
-from app.utils.repository import BaseRepository
+from app.api.stores.models import Store
+from app.db.snapshots import TableSnapshot
+from app.utils.repository import UniqueNamedRepository
 
 
-class CityRepository(BaseRepository):
+class CityRepository(UniqueNamedRepository):
     model = City
+    versioned = True
+    snapshot = TableSnapshot(City)
+
+    # stores of city are deleted by cascade
+    cascade_tables = (Store.__tablename__,)
@@ -1,39 +1,71 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
 from .schemas import CitySchema, CitySchemaCreate, CitySchemaUpdatePartial
+from .models import City
 from .repository import CityRepository
+from app.config import settings
 from app.db.database import database
+from app.utils.bulk_import import (
+    IMPORT_FORMAT,
+    IMPORT_ON_CONFLICT,
+    import_file,
+    spool_chunks,
+)
+from app.utils.etag import etag_dependency
 from app.utils.exceptions import (
     DBIntegrityException,
+    InvalidFileException,
+    InvalidParameterException,
     NotFoundException,
     get_http_exceptions_description,
 )
-from app.utils.shemas import CreateResultSchema
+from app.utils.pagination import PAGINATION_LIMIT
+from app.utils.serialization import serialized_response
+from app.utils.shemas import (
+    CreateResultSchema,
+    ImportResultSchema,
+    PageSchema,
+)
 
 
 router = APIRouter(
     prefix="/cities",
     tags=["Города"],
-    dependencies=[Depends(database.session_dependency)],
 )
 
 
-@router.get("")
+@router.get(
+    "",
+    dependencies=[Depends(etag_dependency(City.__tablename__))],
+    responses=get_http_exceptions_description(InvalidParameterException),
+)
+@serialized_response()
 async def get_cities(
-    session: AsyncSession = Depends(database.session_dependency),
-) -> list[CitySchema]:
-    return await CityRepository.get_objects(session=session)
+    session: AsyncSession = Depends(database.read_session_dependency),
+    limit: PAGINATION_LIMIT = settings.PAGINATION_DEFAULT_LIMIT,
+    after: str | None = None,
+) -> PageSchema[CitySchema]:
+    return await CityRepository.get_page(
+        session=session,
+        limit=limit,
+        after=after,
+        cached=True,
+    )
 
 
 @router.get(
     "/{city_id}",
+    dependencies=[Depends(etag_dependency(City.__tablename__))],
     responses=get_http_exceptions_description(NotFoundException),
 )
 async def get_city(
-    city_id: int, session: AsyncSession = Depends(database.session_dependency)
+    city_id: int,
+    session: AsyncSession = Depends(database.read_session_dependency),
 ) -> CitySchema:
-    return await CityRepository.get_object(session=session, object_id=city_id)
+    return await CityRepository.get_object(
+        session=session, object_id=city_id, cached=True
+    )
 
 
 @router.post(
@@ -50,6 +82,27 @@ async def create_city(
     return CreateResultSchema(id=city_id)
 
 
+@router.post(
+    "/import",
+    responses=get_http_exceptions_description(InvalidFileException),
+)
+async def import_cities(
+    request: Request,
+    session: AsyncSession = Depends(database.session_dependency),
+    format: IMPORT_FORMAT = "csv",
+    on_conflict: IMPORT_ON_CONFLICT = "reject",
+) -> ImportResultSchema:
+    with await spool_chunks(request.stream()) as file:
+        return await import_file(
+            session=session,
+            repository=CityRepository,
+            file=file,
+            format=format,
+            schema=CitySchemaCreate,
+            on_conflict=on_conflict,
+        )
+
+
 @router.patch(
     "/{city_id}",
     responses=get_http_exceptions_description(
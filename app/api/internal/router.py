@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+
+from .schemas import PoolsSchema, QueryCacheSchema
+from app.api.sales.repository import SaleRepository
+from app.db.database import database
+
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Служебные"],
+)
+
+
+@router.get("/pool")
+async def get_pool() -> PoolsSchema:
+    return PoolsSchema(
+        primary=database.engine.pool.get_status(),
+        replicas=[
+            engine.pool.get_status() for engine in database.replica_engines
+        ],
+    )
+
+
+@router.get("/query-cache")
+async def get_query_cache() -> QueryCacheSchema:
+    return QueryCacheSchema(**SaleRepository.get_query_cache_info())
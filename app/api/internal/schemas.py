@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+
+
+class PoolSchema(BaseModel):
+    pool: str
+    # size is unknown for pools, which open connection on every checkout
+    size: int | None
+    checked_out: int
+    overflow: int
+    checkouts: int
+    max_checked_out: int
+    timeouts: int
+    wait_seconds: float
+    max_wait_seconds: float
+    overflow_checkouts: int
+    max_overflow: int
+    connects: int
+    disconnects: int
+    invalidations: int
+
+
+class PoolsSchema(BaseModel):
+    primary: PoolSchema
+    replicas: list[PoolSchema]
+
+
+class QueryCacheSchema(BaseModel):
+    hits: int
+    misses: int
+    size: int
@@ -1,21 +1,131 @@
+from typing import Any
+
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import Product
-from app.utils.repository import BaseRepository
+from .schemas import ProductSchemaCreate
+from app.db.snapshots import TableSnapshot
+from app.utils.exceptions import NotFoundException
+from app.utils.repository import (
+    UniqueNamedRepository,
+    inserted_column,
+    select_rows,
+)
 
 
-class ProductRepository(BaseRepository):
+class ProductRepository(UniqueNamedRepository):
     model = Product
+    versioned = True
+    snapshot = TableSnapshot(Product)
 
     @classmethod
     async def get_products_by_ids(
-        cls, *, session: AsyncSession, ids: list[int]
+        cls, *, session: AsyncSession, ids: list[int], cached: bool = False
     ) -> list[Product]:
         if not ids:
             return []
 
+        products = []
+        if cached:
+            snapshot_products = await cls.get_snapshot_objects(
+                session=session
+            )
+            if snapshot_products is not None:
+                products = [
+                    snapshot_products[product_id]
+                    for product_id in ids
+                    if product_id in snapshot_products
+                ]
+                # products can be created after the snapshot was loaded,
+                # so missing ones are selected from the database
+                ids = [
+                    product_id for product_id in ids
+                    if product_id not in snapshot_products
+                ]
+                if not ids:
+                    return products
+
         query = select(Product).filter(Product.id.in_(ids))
         result: Result = await session.execute(query)
-        return result.scalars().all()
+        return [*products, *result.scalars().all()]
+
+    @classmethod
+    async def upsert_prices(
+        cls,
+        *,
+        session: AsyncSession,
+        data: list[ProductSchemaCreate],
+        chunk_size: int,
+    ) -> dict[str, Any]:
+        """
+        Insert products or update prices of products with the same names,
+        by one statement per chunk. Of repeated names the last price is
+        used. Return counts of inserted, updated and unchanged products.
+        """
+        prices = {
+            product_data.name: product_data.price for product_data in data
+        }
+        # sorted, so concurrent upserts lock products in the same order
+        rows = [
+            {"name": name, "price": price}
+            for name, price in sorted(prices.items())
+        ]
+
+        inserted_count = updated_count = 0
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            query = insert(Product).from_select(
+                ("name", "price"),
+                select_rows(Product.__table__, ("name", "price"), chunk),
+            )
+            # unchanged products are not updated, to not write new versions
+            # of rows, which are the most of a daily price list
+            query = query.on_conflict_do_update(
+                index_elements=[Product.name],
+                set_={"price": query.excluded.price},
+                where=Product.price != query.excluded.price,
+            ).returning(inserted_column)
+            result: Result = await session.execute(query)
+            merged = result.scalars().all()
+            inserted_count += sum(merged)
+            updated_count += len(merged) - sum(merged)
+
+        versions = {}
+        if inserted_count or updated_count:
+            versions = await cls.bump_versions(session=session)
+        await session.commit()
+        cls.set_committed_versions(session=session, versions=versions)
+
+        return {
+            "inserted": inserted_count,
+            "updated": updated_count,
+            "unchanged": len(rows) - inserted_count - updated_count,
+        }
+
+    @classmethod
+    async def delete_object(
+        cls, *, session: AsyncSession, object_id: int
+    ) -> Product:
+        # import here to avoid circular import with sales repository
+        from app.api.sales.repository import SaleRepository
+
+        # product is locked first: sales lines are added with a key share
+        # lock of theirs product, so lines added before are committed
+        # and no lines are added until the product is deleted
+        result: Result = await session.execute(
+            select(Product.id).filter_by(id=object_id).with_for_update()
+        )
+        if result.scalar_one_or_none() is None:
+            raise NotFoundException
+
+        # sales lines of product are deleted by cascade,
+        # so totals of theirs sales must be decreased
+        await SaleRepository.delete_product_from_sales(
+            session=session, product_id=object_id
+        )
+        return await super().delete_object(
+            session=session, object_id=object_id
+        )
@@ -1,45 +1,77 @@
+from typing import Annotated
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Request
 
 from .schemas import (
+    ProductBulkResultSchema,
     ProductSchema,
     ProductSchemaCreate,
     ProductSchemaUpdatePartial
 )
+from .models import Product
 from .repository import ProductRepository
+from app.config import settings
 from app.db.database import database
+from app.utils.bulk_import import (
+    IMPORT_FORMAT,
+    IMPORT_ON_CONFLICT,
+    import_file,
+    spool_chunks,
+)
+from app.utils.etag import etag_dependency
 from app.utils.exceptions import (
     DBIntegrityException,
+    InvalidFileException,
+    InvalidParameterException,
     NotFoundException,
     get_http_exceptions_description,
 )
-from app.utils.shemas import CreateResultSchema
+from app.utils.pagination import PAGINATION_LIMIT
+from app.utils.serialization import serialized_response
+from app.utils.shemas import (
+    CreateResultSchema,
+    ImportResultSchema,
+    PageSchema,
+)
 
 
 router = APIRouter(
     prefix="/products",
     tags=["Товары"],
-    dependencies=[Depends(database.session_dependency)],
 )
 
 
-@router.get("")
+@router.get(
+    "",
+    dependencies=[Depends(etag_dependency(Product.__tablename__))],
+    responses=get_http_exceptions_description(InvalidParameterException),
+)
+@serialized_response()
 async def get_products(
-    session: AsyncSession = Depends(database.session_dependency),
-) -> list[ProductSchema]:
-    return await ProductRepository.get_objects(session=session)
+    session: AsyncSession = Depends(database.read_session_dependency),
+    limit: PAGINATION_LIMIT = settings.PAGINATION_DEFAULT_LIMIT,
+    after: str | None = None,
+) -> PageSchema[ProductSchema]:
+    return await ProductRepository.get_page(
+        session=session,
+        limit=limit,
+        after=after,
+        cached=True,
+    )
 
 
 @router.get(
     "/{product_id}",
+    dependencies=[Depends(etag_dependency(Product.__tablename__))],
     responses=get_http_exceptions_description(NotFoundException),
 )
 async def get_product(
     product_id: int,
-    session: AsyncSession = Depends(database.session_dependency),
+    session: AsyncSession = Depends(database.read_session_dependency),
 ) -> ProductSchema:
     return await ProductRepository.get_object(
-        session=session, object_id=product_id
+        session=session, object_id=product_id, cached=True
     )
 
 
@@ -58,6 +90,42 @@ async def create_product(
     return CreateResultSchema(id=product_id)
 
 
+@router.post(
+    "/import",
+    responses=get_http_exceptions_description(InvalidFileException),
+)
+async def import_products(
+    request: Request,
+    session: AsyncSession = Depends(database.session_dependency),
+    format: IMPORT_FORMAT = "csv",
+    on_conflict: IMPORT_ON_CONFLICT = "reject",
+) -> ImportResultSchema:
+    with await spool_chunks(request.stream()) as file:
+        return await import_file(
+            session=session,
+            repository=ProductRepository,
+            file=file,
+            format=format,
+            schema=ProductSchemaCreate,
+            on_conflict=on_conflict,
+        )
+
+
+@router.put("/bulk")
+async def upsert_products(
+    products_data: Annotated[
+        list[ProductSchemaCreate],
+        Body(max_length=settings.PRODUCTS_BULK_MAX_SIZE),
+    ],
+    session: AsyncSession = Depends(database.session_dependency),
+) -> ProductBulkResultSchema:
+    return await ProductRepository.upsert_prices(
+        session=session,
+        data=products_data,
+        chunk_size=settings.PRODUCTS_BULK_CHUNK_SIZE,
+    )
+
+
 @router.patch(
     "/{product_id}",
     responses=get_http_exceptions_description(
@@ -26,6 +26,12 @@ class ProductSchemaCreate(ProductSchemaBase):
     pass
 
 
+class ProductBulkResultSchema(BaseModel):
+    inserted: int
+    updated: int
+    unchanged: int
+
+
 class ProductSchemaUpdatePartial(ProductSchemaBase):
     name: str | None = None
     price: Decimal | None = None
@@ -1,10 +1,13 @@
+from datetime import date
+from decimal import Decimal
+
 from sqlalchemy import (
     DECIMAL,
     ForeignKey,
     CheckConstraint,
+    Index,
     UniqueConstraint,
-    func,
-    select
+    text,
 )
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -15,6 +18,22 @@ from app.db.abstract_models import Base
 
 
 class Sale(Base):
+    __table_args__ = (
+        # covering index for store and period filters
+        Index(
+            "ix_sale_store_id_created_at",
+            "store_id",
+            "created_at",
+            postgresql_include=["total_amount", "total_quantity"],
+        ),
+        # sales are appended in time order, so BRIN index is enough
+        Index(
+            "ix_sale_created_at_brin",
+            "created_at",
+            postgresql_using="brin",
+        ),
+    )
+
     repr_cols = ("id",)
 
     id: Mapped[INT_PK]
@@ -29,45 +48,19 @@ class Sale(Base):
         cascade="all, delete",
     )
 
-    @hybrid_property
-    def total_amount(self):
-        if not self.products:
-            return 0
-        return sum(product.total_price for product in self.products)
-
-    @total_amount.expression
-    def total_amount(cls):
-        return (
-            select(
-                func.coalesce(
-                    func.sum(SaleProducts.unit_price * SaleProducts.quantity),
-                    0,
-                )
-            )
-            .where(SaleProducts.sale_id == cls.id)
-            .correlate(cls)
-            .label("total_amount")
-        )
-
-    @hybrid_property
-    def total_quantity(self):
-        if not self.products:
-            return 0
-        return sum(product.quantity for product in self.products)
-
-    @total_quantity.expression
-    def total_quantity(cls):
-        return (
-            select(
-                func.coalesce(
-                    func.sum(SaleProducts.quantity),
-                    0,
-                )
-            )
-            .where(SaleProducts.sale_id == cls.id)
-            .correlate(cls)
-            .label("total_quantity")
-        )
+    # denormalized totals of sale products,
+    # maintained by SaleRepository on every products change
+    total_amount: Mapped[Decimal] = mapped_column(
+        DECIMAL(14, 2),
+        default=0,
+        server_default="0",
+        index=True,
+    )
+    total_quantity: Mapped[int] = mapped_column(
+        default=0,
+        server_default="0",
+        index=True,
+    )
 
 
 class SaleProducts(Base):
@@ -78,6 +71,11 @@ class SaleProducts(Base):
             "product_id",
             name="idx_unique_sale_product",
         ),
+        Index(
+            "ix_sale_products_product_id_sale_id",
+            "product_id",
+            "sale_id",
+        ),
         CheckConstraint('quantity > 0', name='check_quantity_positive'),
         CheckConstraint('unit_price > 0', name='check_unit_price_positive'),
     )
@@ -104,3 +102,46 @@ class SaleProducts(Base):
     @hybrid_property
     def total_price(self):
         return self.unit_price * self.quantity
+
+
+class SaleDailyRollup(Base):
+    """
+    Totals of sales by days and stores, maintained by SaleRepository.
+    Rows without product contain totals of whole sales,
+    rows with product contain totals of the product sales lines.
+    """
+    __tablename__ = "sale_daily_rollup"
+    __table_args__ = (
+        UniqueConstraint(
+            "day",
+            "store_id",
+            "product_id",
+            name="idx_unique_sale_daily_rollup",
+            postgresql_nulls_not_distinct=True,
+        ),
+        # covering index for reports by cities and stores
+        Index(
+            "ix_sale_daily_rollup_store_id_day_sales",
+            "store_id",
+            "day",
+            postgresql_include=["revenue", "quantity", "sale_count"],
+            postgresql_where=text("product_id IS NULL"),
+        ),
+    )
+
+    repr_cols = ("day", "store_id", "product_id")
+
+    id: Mapped[INT_PK]
+    day: Mapped[date]
+    store_id: Mapped[int] = mapped_column(
+        ForeignKey("store.id", ondelete="CASCADE"),
+        index=True,
+    )
+    product_id: Mapped[int | None] = mapped_column(
+        ForeignKey("product.id", ondelete="CASCADE"),
+        index=True,
+    )
+
+    revenue: Mapped[Decimal] = mapped_column(DECIMAL(16, 2))
+    quantity: Mapped[int]
+    sale_count: Mapped[int]
@@ -1,20 +1,58 @@
-from datetime import datetime, timedelta
+from collections.abc import AsyncIterator, Iterable
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
 
-from sqlalchemy import Result, select
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Integer,
+    Result,
+    Row,
+    Select,
+    bindparam,
+    cast,
+    delete,
+    distinct,
+    func,
+    literal,
+    literal_column,
+    select,
+    text,
+    true,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.expression import ColumnElement
 
 from app.api.products.models import Product
 
-from .models import Sale, SaleProducts
+from .models import Sale, SaleDailyRollup, SaleProducts
 from .schemas import (
+    SaleProductOperationSchema,
+    SaleProductRemoveSchema,
     SaleProductSchemaCreate,
     SaleSchemaCreate,
+    SaleSchemaUpdatePartial,
     SaleProductSchemaUpdatePartial,
 )
 from app.api.products.repository import ProductRepository
 from app.api.stores.models import Store
-from app.utils.repository import BaseRepository
+from app.api.stores.repository import StoreRepository
+from app.config import settings
+from app.utils.repository import (
+    BaseRepository,
+    Explain,
+    any_of,
+    inserted_column,
+    select_rows,
+)
 from app.utils.exceptions import (
     NotFoundException,
     DBIntegrityException,
@@ -26,12 +64,16 @@ class SaleRepository(BaseRepository):
     model = Sale
 
     filters_conditions = {
-        "city_id": lambda city_id: Store.city_id == city_id,
-        "store_id": lambda store_id: Sale.store_id == store_id,
-        "product_id": lambda product_id: SaleProducts.product_id == product_id,
+        "city_id": lambda city_id: Store.city_id == any_of(city_id),
+        "store_id": lambda store_id: Sale.store_id == any_of(store_id),
+        # semi-join, so sales are not multiplied by theirs products
+        "product_id": lambda product_id: Sale.products.any(
+            SaleProducts.product_id == any_of(product_id)
+        ),
         "days": lambda days: (
             Sale.created_at >= (
-                datetime.utcnow() - timedelta(days=days)
+                func.timezone("utc", func.now())
+                - func.make_interval(0, 0, 0, days)
             )
         ),
         "min_amount": lambda min_amount: Sale.total_amount >= min_amount,
@@ -44,44 +86,482 @@ class SaleRepository(BaseRepository):
         ),
     }
 
+    # types of filters bind parameters, which can't be taken from columns
+    filters_types = {
+        "city_id": ARRAY(Integer),
+        "store_id": ARRAY(Integer),
+        "product_id": ARRAY(Integer),
+        "days": Integer(),
+    }
+
     filters_joins = {
-        ("product_id",): Sale.products,
         ("city_id",): Sale.store,
     }
 
+    # conditions of filters, which are applied to the joined relation
+    # instead of filters_conditions, if the relation is joined
+    joined_filters_conditions = {
+        "product_id": (
+            Sale.products,
+            lambda product_id: SaleProducts.product_id == any_of(product_id),
+        ),
+    }
+
+    # columns, which can be selected instead of whole sales
+    fields_columns = {
+        "id": Sale.id,
+        "store_id": Sale.store_id,
+        "total_amount": Sale.total_amount,
+        "total_quantity": Sale.total_quantity,
+    }
+
+    summary_fields = ("id", "store_id", "total_amount", "total_quantity")
+
+    timeseries_buckets = {
+        "hour": timedelta(hours=1),
+        "day": timedelta(days=1),
+        "week": timedelta(weeks=1),
+    }
+
+    # filters of reports, which can be read from the daily rollup
+    rollup_filters_conditions = {
+        "city_id": lambda city_id: Store.city_id == any_of(city_id),
+        "store_id": lambda store_id: (
+            SaleDailyRollup.store_id == any_of(store_id)
+        ),
+        "product_id": lambda product_id: (
+            SaleDailyRollup.product_id == any_of(product_id)
+        ),
+    }
+
     @classmethod
     async def get_objects(
         cls,
         *,
         session: AsyncSession,
+        limit: int | None = None,
+        after: int | None = None,
+        fields: Iterable[str] | None = None,
+        **filters
+    ) -> list[Sale] | list[Row]:
+        """
+        Return filtered sales.
+        If fields are given, only its columns are selected and rows are
+        returned instead of sales, products of sales are not loaded.
+        """
+        query, params = cls.get_objects_query(
+            limit=limit, after=after, fields=fields, **filters
+        )
+        result: Result = await session.execute(query, params)
+        if fields is not None:
+            return list(result.all())
+        sales = list(result.scalars().all())
+        return sales
+
+    @classmethod
+    async def count_objects(
+        cls,
+        *,
+        session: AsyncSession,
+        estimated: bool = False,
+        **filters
+    ) -> int:
+        """
+        Return count of filtered sales.
+        Estimated count is taken from planner statistics without scanning
+        sales: from pg_class for all sales, from the query plan otherwise.
+        """
+        query, params = cls.get_objects_query(fields=("id",), **filters)
+        query = query.order_by(None)
+
+        if not estimated:
+            query = select(func.count()).select_from(query.subquery())
+            result: Result = await session.execute(query, params)
+            return result.scalar_one()
+
+        if not params:
+            result = await session.execute(
+                text(
+                    "SELECT reltuples FROM pg_class "
+                    "WHERE oid = CAST(:table_name AS regclass)"
+                ),
+                {"table_name": Sale.__tablename__},
+            )
+            reltuples = result.scalar_one()
+            # reltuples is -1, if table was never vacuumed or analyzed
+            if reltuples >= 0:
+                return int(reltuples)
+
+        result = await session.execute(Explain(query), params)
+        return result.scalar_one()[0]["Plan"]["Plan Rows"]
+
+    @classmethod
+    async def stream_objects(
+        cls,
+        *,
+        session: AsyncSession,
+        chunk_size: int,
+        **filters
+    ) -> AsyncIterator[list[Sale]]:
+        """
+        Yield filtered sales by chunks of chunk_size,
+        fetched from server-side cursor.
+        """
+        query, params = cls.get_objects_query(**filters)
+        result = await session.stream_scalars(
+            query, params, execution_options={"yield_per": chunk_size}
+        )
+        async for sales in result.partitions():
+            yield sales
+
+    @classmethod
+    def get_objects_query(
+        cls,
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        fields: Iterable[str] | None = None,
         **filters
-    ) -> list[Sale]:
-        # breakpoint()
+    ) -> tuple[Select, dict[str, Any]]:
+        """
+        Return query of filtered sales and its parameters.
+        Query is built once for every set of used filters and fields
+        and then is taken from cache, only parameters are different.
+        """
+        if fields is not None:
+            fields = frozenset(fields)
+            if not fields <= cls.fields_columns.keys():
+                raise InvalidParameterException
 
         # remove none filters kwargs
-        filters = {k: v for k, v in filters.items() if v is not None}
+        params = {k: v for k, v in filters.items() if v is not None}
+        query = cls.build_objects_query(
+            frozenset(params), limit is not None, after is not None, fields
+        )
+
+        for key, value in params.items():
+            if isinstance(cls.filters_types.get(key), ARRAY):
+                params[key] = value if isinstance(value, list) else [value]
+        if limit is not None:
+            params["limit"] = limit
+        if after is not None:
+            params["after"] = after
+
+        return query, params
+
+    @classmethod
+    @lru_cache(maxsize=settings.QUERY_CACHE_SIZE)
+    def build_objects_query(
+        cls,
+        filters_keys: frozenset[str],
+        limited: bool,
+        paginated: bool,
+        fields: frozenset[str] | None = None,
+    ) -> Select:
+        if fields is None:
+            query = select(Sale).options(selectinload(Sale.products))
+        else:
+            # id is always selected, it is the cursor of pagination
+            query = select(*(
+                column for field, column in cls.fields_columns.items()
+                if field == "id" or field in fields
+            ))
+        query = query.order_by(Sale.id)
+        query = cls.apply_filters_to_query(
+            query,
+            **{
+                key: bindparam(key, type_=cls.filters_types.get(key))
+                for key in filters_keys
+            },
+        )
+        return cls.apply_pagination_to_query(
+            query,
+            bindparam("limit", type_=Integer) if limited else None,
+            bindparam("after", type_=Integer) if paginated else None,
+        )
 
-        query = select(Sale).order_by(Sale.id)
+    @classmethod
+    def get_query_cache_info(cls) -> dict[str, int]:
+        """Return counters of the cache of sales queries."""
+        cache_info = cls.build_objects_query.cache_info()
+        return {
+            "hits": cache_info.hits,
+            "misses": cache_info.misses,
+            "size": cache_info.currsize,
+        }
+
+    @classmethod
+    def apply_filters_to_query(
+        cls,
+        query: Select,
+        joined: tuple = (),
+        **filters
+    ) -> Select:
+        """
+        Apply sales filters to the query.
+        Relations from joined are considered already joined to the query.
+        """
+        # remove none filters kwargs
+        filters = {k: v for k, v in filters.items() if v is not None}
 
         # join others tables, if necessary
         for filter_keys, join_relation in cls.filters_joins.items():
+            if any(join_relation is relation for relation in joined):
+                continue
             if set(filter_keys) & filters.keys():
                 query = query.join(join_relation)
 
         # apply filters
         for filter_key, filter_value in filters.items():
-            try:
-                query = query.filter(
-                    cls.filters_conditions[filter_key](filter_value)
-                )
-            except KeyError:
+            condition = cls.filters_conditions.get(filter_key)
+            relation, joined_condition = cls.joined_filters_conditions.get(
+                filter_key, (None, None)
+            )
+            if any(relation is joined_relation for joined_relation in joined):
+                condition = joined_condition
+            if condition is None:
                 raise InvalidParameterException
+            query = query.filter(condition(filter_value))
+
+        return query
 
-        # make query
-        query = query.options(selectinload(Sale.products))
+    @classmethod
+    async def get_report(
+        cls, *, session: AsyncSession, group_by: str, **filters
+    ) -> list[dict]:
+        query = cls.get_report_query(group_by, **filters)
         result: Result = await session.execute(query)
-        sales = list(result.scalars().unique().all())
-        return sales
+        return [row._asdict() for row in result.all()]
+
+    @classmethod
+    def get_report_query(cls, group_by: str, **filters) -> Select:
+        """
+        Return query of revenue, quantity and sales count of filtered sales
+        grouped by city, store or product.
+        Reports without period and totals filters are read from the rollup.
+        """
+        # remove none filters kwargs
+        filters = {k: v for k, v in filters.items() if v is not None}
+
+        rollup_filters = cls.rollup_filters_conditions.keys()
+        if group_by != "product":
+            # sales with product can't be selected from rollup of stores
+            rollup_filters -= {"product_id"}
+        if filters.keys() <= rollup_filters:
+            return cls.get_rollup_report_query(group_by, **filters)
+        return cls.get_sales_report_query(group_by, **filters)
+
+    @classmethod
+    def get_sales_report_query(cls, group_by: str, **filters) -> Select:
+        if group_by == "product":
+            # product revenue is calculated by sale products,
+            # not by sale totals
+            group_column = SaleProducts.product_id
+            joined = (Sale.products,)
+            revenue = func.sum(SaleProducts.total_price)
+            quantity = func.sum(SaleProducts.quantity)
+        else:
+            if group_by == "city":
+                group_column = Store.city_id
+                joined = (Sale.store,)
+            else:
+                group_column = Sale.store_id
+                joined = ()
+            revenue = func.sum(Sale.total_amount)
+            quantity = func.sum(Sale.total_quantity)
+
+        query = select(
+            group_column.label("id"),
+            revenue.label("revenue"),
+            quantity.label("quantity"),
+            func.count().label("sales_count"),
+        ).select_from(Sale)
+        for join_relation in joined:
+            query = query.join(join_relation)
+        query = cls.apply_filters_to_query(query, joined=joined, **filters)
+        return query.group_by(group_column).order_by(group_column)
+
+    @classmethod
+    def get_rollup_report_query(cls, group_by: str, **filters) -> Select:
+        if group_by == "product":
+            group_column = SaleDailyRollup.product_id
+            rows_condition = SaleDailyRollup.product_id.is_not(None)
+        else:
+            group_column = (
+                Store.city_id
+                if group_by == "city"
+                else SaleDailyRollup.store_id
+            )
+            rows_condition = SaleDailyRollup.product_id.is_(None)
+
+        query = select(
+            group_column.label("id"),
+            func.sum(SaleDailyRollup.revenue).label("revenue"),
+            func.sum(SaleDailyRollup.quantity).label("quantity"),
+            func.sum(SaleDailyRollup.sale_count).label("sales_count"),
+        ).filter(rows_condition)
+        if group_by == "city":
+            query = query.join(Store, Store.id == SaleDailyRollup.store_id)
+        query = cls.apply_rollup_filters_to_query(
+            query, store_joined=group_by == "city", **filters
+        )
+
+        return (
+            query.group_by(group_column)
+            # rows of deleted sales remain in rollup with zero values
+            .having(func.sum(SaleDailyRollup.sale_count) > 0)
+            .order_by(group_column)
+        )
+
+    @classmethod
+    def apply_rollup_filters_to_query(
+        cls, query: Select, store_joined: bool = False, **filters
+    ) -> Select:
+        if "city_id" in filters and not store_joined:
+            query = query.join(Store, Store.id == SaleDailyRollup.store_id)
+        for filter_key, filter_value in filters.items():
+            query = query.filter(
+                cls.rollup_filters_conditions[filter_key](filter_value)
+            )
+        return query
+
+    @classmethod
+    async def get_timeseries(
+        cls,
+        *,
+        session: AsyncSession,
+        bucket: str,
+        start: datetime,
+        end: datetime,
+        **filters
+    ) -> list[dict]:
+        query = cls.get_timeseries_query(bucket, start, end, **filters)
+        result: Result = await session.execute(query)
+        return [row._asdict() for row in result.all()]
+
+    @classmethod
+    def get_timeseries_query(
+        cls, bucket: str, start: datetime, end: datetime, **filters
+    ) -> Select:
+        """
+        Return query of revenue, quantity and sales count of filtered sales
+        by time buckets from start to end, empty buckets are filled by zeros.
+        With product filter only sales lines of the product are counted.
+        """
+        # remove none filters kwargs
+        filters = {k: v for k, v in filters.items() if v is not None}
+
+        # sales time is stored in UTC without time zone
+        start, end = (
+            value.astimezone(timezone.utc).replace(tzinfo=None)
+            if value.tzinfo is not None
+            else value
+            for value in (start, end)
+        )
+
+        try:
+            step = cls.timeseries_buckets[bucket]
+        except KeyError:
+            raise InvalidParameterException
+        if not (
+            start < end
+            and (end - start) / step < settings.TIMESERIES_MAX_BUCKETS
+        ):
+            raise InvalidParameterException
+
+        # bucket is one of the known names, so it can be inlined
+        # to use the same date_trunc expression in select and group by
+        bucket_name = literal_column(f"'{bucket}'")
+
+        # rollup rows are by days, so days buckets of whole days
+        # can be read from it; sale counts of rollup rows are by products,
+        # so a sale with several of filtered products can't be counted once
+        product_id = filters.get("product_id")
+        if (
+            step >= timedelta(days=1)
+            and start.time() == end.time() == time()
+            and filters.keys() <= cls.rollup_filters_conditions.keys()
+            and not (isinstance(product_id, list) and len(product_id) > 1)
+        ):
+            totals = cls.get_rollup_timeseries_totals_query(
+                bucket_name, start, end, **filters
+            )
+        else:
+            totals = cls.get_sales_timeseries_totals_query(
+                bucket_name, start, end, **filters
+            )
+        totals = totals.subquery("totals")
+
+        buckets = select(
+            func.generate_series(
+                func.date_trunc(bucket_name, start), end, step
+            ).label("bucket")
+        ).subquery("buckets")
+
+        return (
+            select(
+                buckets.c.bucket,
+                func.coalesce(totals.c.revenue, 0).label("revenue"),
+                func.coalesce(totals.c.quantity, 0).label("quantity"),
+                func.coalesce(totals.c.sales_count, 0).label("sales_count"),
+            )
+            .outerjoin(totals, totals.c.bucket == buckets.c.bucket)
+            .filter(buckets.c.bucket < end)
+            .order_by(buckets.c.bucket)
+        )
+
+    @classmethod
+    def get_sales_timeseries_totals_query(
+        cls, bucket_name: ColumnElement, start: datetime, end: datetime,
+        **filters
+    ) -> Select:
+        if "product_id" in filters:
+            joined = (Sale.products,)
+            revenue = func.sum(SaleProducts.total_price)
+            quantity = func.sum(SaleProducts.quantity)
+        else:
+            joined = ()
+            revenue = func.sum(Sale.total_amount)
+            quantity = func.sum(Sale.total_quantity)
+
+        bucket_column = func.date_trunc(bucket_name, Sale.created_at)
+        query = (
+            select(
+                bucket_column.label("bucket"),
+                revenue.label("revenue"),
+                quantity.label("quantity"),
+                # sale is joined with every line of filtered products
+                func.count(distinct(Sale.id)).label("sales_count"),
+            )
+            .select_from(Sale)
+            .filter(Sale.created_at >= start, Sale.created_at < end)
+        )
+        for join_relation in joined:
+            query = query.join(join_relation)
+        query = cls.apply_filters_to_query(query, joined=joined, **filters)
+        return query.group_by(bucket_column)
+
+    @classmethod
+    def get_rollup_timeseries_totals_query(
+        cls, bucket_name: ColumnElement, start: datetime, end: datetime,
+        **filters
+    ) -> Select:
+        bucket_column = func.date_trunc(
+            bucket_name, cast(SaleDailyRollup.day, DateTime)
+        )
+        query = select(
+            bucket_column.label("bucket"),
+            func.sum(SaleDailyRollup.revenue).label("revenue"),
+            func.sum(SaleDailyRollup.quantity).label("quantity"),
+            func.sum(SaleDailyRollup.sale_count).label("sales_count"),
+        ).filter(
+            SaleDailyRollup.day >= start.date(),
+            SaleDailyRollup.day < end.date(),
+        )
+        if "product_id" not in filters:
+            query = query.filter(SaleDailyRollup.product_id.is_(None))
+        query = cls.apply_rollup_filters_to_query(query, **filters)
+        return query.group_by(bucket_column)
 
     @classmethod
     async def get_object(
@@ -99,7 +579,7 @@ class SaleRepository(BaseRepository):
     ) -> int:
         # we need select products to get actual price
         products = await ProductRepository.get_products_by_ids(
-            session=session, ids=data.products_ids
+            session=session, ids=data.products_ids, cached=True
         )
         products_quantity = {product_info.product_id: product_info.quantity
                              for product_info in data.products
@@ -117,14 +597,265 @@ class SaleRepository(BaseRepository):
                 unit_price=product.price,
                 )
             )
+        sale.total_amount = sum(
+            (product.total_price for product in sale.products), Decimal(0)
+        )
+        sale.total_quantity = sum(
+            product.quantity for product in sale.products
+        )
 
         session.add(sale)
+        await cls.flush_objects(session=session)
+        await cls.update_rollup(
+            session=session,
+            rows=cls.get_rollup_rows_query(Sale.id == sale.id),
+        )
+
         sale: Sale = await cls.refresh_object(
             session=session,
             model_object=sale,
         )
         return sale.id
 
+    @classmethod
+    async def create_objects(
+        cls,
+        *,
+        session: AsyncSession,
+        data: list[SaleSchemaCreate],
+        chunk_size: int,
+    ) -> list[dict[str, Any]]:
+        """
+        Create sales and return id or error for every sale, in order of data.
+        Products and stores of all sales are selected once, sales are
+        inserted by chunks, every chunk in own savepoint,
+        so a failed chunk doesn't cancel other chunks.
+        """
+        products_ids = {
+            product_id
+            for sale_data in data
+            for product_id in sale_data.products_ids
+        }
+        products = {
+            product.id: product
+            for product in await ProductRepository.get_products_by_ids(
+                session=session, ids=list(products_ids), cached=True
+            )
+        }
+        stores_ids = await StoreRepository.get_existing_ids(
+            session=session,
+            ids=list({sale_data.store_id for sale_data in data}),
+            cached=True,
+        )
+
+        results = [{"id": None, "error": None} for _ in data]
+        valid_indexes = []
+        for index, sale_data in enumerate(data):
+            if sale_data.store_id not in stores_ids:
+                results[index]["error"] = "store not found"
+            elif not products.keys() >= set(sale_data.products_ids):
+                results[index]["error"] = "product not found"
+            else:
+                valid_indexes.append(index)
+
+        for start in range(0, len(valid_indexes), chunk_size):
+            chunk = valid_indexes[start:start + chunk_size]
+            try:
+                async with session.begin_nested():
+                    sales_ids = await cls.insert_objects(
+                        session=session,
+                        data=[data[index] for index in chunk],
+                        products=products,
+                    )
+            except IntegrityError:
+                # objects were changed concurrently after selection
+                for index in chunk:
+                    results[index]["error"] = DBIntegrityException.detail
+                continue
+
+            for index, sale_id in zip(chunk, sales_ids):
+                results[index]["id"] = sale_id
+
+        await session.commit()
+        return results
+
+    @classmethod
+    async def insert_objects(
+        cls,
+        *,
+        session: AsyncSession,
+        data: list[SaleSchemaCreate],
+        products: dict[int, Product],
+    ) -> list[int]:
+        """
+        Insert sales with one insert per table and return theirs ids.
+        Products of sales must be in products.
+        """
+        sales_columns = ("id", "store_id", "total_amount", "total_quantity")
+        lines_columns = ("sale_id", "product_id", "quantity", "unit_price")
+        sales_rows = []
+        sales_lines = []
+        for sale_data in data:
+            lines = [
+                {
+                    "product_id": product_data.product_id,
+                    "quantity": product_data.quantity,
+                    "unit_price": products[product_data.product_id].price,
+                }
+                for product_data in sale_data.products
+            ]
+            sales_rows.append({
+                "store_id": sale_data.store_id,
+                "total_amount": sum(
+                    (line["unit_price"] * line["quantity"] for line in lines),
+                    Decimal(0),
+                ),
+                "total_quantity": sum(line["quantity"] for line in lines),
+            })
+            sales_lines.append(lines)
+
+        # ids are taken from the sequence before insert,
+        # so lines can refer to sales without reading inserted sales
+        result: Result = await session.execute(
+            select(
+                func.nextval(
+                    func.pg_get_serial_sequence(Sale.__tablename__, "id")
+                ),
+                func.timezone("utc", func.now()),
+            ).select_from(func.generate_series(1, len(sales_rows)))
+        )
+        sales = result.all()
+        for (sale_id, _), sale_row in zip(sales, sales_rows):
+            sale_row["id"] = sale_id
+        await session.execute(
+            insert(Sale).from_select(
+                sales_columns,
+                select_rows(Sale.__table__, sales_columns, sales_rows),
+            )
+        )
+
+        lines_rows = []
+        # rollup rows are summed here, so inserted sales are not read again
+        rollup_rows: dict[tuple, dict[str, Any]] = {}
+        # created_at of sales is the start of the transaction
+        for (sale_id, created_at), sale_row, lines in zip(
+            sales, sales_rows, sales_lines
+        ):
+            day = created_at.date()
+            sale_rollup_rows = [
+                (None, sale_row["total_amount"], sale_row["total_quantity"]),
+                *(
+                    (
+                        line["product_id"],
+                        line["unit_price"] * line["quantity"],
+                        line["quantity"],
+                    )
+                    for line in lines
+                ),
+            ]
+            for product_id, revenue, quantity in sale_rollup_rows:
+                row = rollup_rows.setdefault(
+                    (day, sale_row["store_id"], product_id or 0),
+                    {
+                        "day": day,
+                        "store_id": sale_row["store_id"],
+                        "product_id": product_id,
+                        "revenue": Decimal(0),
+                        "quantity": 0,
+                        "sale_count": 0,
+                    },
+                )
+                row["revenue"] += revenue
+                row["quantity"] += quantity
+                row["sale_count"] += 1
+
+            lines_rows.extend({"sale_id": sale_id, **line} for line in lines)
+
+        if lines_rows:
+            await session.execute(
+                insert(SaleProducts).from_select(
+                    lines_columns,
+                    select_rows(
+                        SaleProducts.__table__, lines_columns, lines_rows
+                    ),
+                )
+            )
+        # rows are sorted, so concurrent batches lock them in the same order
+        await cls.update_rollup(
+            session=session,
+            rows=[rollup_rows[key] for key in sorted(rollup_rows)],
+        )
+
+        sales_ids = [sale_row["id"] for sale_row in sales_rows]
+        return sales_ids
+
+    @classmethod
+    async def update_partial_object(
+        cls,
+        *,
+        session: AsyncSession,
+        object_id: int,
+        data: SaleSchemaUpdatePartial,
+    ) -> Sale:
+        sale: Sale = await cls.lock_object(
+            session=session,
+            object_id=object_id,
+            options=selectinload(Sale.products),
+        )
+        data = data.model_dump(exclude_unset=True)
+        if not data:
+            return sale
+
+        # move sale from rollup of the old store to rollup of the new one
+        await cls.update_rollup(
+            session=session,
+            rows=cls.get_rollup_rows_query(Sale.id == object_id, sign=-1),
+        )
+        for key, value in data.items():
+            setattr(sale, key, value)
+        await cls.flush_objects(session=session)
+        await cls.update_rollup(
+            session=session,
+            rows=cls.get_rollup_rows_query(Sale.id == object_id),
+        )
+
+        return await cls.refresh_object(session=session, model_object=sale)
+
+    @classmethod
+    async def delete_object(
+        cls, *, session: AsyncSession, object_id: int
+    ) -> Sale:
+        sale: Sale = await cls.lock_object(
+            session=session,
+            object_id=object_id,
+            options=selectinload(Sale.products),
+        )
+        await cls.update_rollup(
+            session=session,
+            rows=cls.get_rollup_rows_query(Sale.id == object_id, sign=-1),
+        )
+        await session.delete(sale)
+        await session.commit()
+        return sale
+
+    @classmethod
+    async def lock_object(
+        cls, *, session: AsyncSession, object_id: int, options: Any = None
+    ) -> Sale:
+        """
+        Select sale for update.
+        Every change of sale or its products locks the sale row first,
+        so changes of one sale are serialized and can't deadlock.
+        """
+        query = select(Sale).filter_by(id=object_id).with_for_update()
+        query = cls.apply_options_to_query(query, options)
+        result: Result = await session.execute(query)
+
+        sale = result.scalar_one_or_none()
+        if sale is None:
+            raise NotFoundException
+        return sale
+
     @classmethod
     async def get_products(
         cls, *, session: AsyncSession, sale_id: int
@@ -148,7 +879,7 @@ class SaleRepository(BaseRepository):
         sale_id: int,
         product_data: SaleProductSchemaCreate,
     ) -> Sale:
-        sale: Sale = await super().get_object(
+        sale: Sale = await cls.lock_object(
             session=session,
             object_id=sale_id,
             options=(
@@ -161,6 +892,7 @@ class SaleRepository(BaseRepository):
         product: Product = await ProductRepository.get_object(
             session=session,
             object_id=product_data.product_id,
+            cached=True,
         )
 
         sale.products.append(
@@ -170,6 +902,14 @@ class SaleRepository(BaseRepository):
                 unit_price=product.price,
             )
         )
+        await cls.update_totals(
+            session=session,
+            sale=sale,
+            product_id=product.id,
+            amount=product.price * product_data.quantity,
+            quantity=product_data.quantity,
+            lines=1,
+        )
 
         sale: Sale = await cls.refresh_object(
             session=session,
@@ -179,6 +919,226 @@ class SaleRepository(BaseRepository):
         sale.products_details = cls.get_products_details(sale)
         return sale
 
+    @classmethod
+    async def increment_product(
+        cls,
+        *,
+        session: AsyncSession,
+        sale_id: int,
+        product_data: SaleProductSchemaCreate,
+    ) -> Row:
+        """
+        Add product to sale or increase its quantity in sale, if it is
+        already there, and shift totals of sale and rollup
+        in a single statement. New line takes the current price
+        of product, existing line keeps its price.
+        """
+        quantity = literal(product_data.quantity)
+        # sale is locked before its line, as by other changes of sale
+        locked_sale = (
+            select(Sale.id, Sale.store_id, Sale.created_at)
+            .filter(Sale.id == sale_id)
+            .with_for_update()
+            .cte("locked_sale")
+        )
+        line = insert(SaleProducts).from_select(
+            ("sale_id", "product_id", "quantity", "unit_price"),
+            select(locked_sale.c.id, Product.id, quantity, Product.price)
+            .join_from(
+                locked_sale, Product, Product.id == product_data.product_id
+            ),
+        )
+        line = (
+            line.on_conflict_do_update(
+                constraint="idx_unique_sale_product",
+                set_={"quantity": SaleProducts.quantity + quantity},
+            )
+            .returning(
+                SaleProducts.sale_id,
+                SaleProducts.product_id,
+                SaleProducts.quantity,
+                SaleProducts.unit_price,
+                inserted_column,
+            )
+            .cte("line")
+        )
+        amount = line.c.unit_price * quantity
+        updated_sale = (
+            update(Sale)
+            .where(Sale.id == line.c.sale_id)
+            .values(
+                total_amount=Sale.total_amount + amount,
+                total_quantity=Sale.total_quantity + quantity,
+            )
+            .cte("updated_sale")
+        )
+        # rows are selected only if the line is added
+        sale_line = locked_sale.join(line, line.c.sale_id == locked_sale.c.id)
+        day = cast(locked_sale.c.created_at, Date)
+        rollup_rows = union_all(
+            select(
+                day,
+                locked_sale.c.store_id,
+                literal(None, Integer),
+                amount,
+                quantity,
+                literal(0),
+            ).select_from(sale_line),
+            select(
+                day,
+                locked_sale.c.store_id,
+                line.c.product_id,
+                amount,
+                quantity,
+                cast(line.c.inserted, Integer),
+            ).select_from(sale_line),
+        )
+        updated_rollup = cls.get_update_rollup_query(
+            select(rollup_rows.subquery("rollup_rows"))
+        ).cte("updated_rollup")
+
+        query = select(
+            line.c.product_id, line.c.quantity, line.c.unit_price
+        ).add_cte(updated_sale, updated_rollup)
+        result: Result = await session.execute(query)
+        sale_product = result.one_or_none()
+        if sale_product is None:
+            raise NotFoundException
+
+        await session.commit()
+        return sale_product
+
+    @classmethod
+    async def change_products(
+        cls,
+        *,
+        session: AsyncSession,
+        sale_id: int,
+        operations: list[SaleProductOperationSchema | SaleProductRemoveSchema],
+    ) -> Sale:
+        """
+        Add, set quantity of and remove products of sale in one transaction,
+        by one statement per kind of change, and return the changed sale
+        with details of products. Removing of absent product is ignored.
+        """
+        sale: Sale = await cls.lock_object(session=session, object_id=sale_id)
+
+        products_ids = [operation.product_id for operation in operations]
+        result: Result = await session.execute(
+            select(SaleProducts)
+            .filter(
+                SaleProducts.sale_id == sale_id,
+                SaleProducts.product_id == any_of(products_ids),
+            )
+            .with_for_update()
+        )
+        lines = {line.product_id: line for line in result.scalars()}
+        products = {
+            product.id: product
+            for product in await ProductRepository.get_products_by_ids(
+                session=session,
+                ids=[
+                    operation.product_id for operation in operations
+                    if operation.op != "remove"
+                    and operation.product_id not in lines
+                ],
+                cached=True,
+            )
+        }
+
+        upserted_rows = []
+        removed_ids = []
+        rollup_rows = []
+        for operation in operations:
+            line = lines.get(operation.product_id)
+            if operation.op == "remove":
+                if line is None:
+                    continue
+                removed_ids.append(line.product_id)
+                quantity, unit_price, lines_count = 0, line.unit_price, -1
+            elif line is not None:
+                quantity, unit_price, lines_count = (
+                    operation.quantity, line.unit_price, 0
+                )
+                if operation.op == "add":
+                    quantity += line.quantity
+            elif operation.product_id in products:
+                quantity, unit_price, lines_count = (
+                    operation.quantity,
+                    products[operation.product_id].price,
+                    1,
+                )
+            else:
+                raise NotFoundException
+
+            if quantity:
+                upserted_rows.append({
+                    "sale_id": sale_id,
+                    "product_id": operation.product_id,
+                    "quantity": quantity,
+                    "unit_price": unit_price,
+                })
+            quantity_delta = quantity - (line.quantity if line else 0)
+            rollup_rows.append({
+                "day": sale.created_at.date(),
+                "store_id": sale.store_id,
+                "product_id": operation.product_id,
+                "revenue": unit_price * quantity_delta,
+                "quantity": quantity_delta,
+                "sale_count": lines_count,
+            })
+
+        if removed_ids:
+            await session.execute(
+                delete(SaleProducts).filter(
+                    SaleProducts.sale_id == sale_id,
+                    SaleProducts.product_id == any_of(removed_ids),
+                )
+            )
+        if upserted_rows:
+            columns = ("sale_id", "product_id", "quantity", "unit_price")
+            query = insert(SaleProducts).from_select(
+                columns,
+                select_rows(SaleProducts.__table__, columns, upserted_rows),
+            )
+            await session.execute(
+                query.on_conflict_do_update(
+                    constraint="idx_unique_sale_product",
+                    set_={"quantity": query.excluded.quantity},
+                )
+            )
+        if rollup_rows:
+            amount = sum(row["revenue"] for row in rollup_rows)
+            quantity = sum(row["quantity"] for row in rollup_rows)
+            await session.execute(
+                update(Sale)
+                .filter_by(id=sale_id)
+                .values(
+                    total_amount=Sale.total_amount + amount,
+                    total_quantity=Sale.total_quantity + quantity,
+                )
+            )
+            rollup_rows.append({
+                "day": sale.created_at.date(),
+                "store_id": sale.store_id,
+                "product_id": None,
+                "revenue": amount,
+                "quantity": quantity,
+                "sale_count": 0,
+            })
+            # rows are sorted, so concurrent changes lock them in one order
+            await cls.update_rollup(
+                session=session,
+                rows=sorted(
+                    rollup_rows, key=lambda row: row["product_id"] or 0
+                ),
+            )
+        await session.commit()
+
+        # sale and lines in the session are stale after the changes
+        session.expire_all()
+        return await cls.get_products(session=session, sale_id=sale_id)
+
     @classmethod
     async def update_partial_product(
         cls,
@@ -188,16 +1148,28 @@ class SaleRepository(BaseRepository):
         product_id: int,
         product_data: SaleProductSchemaUpdatePartial,
     ) -> SaleProducts:
-
+        sale: Sale = await cls.lock_object(session=session, object_id=sale_id)
         sale_product = await cls.get_sale_product(
             session=session,
             sale_id=sale_id,
             product_id=product_id,
+            for_update=True,
         )
+        old_quantity = sale_product.quantity
 
         for key, value in product_data.model_dump(exclude_unset=True).items():
             setattr(sale_product, key, value)
 
+        quantity_delta = sale_product.quantity - old_quantity
+        await cls.update_totals(
+            session=session,
+            sale=sale,
+            product_id=product_id,
+            amount=sale_product.unit_price * quantity_delta,
+            quantity=quantity_delta,
+            lines=0,
+        )
+
         return await cls.refresh_object(
             session=session,
             model_object=sale_product
@@ -211,27 +1183,42 @@ class SaleRepository(BaseRepository):
         sale_id: int,
         product_id: int,
     ) -> SaleProducts:
-
+        sale: Sale = await cls.lock_object(session=session, object_id=sale_id)
         sale_product = await cls.get_sale_product(
             session=session,
             sale_id=sale_id,
             product_id=product_id,
+            for_update=True,
         )
 
         if sale_product is None:
             raise NotFoundException
 
+        await cls.update_totals(
+            session=session,
+            sale=sale,
+            product_id=product_id,
+            amount=-sale_product.total_price,
+            quantity=-sale_product.quantity,
+            lines=-1,
+        )
         await session.delete(sale_product)
         await session.commit()
         return sale_product
 
     @classmethod
     async def get_sale_product(
-        cls, session: AsyncSession, product_id: int, sale_id: int
+        cls,
+        session: AsyncSession,
+        product_id: int,
+        sale_id: int,
+        for_update: bool = False,
     ) -> SaleProducts:
         query = select(SaleProducts).filter_by(
             product_id=product_id, sale_id=sale_id
         )
+        if for_update:
+            query = query.with_for_update()
         result: Result = await session.execute(query)
         sale_product = result.scalar_one_or_none()
 
@@ -239,6 +1226,278 @@ class SaleRepository(BaseRepository):
             raise NotFoundException
         return sale_product
 
+    @classmethod
+    async def update_totals(
+        cls,
+        *,
+        session: AsyncSession,
+        sale: Sale,
+        product_id: int,
+        amount: Decimal,
+        quantity: int,
+        lines: int,
+    ) -> None:
+        """
+        Shift stored totals of sale and its rollup by change of product line.
+        lines is change of the product lines count: 1, 0 or -1.
+        Increment in SQL is safe for concurrent changes of one sale.
+        """
+        query = (
+            update(Sale)
+            .filter_by(id=sale.id)
+            .values(
+                total_amount=Sale.total_amount + amount,
+                total_quantity=Sale.total_quantity + quantity,
+            )
+        )
+        await session.execute(query)
+
+        day = sale.created_at.date()
+        await cls.update_rollup(
+            session=session,
+            rows=[
+                {
+                    "day": day,
+                    "store_id": sale.store_id,
+                    "product_id": None,
+                    "revenue": amount,
+                    "quantity": quantity,
+                    "sale_count": 0,
+                },
+                {
+                    "day": day,
+                    "store_id": sale.store_id,
+                    "product_id": product_id,
+                    "revenue": amount,
+                    "quantity": quantity,
+                    "sale_count": lines,
+                },
+            ],
+        )
+
+    @classmethod
+    async def delete_product_from_sales(
+        cls, *, session: AsyncSession, product_id: int
+    ) -> None:
+        """
+        Delete all sales lines of product and subtract them
+        from totals of their sales and rollup in a single statement.
+        Rollup rows of the product are deleted by cascade with the product.
+        Product must be locked, so lines of it can't be added meanwhile.
+        """
+        # sales are locked before theirs lines, in order of ids,
+        # as by other changes of sales, so deletion can't deadlock with them
+        await session.execute(
+            select(Sale.id)
+            .filter(
+                Sale.id.in_(
+                    select(SaleProducts.sale_id)
+                    .filter_by(product_id=product_id)
+                )
+            )
+            .order_by(Sale.id)
+            .with_for_update()
+        )
+        deleted_lines = (
+            delete(SaleProducts)
+            .filter_by(product_id=product_id)
+            .returning(
+                SaleProducts.sale_id,
+                SaleProducts.unit_price,
+                SaleProducts.quantity,
+            )
+            .cte("deleted_lines")
+        )
+        line_amount = deleted_lines.c.unit_price * deleted_lines.c.quantity
+        updated_sales = (
+            update(Sale)
+            .where(Sale.id == deleted_lines.c.sale_id)
+            .values(
+                total_amount=Sale.total_amount - line_amount,
+                total_quantity=(
+                    Sale.total_quantity - deleted_lines.c.quantity
+                ),
+            )
+            .returning(
+                cast(Sale.created_at, Date).label("day"),
+                Sale.store_id,
+                line_amount.label("amount"),
+                deleted_lines.c.quantity,
+            )
+            .cte("updated_sales")
+        )
+        rows = (
+            select(
+                updated_sales.c.day,
+                updated_sales.c.store_id,
+                literal(None, Integer).label("product_id"),
+                -func.sum(updated_sales.c.amount),
+                -func.sum(updated_sales.c.quantity),
+                literal(0),
+            )
+            .group_by(updated_sales.c.day, updated_sales.c.store_id)
+        )
+        query = cls.get_update_rollup_query(rows).add_cte(
+            deleted_lines, updated_sales
+        )
+        await session.execute(query)
+
+    @classmethod
+    def get_actual_totals_query(cls) -> Select:
+        """Query for totals of sales computed from theirs products."""
+        return (
+            select(
+                Sale.id,
+                func.coalesce(
+                    func.sum(SaleProducts.unit_price * SaleProducts.quantity),
+                    0,
+                ).label("total_amount"),
+                func.coalesce(
+                    func.sum(SaleProducts.quantity),
+                    0,
+                ).label("total_quantity"),
+            )
+            .outerjoin(SaleProducts)
+            .group_by(Sale.id)
+        )
+
+    @classmethod
+    async def get_inconsistent_totals(
+        cls, *, session: AsyncSession
+    ) -> list[tuple[int, Decimal, int, Decimal, int]]:
+        """
+        Return sales whose stored totals differ from their products as
+        (id, stored amount, actual amount, stored quantity, actual quantity).
+        """
+        actual = cls.get_actual_totals_query().subquery("actual_totals")
+        query = (
+            select(
+                Sale.id,
+                Sale.total_amount,
+                actual.c.total_amount,
+                Sale.total_quantity,
+                actual.c.total_quantity,
+            )
+            .join(actual, actual.c.id == Sale.id)
+            .filter(
+                (Sale.total_amount != actual.c.total_amount)
+                | (Sale.total_quantity != actual.c.total_quantity)
+            )
+            .order_by(Sale.id)
+        )
+        result: Result = await session.execute(query)
+        return list(result.tuples().all())
+
+    @classmethod
+    async def recalculate_totals(
+        cls, *, session: AsyncSession, sale_ids: list[int]
+    ) -> None:
+        actual = (
+            cls.get_actual_totals_query()
+            .filter(Sale.id.in_(sale_ids))
+            .subquery("actual_totals")
+        )
+        query = (
+            update(Sale)
+            .where(Sale.id == actual.c.id)
+            .values(
+                total_amount=actual.c.total_amount,
+                total_quantity=actual.c.total_quantity,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(query)
+        await session.commit()
+
+    @classmethod
+    def get_rollup_rows_query(
+        cls, condition: ColumnElement[bool], sign: int = 1
+    ) -> Select:
+        """
+        Query for rollup rows of sales matched by condition.
+        Rows are negative with sign=-1 to subtract sales from rollup.
+        """
+        day = cast(Sale.created_at, Date).label("day")
+        sales_rows = select(
+            day,
+            Sale.store_id,
+            literal(None, Integer).label("product_id"),
+            (Sale.total_amount * sign).label("revenue"),
+            (Sale.total_quantity * sign).label("quantity"),
+            literal(sign).label("sale_count"),
+        ).filter(condition)
+        lines_rows = (
+            select(
+                day,
+                Sale.store_id,
+                SaleProducts.product_id,
+                SaleProducts.total_price * sign,
+                SaleProducts.quantity * sign,
+                literal(sign),
+            )
+            .join(Sale.products)
+            .filter(condition)
+        )
+
+        rows = union_all(sales_rows, lines_rows).subquery("rollup_rows")
+        return select(
+            rows.c.day,
+            rows.c.store_id,
+            rows.c.product_id,
+            func.sum(rows.c.revenue).label("revenue"),
+            func.sum(rows.c.quantity).label("quantity"),
+            func.sum(rows.c.sale_count).label("sale_count"),
+        ).group_by(rows.c.day, rows.c.store_id, rows.c.product_id)
+
+    @classmethod
+    def get_update_rollup_query(cls, rows: Select | list[dict]):
+        """
+        Query to add rows to rollup, where rows has keys or columns:
+        day, store_id, product_id, revenue, quantity and sale_count.
+        Increment in SQL is safe for concurrent changes of one rollup row.
+        """
+        columns = (
+            "day",
+            "store_id",
+            "product_id",
+            "revenue",
+            "quantity",
+            "sale_count",
+        )
+        if not isinstance(rows, Select):
+            rows = select_rows(SaleDailyRollup.__table__, columns, rows)
+
+        query = insert(SaleDailyRollup).from_select(columns, rows)
+        return query.on_conflict_do_update(
+            constraint="idx_unique_sale_daily_rollup",
+            set_={
+                "revenue": SaleDailyRollup.revenue + query.excluded.revenue,
+                "quantity": SaleDailyRollup.quantity + query.excluded.quantity,
+                "sale_count": (
+                    SaleDailyRollup.sale_count + query.excluded.sale_count
+                ),
+            },
+        )
+
+    @classmethod
+    async def update_rollup(
+        cls, *, session: AsyncSession, rows: Select | list[dict]
+    ) -> None:
+        await session.execute(cls.get_update_rollup_query(rows))
+
+    @classmethod
+    async def rebuild_rollup(cls, *, session: AsyncSession) -> None:
+        """Recalculate the whole rollup from sales."""
+        # changes of sales wait until the rollup is rebuilt
+        await session.execute(
+            text("LOCK TABLE sale_daily_rollup IN EXCLUSIVE MODE")
+        )
+        await session.execute(delete(SaleDailyRollup))
+        await cls.update_rollup(
+            session=session, rows=cls.get_rollup_rows_query(true())
+        )
+        await session.commit()
+
     @classmethod
     def get_products_details(
         cls, sale: Sale
@@ -1,18 +1,30 @@
-from decimal import Decimal
+from dataclasses import asdict
+from datetime import datetime
+from typing import Annotated, Literal
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from .schemas import (
+    SALE_PRODUCTS_OPERATIONS,
+    SaleBatchResultSchema,
+    SaleFiltersSchema,
+    SaleIdsFiltersSchema,
     SaleProductSchema,
+    SaleReportSchema,
     SaleSchema,
     SaleSchemaCreate,
     SaleSchemaDetail,
+    SaleSchemaSparse,
     SaleSchemaUpdatePartial,
+    SaleTimeseriesSchema,
     SaleProductSchemaCreate,
     SaleProductSchemaUpdatePartial,
 
 )
 from .repository import SaleRepository
+from app.config import settings
 from app.db.database import database
 from app.utils.exceptions import (
     DBIntegrityException,
@@ -20,41 +32,143 @@ from app.utils.exceptions import (
     InvalidParameterException,
     get_http_exceptions_description,
 )
-from app.utils.shemas import CreateResultSchema
+from app.utils.export import EXPORT_FORMAT, EXPORT_MEDIA_TYPES, export_chunks
+from app.utils.pagination import PAGINATION_LIMIT
+from app.utils.serialization import serialized_response
+from app.utils.shemas import CreateResultSchema, PageSchema
 
 
 router = APIRouter(
     prefix="/sales",
     tags=["Продажи"],
-    dependencies=[Depends(database.session_dependency)],
 )
 
 
 @router.get(
     "",
-    responses=get_http_exceptions_description(InvalidParameterException)
+    responses=get_http_exceptions_description(InvalidParameterException),
+    response_model_exclude_unset=True,
 )
+@serialized_response(exclude_unset=True)
 async def get_sales(
-    session: AsyncSession = Depends(database.session_dependency),
-    city_id: int | None = None,
-    store_id: int | None = None,
-    product_id: int | None = None,
-    days: int | None = None,
-    min_amount: Decimal | None = None,
-    max_amount: Decimal | None = None,
-    min_quantity: int | None = None,
-    max_quantity: int | None = None,
-) -> list[SaleSchema]:
-    return await SaleRepository.get_objects(
+    filters: Annotated[SaleFiltersSchema, Depends()],
+    response: Response,
+    session: AsyncSession = Depends(database.read_session_dependency),
+    limit: PAGINATION_LIMIT = settings.PAGINATION_DEFAULT_LIMIT,
+    after: str | None = None,
+    fields: str | None = None,
+    view: Literal["full", "summary"] = "full",
+    count: Literal["exact", "estimated"] | None = None,
+) -> PageSchema[SaleSchemaSparse]:
+    if count is not None:
+        total_count = await SaleRepository.count_objects(
+            session=session,
+            estimated=count == "estimated",
+            **asdict(filters),
+        )
+        response.headers["X-Total-Count"] = str(total_count)
+
+    selected_fields = None
+    if fields is not None:
+        selected_fields = fields.split(",")
+    elif view == "summary":
+        selected_fields = SaleRepository.summary_fields
+
+    return await SaleRepository.get_page(
         session=session,
-        city_id=city_id,
-        store_id=store_id,
-        product_id=product_id,
-        days=days,
-        min_amount=min_amount,
-        max_amount=max_amount,
-        min_quantity=min_quantity,
-        max_quantity=max_quantity,
+        limit=limit,
+        after=after,
+        fields=selected_fields,
+        **asdict(filters),
+    )
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+)
+async def export_sales(
+    filters: Annotated[SaleFiltersSchema, Depends()],
+    request: Request,
+    format: EXPORT_FORMAT = "ndjson",
+) -> StreamingResponse:
+    engine = database.get_read_engine(request)
+
+    async def sales_chunks():
+        # session of dependency is closed before the response is streamed,
+        # so the export uses its own session
+        async with database.async_session_maker(bind=engine) as session:
+            async for sales in SaleRepository.stream_objects(
+                session=session,
+                chunk_size=settings.EXPORT_CHUNK_SIZE,
+                **asdict(filters),
+            ):
+                yield [
+                    SaleSchema.model_validate(sale, from_attributes=True)
+                    for sale in sales
+                ]
+
+    return StreamingResponse(
+        export_chunks(
+            sales_chunks(),
+            format,
+            csv_fields=("id", "store_id", "total_amount", "total_quantity"),
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+    )
+
+
+@router.get(
+    "/timeseries",
+    responses=get_http_exceptions_description(InvalidParameterException),
+)
+@serialized_response()
+async def get_sales_timeseries(
+    filters: Annotated[SaleIdsFiltersSchema, Depends()],
+    start: Annotated[datetime, Query(alias="from")],
+    end: Annotated[datetime, Query(alias="to")],
+    bucket: Literal["hour", "day", "week"] = "day",
+    session: AsyncSession = Depends(database.read_session_dependency),
+) -> list[SaleTimeseriesSchema]:
+    return await SaleRepository.get_timeseries(
+        session=session,
+        bucket=bucket,
+        start=start,
+        end=end,
+        **asdict(filters),
+    )
+
+
+@router.get("/reports/by-city")
+@serialized_response()
+async def get_sales_report_by_city(
+    filters: Annotated[SaleFiltersSchema, Depends()],
+    session: AsyncSession = Depends(database.read_session_dependency),
+) -> list[SaleReportSchema]:
+    return await SaleRepository.get_report(
+        session=session, group_by="city", **asdict(filters)
+    )
+
+
+@router.get("/reports/by-store")
+@serialized_response()
+async def get_sales_report_by_store(
+    filters: Annotated[SaleFiltersSchema, Depends()],
+    session: AsyncSession = Depends(database.read_session_dependency),
+) -> list[SaleReportSchema]:
+    return await SaleRepository.get_report(
+        session=session, group_by="store", **asdict(filters)
+    )
+
+
+@router.get("/reports/by-product")
+@serialized_response()
+async def get_sales_report_by_product(
+    filters: Annotated[SaleFiltersSchema, Depends()],
+    session: AsyncSession = Depends(database.read_session_dependency),
+) -> list[SaleReportSchema]:
+    return await SaleRepository.get_report(
+        session=session, group_by="product", **asdict(filters)
     )
 
 
@@ -63,7 +177,8 @@ async def get_sales(
     responses=get_http_exceptions_description(NotFoundException),
 )
 async def get_sale(
-    sale_id: int, session: AsyncSession = Depends(database.session_dependency)
+    sale_id: int,
+    session: AsyncSession = Depends(database.read_session_dependency),
 ) -> SaleSchema:
     return await SaleRepository.get_object(session=session, object_id=sale_id)
 
@@ -83,6 +198,21 @@ async def create_sale(
     return CreateResultSchema(id=sale_id)
 
 
+@router.post("/batch")
+async def create_sales(
+    sales_data: Annotated[
+        list[SaleSchemaCreate],
+        Body(max_length=settings.SALES_BATCH_MAX_SIZE),
+    ],
+    session: AsyncSession = Depends(database.session_dependency),
+) -> list[SaleBatchResultSchema]:
+    return await SaleRepository.create_objects(
+        session=session,
+        data=sales_data,
+        chunk_size=settings.SALES_BATCH_CHUNK_SIZE,
+    )
+
+
 @router.patch(
     "/{sale_id}",
     responses=get_http_exceptions_description(
@@ -122,7 +252,7 @@ async def delete_sale(
 )
 async def get_products(
     sale_id: int,
-    session: AsyncSession = Depends(database.session_dependency),
+    session: AsyncSession = Depends(database.read_session_dependency),
 ) -> SaleSchemaDetail:
     return await SaleRepository.get_products(
         session=session,
@@ -149,6 +279,38 @@ async def add_product(
     )
 
 
+@router.patch(
+    "/{sale_id}/products",
+    responses=get_http_exceptions_description(NotFoundException),
+)
+async def change_products_in_sale(
+    sale_id: int,
+    operations: SALE_PRODUCTS_OPERATIONS,
+    session: AsyncSession = Depends(database.session_dependency),
+) -> SaleSchemaDetail:
+    return await SaleRepository.change_products(
+        session=session,
+        sale_id=sale_id,
+        operations=operations,
+    )
+
+
+@router.post(
+    "/{sale_id}/products/increment",
+    responses=get_http_exceptions_description(NotFoundException),
+)
+async def increment_product_in_sale(
+    sale_id: int,
+    product_data: SaleProductSchemaCreate,
+    session: AsyncSession = Depends(database.session_dependency),
+) -> SaleProductSchema:
+    return await SaleRepository.increment_product(
+        session=session,
+        sale_id=sale_id,
+        product_data=product_data,
+    )
+
+
 @router.patch(
     "/{sale_id}/products/{product_id}",
     responses=get_http_exceptions_description(
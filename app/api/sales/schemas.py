@@ -1,6 +1,10 @@
+from dataclasses import dataclass
+from datetime import datetime
 from decimal import Decimal
+from typing import Annotated, Literal
 
-from pydantic import BaseModel, field_validator
+from fastapi import Query
+from pydantic import AfterValidator, BaseModel, Field, field_validator
 
 # from app.api.products.schemas import ProductSchema
 from app.utils.validators import (
@@ -35,6 +39,35 @@ class SaleProductSchema(SaleProductSchemaBase):
         return price_validator(value)
 
 
+class SaleProductOperationSchema(SaleProductSchemaCreate):
+    # add increases quantity of product in sale, set replaces it,
+    # both add product to sale, if it is not there
+    op: Literal["add", "set"]
+
+
+class SaleProductRemoveSchema(BaseModel):
+    op: Literal["remove"]
+    product_id: int
+
+
+def operations_validator(
+    operations: list[SaleProductOperationSchema | SaleProductRemoveSchema],
+) -> list[SaleProductOperationSchema | SaleProductRemoveSchema]:
+    ids_validator([operation.product_id for operation in operations])
+    return operations
+
+
+SALE_PRODUCTS_OPERATIONS = Annotated[
+    list[
+        Annotated[
+            SaleProductOperationSchema | SaleProductRemoveSchema,
+            Field(discriminator="op"),
+        ]
+    ],
+    AfterValidator(operations_validator),
+]
+
+
 class ProductSchemaWithUnitPrice(SaleProductSchemaBase):
     id: int
     name: str
@@ -45,6 +78,38 @@ class ProductSchemaWithUnitPrice(SaleProductSchemaBase):
         return price_validator(value)
 
 
+# filters are dataclasses, not pydantic models, because they are used as
+# dependencies and list query parameters must be declared by Query
+@dataclass
+class SaleIdsFiltersSchema:
+    city_id: Annotated[list[int] | None, Query()] = None
+    store_id: Annotated[list[int] | None, Query()] = None
+    product_id: Annotated[list[int] | None, Query()] = None
+
+
+@dataclass
+class SaleFiltersSchema(SaleIdsFiltersSchema):
+    days: int | None = None
+    min_amount: Decimal | None = None
+    max_amount: Decimal | None = None
+    min_quantity: int | None = None
+    max_quantity: int | None = None
+
+
+class SaleReportSchema(BaseModel):
+    id: int
+    revenue: Decimal
+    quantity: int
+    sales_count: int
+
+
+class SaleTimeseriesSchema(BaseModel):
+    bucket: datetime
+    revenue: Decimal
+    quantity: int
+    sales_count: int
+
+
 class SaleSchemaBase(BaseModel):
     store_id: int
 
@@ -56,6 +121,16 @@ class SaleSchema(SaleSchemaBase):
     total_quantity: int
 
 
+# sale with only selected fields, unselected fields are excluded from
+# response as unset
+class SaleSchemaSparse(BaseModel):
+    id: int
+    store_id: int | None = None
+    products: list[SaleProductSchema] | None = None
+    total_amount: Decimal | None = None
+    total_quantity: int | None = None
+
+
 class SaleSchemaDetail(SaleSchemaBase):
     id: int
     products_details: list[ProductSchemaWithUnitPrice]
@@ -76,5 +151,10 @@ class SaleSchemaCreate(SaleSchemaBase):
         return value
 
 
+class SaleBatchResultSchema(BaseModel):
+    id: int | None = None
+    error: str | None = None
+
+
 class SaleSchemaUpdatePartial(SaleSchemaBase):
     store_id: int | None = None
@@ -13,6 +13,7 @@ class Store(UniqueNamed):
     id: Mapped[INT_PK]
     city_id: Mapped[int] = mapped_column(
         ForeignKey("city.id", ondelete="CASCADE"),
+        index=True,
     )
 
     city: Mapped["City"] = relationship(back_populates="stores")
@@ -1,6 +1,9 @@
 from .models import Store
-from app.utils.repository import BaseRepository
+from app.db.snapshots import TableSnapshot
+from app.utils.repository import UniqueNamedRepository
 
 
-class StoreRepository(BaseRepository):
+class StoreRepository(UniqueNamedRepository):
     model = Store
+    versioned = True
+    snapshot = TableSnapshot(Store)
@@ -1,39 +1,69 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
 from .schemas import StoreSchema, StoreSchemaCreate, StoreSchemaUpdatePartial
+from .models import Store
 from .repository import StoreRepository
+from app.config import settings
 from app.db.database import database
+from app.utils.bulk_import import (
+    IMPORT_FORMAT,
+    IMPORT_ON_CONFLICT,
+    import_file,
+    spool_chunks,
+)
+from app.utils.etag import etag_dependency
 from app.utils.exceptions import (
     DBIntegrityException,
+    InvalidFileException,
+    InvalidParameterException,
     NotFoundException,
     get_http_exceptions_description,
 )
-from app.utils.shemas import CreateResultSchema
+from app.utils.pagination import PAGINATION_LIMIT
+from app.utils.serialization import serialized_response
+from app.utils.shemas import (
+    CreateResultSchema,
+    ImportResultSchema,
+    PageSchema,
+)
 
 router = APIRouter(
     prefix="/stores",
     tags=["Магазины"],
-    dependencies=[Depends(database.session_dependency)],
 )
 
 
-@router.get("")
+@router.get(
+    "",
+    dependencies=[Depends(etag_dependency(Store.__tablename__))],
+    responses=get_http_exceptions_description(InvalidParameterException),
+)
+@serialized_response()
 async def get_stores(
-    session: AsyncSession = Depends(database.session_dependency),
-) -> list[StoreSchema]:
-    return await StoreRepository.get_objects(session=session)
+    session: AsyncSession = Depends(database.read_session_dependency),
+    limit: PAGINATION_LIMIT = settings.PAGINATION_DEFAULT_LIMIT,
+    after: str | None = None,
+) -> PageSchema[StoreSchema]:
+    return await StoreRepository.get_page(
+        session=session,
+        limit=limit,
+        after=after,
+        cached=True,
+    )
 
 
 @router.get(
     "/{store_id}",
+    dependencies=[Depends(etag_dependency(Store.__tablename__))],
     responses=get_http_exceptions_description(NotFoundException),
 )
 async def get_store(
-    store_id: int, session: AsyncSession = Depends(database.session_dependency)
+    store_id: int,
+    session: AsyncSession = Depends(database.read_session_dependency),
 ) -> StoreSchema:
     return await StoreRepository.get_object(
-        session=session, object_id=store_id
+        session=session, object_id=store_id, cached=True
     )
 
 
@@ -51,6 +81,27 @@ async def create_store(
     return CreateResultSchema(id=store_id)
 
 
+@router.post(
+    "/import",
+    responses=get_http_exceptions_description(InvalidFileException),
+)
+async def import_stores(
+    request: Request,
+    session: AsyncSession = Depends(database.session_dependency),
+    format: IMPORT_FORMAT = "csv",
+    on_conflict: IMPORT_ON_CONFLICT = "reject",
+) -> ImportResultSchema:
+    with await spool_chunks(request.stream()) as file:
+        return await import_file(
+            session=session,
+            repository=StoreRepository,
+            file=file,
+            format=format,
+            schema=StoreSchemaCreate,
+            on_conflict=on_conflict,
+        )
+
+
 @router.patch(
     "/{store_id}",
     responses=get_http_exceptions_description(
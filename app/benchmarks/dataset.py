@@ -0,0 +1,104 @@
+"""Module fills the test database with a generated dataset for benchmarks."""
+
+from sqlalchemy import text, true
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.abstract_models import Base
+from app.api.cities.models import City  # noqa: F401
+from app.api.stores.models import Store  # noqa: F401
+from app.api.products.models import Product  # noqa: F401
+from app.api.sales.models import Sale, SaleProducts  # noqa: F401
+from app.api.sales.repository import SaleRepository
+
+
+# order is important
+DATASET_QUERIES = (
+    "SELECT setseed(0.42)",
+    """
+    INSERT INTO city (name)
+    SELECT 'city ' || i FROM generate_series(1, :cities) AS i
+    """,
+    """
+    INSERT INTO store (name, city_id)
+    SELECT 'store ' || i, 1 + i % :cities
+    FROM generate_series(1, :stores) AS i
+    """,
+    """
+    INSERT INTO product (name, price)
+    SELECT 'product ' || i, round((1 + random() * 999)::numeric, 2)
+    FROM generate_series(1, :products) AS i
+    """,
+    # sales are appended in time order, one every 30 seconds
+    """
+    INSERT INTO sale (store_id, created_at)
+    SELECT
+        1 + i % :stores,
+        TIMEZONE('utc', now()) - (:sales - i) * interval '30 seconds'
+    FROM generate_series(1, :sales) AS i
+    """,
+    # from 1 to 5 different products in every sale
+    """
+    INSERT INTO sale_products (sale_id, product_id, quantity, unit_price)
+    SELECT sale.id, product.id, 1 + (random() * 4)::int, product.price
+    FROM sale
+    CROSS JOIN LATERAL (
+        SELECT DISTINCT
+            1 + (sale.id::bigint * 7919 + k * 104729) % :products AS id
+        FROM generate_series(1, 1 + sale.id % 5) AS k
+    ) AS line
+    JOIN product ON product.id = line.id
+    """,
+    """
+    UPDATE sale
+    SET total_amount = totals.total_amount,
+        total_quantity = totals.total_quantity
+    FROM (
+        SELECT
+            sale_id,
+            sum(unit_price * quantity) AS total_amount,
+            sum(quantity) AS total_quantity
+        FROM sale_products
+        GROUP BY sale_id
+    ) AS totals
+    WHERE sale.id = totals.sale_id
+    """,
+)
+
+
+async def create_dataset(
+    engine: AsyncEngine,
+    *,
+    sales: int,
+    cities: int = 10,
+    stores: int = 100,
+    products: int = 1000,
+) -> None:
+    params = {
+        "cities": cities,
+        "stores": stores,
+        "products": products,
+        "sales": sales,
+    }
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+        for query in DATASET_QUERIES:
+            used_params = {
+                key: value for key, value in params.items()
+                if f":{key}" in query
+            }
+            await connection.execute(text(query), used_params)
+
+        await connection.execute(
+            SaleRepository.get_update_rollup_query(
+                SaleRepository.get_rollup_rows_query(true())
+            )
+        )
+
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(
+            isolation_level="AUTOCOMMIT"
+        )
+        await connection.execute(text("VACUUM ANALYZE"))
@@ -0,0 +1,89 @@
+"""
+Benchmark of products prices update.
+
+Compares updating prices one by one, every product in own session as
+separate PATCH /products/{product_id} requests do, with one bulk upsert.
+Price list changes half of products and adds 10% of new ones.
+Time of HTTP requests is not included.
+
+Usage: python -m app.benchmarks.products_bulk [products count]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.products.repository import ProductRepository
+from app.api.products.schemas import (
+    ProductSchemaCreate,
+    ProductSchemaUpdatePartial,
+)
+from app.benchmarks.dataset import create_dataset
+from app.config import settings
+
+
+def generate_prices(products_count: int) -> list[tuple[int, Decimal]]:
+    """Return pairs of number of product and its new price."""
+    random.seed(42)
+    numbers = random.sample(
+        range(1, products_count * 11 // 10 + 1), products_count * 6 // 10
+    )
+    return [
+        (number, Decimal(random.randint(100, 100_000)) / 100)
+        for number in numbers
+    ]
+
+
+async def main(products_count: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    prices = generate_prices(products_count)
+
+    # dataset names products "product {id}"
+    await create_dataset(engine, products=products_count, sales=0)
+    start = time.perf_counter()
+    for number, price in prices:
+        async with session_maker() as session:
+            if number <= products_count:
+                await ProductRepository.update_partial_object(
+                    session=session,
+                    object_id=number,
+                    data=ProductSchemaUpdatePartial(price=price),
+                )
+            else:
+                await ProductRepository.create_object(
+                    session=session,
+                    data=ProductSchemaCreate(
+                        name=f"product {number}", price=price
+                    ),
+                )
+    one_by_one = time.perf_counter() - start
+
+    await create_dataset(engine, products=products_count, sales=0)
+    start = time.perf_counter()
+    async with session_maker() as session:
+        await ProductRepository.upsert_prices(
+            session=session,
+            data=[
+                ProductSchemaCreate(name=f"product {number}", price=price)
+                for number, price in prices
+            ],
+            chunk_size=settings.PRODUCTS_BULK_CHUNK_SIZE,
+        )
+    bulk = time.perf_counter() - start
+
+    print(
+        f"{len(prices)} prices: one by one {len(prices) / one_by_one:.0f} "
+        f"products/s, bulk {len(prices) / bulk:.0f} products/s, "
+        f"{one_by_one / bulk:.0f}x"
+    )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
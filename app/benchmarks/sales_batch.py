@@ -0,0 +1,73 @@
+"""
+Benchmark of sales creation.
+
+Compares creating sales one by one, every sale in own session as
+separate POST /sales requests do, with creating them by one batch.
+Time of HTTP requests is not included.
+
+Usage: python -m app.benchmarks.sales_batch [sales count]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.sales.repository import SaleRepository
+from app.api.sales.schemas import SaleProductSchemaCreate, SaleSchemaCreate
+from app.benchmarks.dataset import create_dataset
+from app.config import settings
+
+
+def generate_sales_data(count: int) -> list[SaleSchemaCreate]:
+    random.seed(42)
+    return [
+        SaleSchemaCreate(
+            store_id=random.randint(1, 100),
+            products=[
+                SaleProductSchemaCreate(product_id=product_id, quantity=1)
+                for product_id in random.sample(
+                    range(1, 1001), random.randint(1, 5)
+                )
+            ],
+        )
+        for _ in range(count)
+    ]
+
+
+async def main(sales_count: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    await create_dataset(engine, sales=10_000)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    sales_data = generate_sales_data(sales_count)
+
+    start = time.perf_counter()
+    for sale_data in sales_data:
+        async with session_maker() as session:
+            await SaleRepository.create_object(
+                session=session, data=sale_data
+            )
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    async with session_maker() as session:
+        await SaleRepository.create_objects(
+            session=session,
+            data=sales_data,
+            chunk_size=settings.SALES_BATCH_CHUNK_SIZE,
+        )
+    batch = time.perf_counter() - start
+
+    print(
+        f"{sales_count} sales: one by one {sales_count / one_by_one:.0f} "
+        f"sales/s, batch {sales_count / batch:.0f} sales/s, "
+        f"{one_by_one / batch:.0f}x"
+    )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
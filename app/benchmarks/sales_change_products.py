@@ -0,0 +1,111 @@
+"""
+Benchmark of changing products of sales.
+
+Compares editing a basket of a sale line by line, every line in own
+session as separate POST, PATCH and DELETE /sales/{sale_id}/products/...
+requests do, with one PATCH /sales/{sale_id}/products request.
+Every edit adds two products, changes quantity of one and removes one.
+Time of HTTP requests is not included.
+
+Usage: python -m app.benchmarks.sales_change_products [edits count]
+"""
+
+import asyncio
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.sales.repository import SaleRepository
+from app.api.sales.schemas import (
+    SaleProductOperationSchema,
+    SaleProductRemoveSchema,
+    SaleProductSchemaCreate,
+    SaleProductSchemaUpdatePartial,
+    SaleSchemaCreate,
+)
+from app.benchmarks.dataset import create_dataset
+from app.config import settings
+
+
+async def create_sales(session_maker, count: int) -> list[int]:
+    """Create sales with products 1 and 2, which edits change."""
+    async with session_maker() as session:
+        results = await SaleRepository.create_objects(
+            session=session,
+            data=[
+                SaleSchemaCreate(
+                    store_id=1,
+                    products=[
+                        SaleProductSchemaCreate(product_id=1, quantity=1),
+                        SaleProductSchemaCreate(product_id=2, quantity=1),
+                    ],
+                )
+                for _ in range(count)
+            ],
+            chunk_size=settings.SALES_BATCH_CHUNK_SIZE,
+        )
+    return [result["id"] for result in results]
+
+
+async def edit_by_lines(session_maker, sale_id: int) -> None:
+    for product_id in (3, 4):
+        async with session_maker() as session:
+            await SaleRepository.add_product(
+                session=session,
+                sale_id=sale_id,
+                product_data=SaleProductSchemaCreate(
+                    product_id=product_id, quantity=1
+                ),
+            )
+    async with session_maker() as session:
+        await SaleRepository.update_partial_product(
+            session=session,
+            sale_id=sale_id,
+            product_id=1,
+            product_data=SaleProductSchemaUpdatePartial(quantity=5),
+        )
+    async with session_maker() as session:
+        await SaleRepository.delete_product(
+            session=session, sale_id=sale_id, product_id=2
+        )
+
+
+async def edit_at_once(session_maker, sale_id: int) -> None:
+    async with session_maker() as session:
+        await SaleRepository.change_products(
+            session=session,
+            sale_id=sale_id,
+            operations=[
+                SaleProductOperationSchema(op="add", product_id=3, quantity=1),
+                SaleProductOperationSchema(op="add", product_id=4, quantity=1),
+                SaleProductOperationSchema(op="set", product_id=1, quantity=5),
+                SaleProductRemoveSchema(op="remove", product_id=2),
+            ],
+        )
+
+
+async def main(edits_count: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    await create_dataset(engine, sales=10_000)
+
+    timings = []
+    for edit in (edit_by_lines, edit_at_once):
+        sales_ids = await create_sales(session_maker, edits_count)
+        start = time.perf_counter()
+        for sale_id in sales_ids:
+            await edit(session_maker, sale_id)
+        timings.append((time.perf_counter() - start) / edits_count * 1000)
+
+    by_lines, at_once = timings
+    print(
+        f"{edits_count} edits: by lines {by_lines:.2f} ms, "
+        f"at once {at_once:.2f} ms, {by_lines / at_once:.1f}x"
+    )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
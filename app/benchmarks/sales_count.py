@@ -0,0 +1,63 @@
+"""
+Benchmark of sales count.
+
+Compares exact count of filtered sales with count estimated by planner,
+and how far the estimate is from the exact count.
+
+Usage: python -m app.benchmarks.sales_count [sales count]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.sales.repository import SaleRepository
+from app.benchmarks.dataset import create_dataset
+from app.config import settings
+
+
+FILTERS = (
+    {},
+    {"store_id": 1},
+    {"city_id": 1, "min_amount": 1000},
+    {"product_id": [1, 2]},
+)
+
+
+async def count_time(
+    session: AsyncSession, estimated: bool, filters: dict, repeat: int = 5
+) -> tuple[int, float]:
+    """Return count and median time of counting in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = await SaleRepository.count_objects(
+            session=session, estimated=estimated, **filters
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return count, statistics.median(timings)
+
+
+async def main(sales_count: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    await create_dataset(engine, sales=sales_count)
+
+    async with AsyncSession(engine) as session:
+        for filters in FILTERS:
+            exact, exact_time = await count_time(session, False, filters)
+            estimated, estimated_time = await count_time(
+                session, True, filters
+            )
+            print(
+                f"{filters}: exact {exact} in {exact_time:.1f} ms, "
+                f"estimated {estimated} in {estimated_time:.1f} ms"
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,93 @@
+"""
+Benchmark of adding products to sales.
+
+Compares adding a product to a sale or increasing its quantity,
+as POST /sales/{sale_id}/products and PATCH /sales/{sale_id}/products/...
+requests do, with one POST /sales/{sale_id}/products/increment request.
+Every change is made in own session. Time of HTTP requests is not included.
+
+Usage: python -m app.benchmarks.sales_increment_product [changes count]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.sales.repository import SaleRepository
+from app.api.sales.schemas import (
+    SaleProductSchemaCreate,
+    SaleProductSchemaUpdatePartial,
+)
+from app.benchmarks.dataset import create_dataset
+from app.config import settings
+
+
+def generate_changes(count: int) -> list[tuple[int, int]]:
+    """Return pairs of sale and product, products repeat in sales."""
+    random.seed(42)
+    return [
+        (random.randint(1, 100), random.randint(1, 20)) for _ in range(count)
+    ]
+
+
+async def main(changes_count: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    changes = generate_changes(changes_count)
+
+    await create_dataset(engine, sales=10_000)
+    start = time.perf_counter()
+    for sale_id, product_id in changes:
+        async with session_maker() as session:
+            try:
+                sale_product = await SaleRepository.get_sale_product(
+                    session=session, sale_id=sale_id, product_id=product_id
+                )
+            except HTTPException:
+                await SaleRepository.add_product(
+                    session=session,
+                    sale_id=sale_id,
+                    product_data=SaleProductSchemaCreate(
+                        product_id=product_id, quantity=1
+                    ),
+                )
+                continue
+            await SaleRepository.update_partial_product(
+                session=session,
+                sale_id=sale_id,
+                product_id=product_id,
+                product_data=SaleProductSchemaUpdatePartial(
+                    quantity=sale_product.quantity + 1
+                ),
+            )
+    add_or_update = time.perf_counter() - start
+
+    await create_dataset(engine, sales=10_000)
+    start = time.perf_counter()
+    for sale_id, product_id in changes:
+        async with session_maker() as session:
+            await SaleRepository.increment_product(
+                session=session,
+                sale_id=sale_id,
+                product_data=SaleProductSchemaCreate(
+                    product_id=product_id, quantity=1
+                ),
+            )
+    increment = time.perf_counter() - start
+
+    print(
+        f"{changes_count} changes: add or update "
+        f"{add_or_update / changes_count * 1000:.2f} ms, increment "
+        f"{increment / changes_count * 1000:.2f} ms, "
+        f"{add_or_update / increment:.1f}x"
+    )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,61 @@
+"""
+Benchmark of building sales queries.
+
+Compares the cost of a sales query for one request, when the query is built
+for every request and when it is taken from the SaleRepository cache.
+SQLAlchemy caches compiled SQL by the query cache key, so the key is
+generated for every request in both cases.
+Database is not used.
+
+Usage: python -m app.benchmarks.sales_query_compile [repeat count]
+"""
+
+import sys
+import timeit
+
+from sqlalchemy.dialects.postgresql.asyncpg import dialect
+
+from app.api.sales.repository import SaleRepository
+from app.config import settings
+
+
+FILTERS = {
+    "city_id": [1, 2],
+    "product_id": [1],
+    "days": 30,
+    "min_amount": 1000,
+    "max_quantity": 8,
+}
+
+
+def build_query():
+    return SaleRepository.build_objects_query.__wrapped__(
+        SaleRepository, frozenset(FILTERS), True, True
+    )
+
+
+def get_cached_query():
+    query, _ = SaleRepository.get_objects_query(
+        limit=settings.PAGINATION_DEFAULT_LIMIT, after=1, **FILTERS
+    )
+    return query
+
+
+def main(repeat: int) -> None:
+    postgresql = dialect()
+    cases = {
+        "build and compile": lambda: build_query().compile(dialect=postgresql),
+        "build and cache key": lambda: build_query()._generate_cache_key(),
+        "cached query and cache key": lambda: (
+            get_cached_query()._generate_cache_key()
+        ),
+    }
+    for name, case in cases.items():
+        seconds = timeit.timeit(case, number=repeat)
+        print(f"{name}: {seconds / repeat * 1_000_000:.1f} us per request")
+
+    print(f"cache: {SaleRepository.get_query_cache_info()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
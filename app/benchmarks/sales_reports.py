@@ -0,0 +1,50 @@
+"""
+Benchmark of sales reports.
+
+Compares reports grouped over sales with reports read from the daily rollup.
+
+Usage: python -m app.benchmarks.sales_reports [sales count]
+"""
+
+import asyncio
+import sys
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.sales.repository import SaleRepository
+from app.benchmarks.dataset import create_dataset
+from app.benchmarks.utils import execution_time
+from app.config import settings
+
+
+REPORTS = (
+    ("city", {}),
+    ("store", {"city_id": 1}),
+    ("product", {}),
+)
+
+
+async def main(sales_count: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    await create_dataset(engine, sales=sales_count)
+
+    async with engine.connect() as connection:
+        for group_by, filters in REPORTS:
+            before = await execution_time(
+                connection,
+                SaleRepository.get_sales_report_query(group_by, **filters),
+            )
+            after = await execution_time(
+                connection,
+                SaleRepository.get_rollup_report_query(group_by, **filters),
+            )
+            print(
+                f"by {group_by} {filters}: before {before:.1f} ms, "
+                f"after {after:.1f} ms"
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,68 @@
+"""
+Benchmark of serialization of sales pages.
+
+Compares serialization of a page of sales as FastAPI does with response
+model (validation of objects by attributes, conversion to JSON
+compatible data and encoding) with serialization by serialized_response
+of the endpoint. Time of reading sales from the database is not included.
+
+Usage: python -m app.benchmarks.sales_serialization [repeats]
+"""
+
+import asyncio
+import sys
+import time
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.sales.repository import SaleRepository
+from app.api.sales.schemas import SaleSchemaSparse
+from app.benchmarks.dataset import create_dataset
+from app.config import settings
+from app.utils.serialization import serialize
+from app.utils.shemas import PageSchema
+
+
+PAGE_TYPE = PageSchema[SaleSchemaSparse]
+
+
+def validate_and_serialize(adapter: TypeAdapter, page) -> bytes:
+    value = adapter.validate_python(page, from_attributes=True)
+    content = adapter.dump_python(value, mode="json", exclude_unset=True)
+    return JSONResponse(content).body
+
+
+async def main(repeats: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    await create_dataset(engine, sales=10_000)
+
+    async with session_maker() as session:
+        page = await SaleRepository.get_page(
+            session=session, limit=settings.PAGINATION_MAX_LIMIT
+        )
+    adapter = TypeAdapter(PAGE_TYPE)
+
+    timings = []
+    for serialize_page in (
+        lambda: validate_and_serialize(adapter, page),
+        lambda: serialize(PAGE_TYPE, page, exclude_unset=True),
+    ):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            serialize_page()
+        timings.append((time.perf_counter() - start) / repeats * 1000)
+
+    validated, serialized = timings
+    print(
+        f"page of {len(page['items'])} sales: validated {validated:.2f} ms, "
+        f"serialized {serialized:.2f} ms, {validated / serialized:.1f}x"
+    )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
@@ -0,0 +1,91 @@
+"""
+Benchmark of sales amount and quantity filters.
+
+Compares correlated scalar subqueries for every totals predicate
+with the query built by SaleRepository.
+
+Usage: python -m app.benchmarks.sales_totals_filters [sales count]
+"""
+
+import asyncio
+import sys
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.sales.models import Sale, SaleProducts
+from app.api.sales.repository import SaleRepository
+from app.benchmarks.dataset import create_dataset
+from app.benchmarks.utils import execution_time
+from app.config import settings
+
+
+FILTERS = {
+    "min_amount": 1000,
+    "max_amount": 3000,
+    "min_quantity": 3,
+    "max_quantity": 8,
+}
+
+
+def correlated_total_amount():
+    return (
+        select(
+            func.coalesce(
+                func.sum(SaleProducts.unit_price * SaleProducts.quantity), 0
+            )
+        )
+        .where(SaleProducts.sale_id == Sale.id)
+        .scalar_subquery()
+    )
+
+
+def correlated_total_quantity():
+    return (
+        select(func.coalesce(func.sum(SaleProducts.quantity), 0))
+        .where(SaleProducts.sale_id == Sale.id)
+        .scalar_subquery()
+    )
+
+
+def correlated_query(limit: int | None = None):
+    query = (
+        select(
+            Sale,
+            correlated_total_amount().label("total_amount"),
+            correlated_total_quantity().label("total_quantity"),
+        )
+        .filter(
+            correlated_total_amount() >= FILTERS["min_amount"],
+            correlated_total_amount() <= FILTERS["max_amount"],
+            correlated_total_quantity() >= FILTERS["min_quantity"],
+            correlated_total_quantity() <= FILTERS["max_quantity"],
+        )
+        .order_by(Sale.id)
+    )
+    return query.limit(limit)
+
+
+async def main(sales_count: int) -> None:
+    engine = create_async_engine(settings.TEST_DATABASE_URL)
+    await create_dataset(engine, sales=sales_count)
+
+    async with engine.connect() as connection:
+        for limit in (None, settings.PAGINATION_DEFAULT_LIMIT):
+            before = await execution_time(
+                connection, correlated_query(limit)
+            )
+            query, params = SaleRepository.get_objects_query(
+                limit=limit, **FILTERS
+            )
+            after = await execution_time(connection, query.params(params))
+            print(
+                f"limit={limit}: before {before:.1f} ms, "
+                f"after {after:.1f} ms"
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,30 @@
+"""Module defines helpers for database benchmarks."""
+
+import statistics
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+def compile_query(query) -> str:
+    return str(
+        query.compile(
+            dialect=postgresql.dialect(),
+            compile_kwargs={"literal_binds": True},
+        )
+    )
+
+
+async def execution_time(
+    connection: AsyncConnection, query, repeat: int = 5
+) -> float:
+    """Return median server side execution time of query in milliseconds."""
+    explain = text(f"EXPLAIN (ANALYZE, FORMAT JSON) {compile_query(query)}")
+
+    timings = []
+    for _ in range(repeat):
+        result = await connection.execute(explain)
+        plan = result.scalar_one()
+        timings.append(plan[0]["Execution Time"])
+    return statistics.median(timings)
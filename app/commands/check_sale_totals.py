@@ -0,0 +1,61 @@
+"""
+Command re-verifies stored totals of sales against their products.
+
+Usage: python -m app.commands.check_sale_totals [--fix]
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.db.database import database
+from app.api.sales.repository import SaleRepository
+
+
+async def check_sale_totals(fix: bool) -> int:
+    async with database.async_session_maker() as session:
+        inconsistent_totals = await SaleRepository.get_inconsistent_totals(
+            session=session
+        )
+
+        for (
+            sale_id,
+            total_amount,
+            actual_amount,
+            total_quantity,
+            actual_quantity,
+        ) in inconsistent_totals:
+            print(
+                f"продажа {sale_id}: "
+                f"сумма {total_amount} != {actual_amount}, "
+                f"количество {total_quantity} != {actual_quantity}"
+            )
+
+        if inconsistent_totals and fix:
+            await SaleRepository.recalculate_totals(
+                session=session,
+                sale_ids=[totals[0] for totals in inconsistent_totals],
+            )
+            # rollup was built from wrong totals
+            await SaleRepository.rebuild_rollup(session=session)
+            print(f"исправлено продаж: {len(inconsistent_totals)}")
+
+    return len(inconsistent_totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Проверка итогов продаж по товарам продаж"
+    )
+    parser.add_argument(
+        "--fix",
+        action="store_true",
+        help="пересчитать неверные итоги",
+    )
+    args = parser.parse_args()
+
+    inconsistent_count = asyncio.run(check_sale_totals(args.fix))
+    if not inconsistent_count:
+        print("итоги всех продаж верны")
+    elif not args.fix:
+        sys.exit(1)
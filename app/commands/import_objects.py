@@ -0,0 +1,89 @@
+"""
+Command imports cities, stores or products from csv or ndjson file.
+Objects with existing names are rejected by default,
+or are skipped or update existing objects by --on-conflict.
+
+Usage: python -m app.commands.import_objects {cities,stores,products} FILE
+    [--format {csv,ndjson}] [--on-conflict {reject,skip,update}]
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+from typing import Any, get_args
+
+from app.db.database import database
+from app.api.cities.repository import CityRepository
+from app.api.cities.schemas import CitySchemaCreate
+from app.api.products.repository import ProductRepository
+from app.api.products.schemas import ProductSchemaCreate
+from app.api.stores.repository import StoreRepository
+from app.api.stores.schemas import StoreSchemaCreate
+from app.utils.bulk_import import (
+    IMPORT_FORMAT,
+    IMPORT_ON_CONFLICT,
+    import_file,
+)
+
+
+IMPORTED_ENTITIES = {
+    "cities": (CityRepository, CitySchemaCreate),
+    "stores": (StoreRepository, StoreSchemaCreate),
+    "products": (ProductRepository, ProductSchemaCreate),
+}
+
+
+async def import_objects(
+    entity: str,
+    path: Path,
+    format: IMPORT_FORMAT,
+    on_conflict: IMPORT_ON_CONFLICT = "reject",
+) -> dict[str, Any]:
+    repository, schema = IMPORTED_ENTITIES[entity]
+    with open(path, encoding="utf-8", newline="") as file:
+        async with database.get_session(database.engine) as session:
+            return await import_file(
+                session=session,
+                repository=repository,
+                file=file,
+                format=format,
+                schema=schema,
+                on_conflict=on_conflict,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Импорт городов, магазинов или товаров из файла"
+    )
+    parser.add_argument("entity", choices=IMPORTED_ENTITIES)
+    parser.add_argument("path", type=Path)
+    parser.add_argument(
+        "--format",
+        choices=("csv", "ndjson"),
+        help="формат файла, по умолчанию определяется по расширению",
+    )
+    parser.add_argument(
+        "--on-conflict",
+        choices=get_args(IMPORT_ON_CONFLICT),
+        default="reject",
+        help=(
+            "объекты с существующими названиями: отклонить (по умолчанию), "
+            "пропустить или обновить существующие"
+        ),
+    )
+    args = parser.parse_args()
+    format = args.format or (
+        "ndjson" if args.path.suffix in (".ndjson", ".jsonl") else "csv"
+    )
+
+    result = asyncio.run(
+        import_objects(args.entity, args.path, format, args.on_conflict)
+    )
+    for rejected_row in result["rejected"]:
+        print(f"строка {rejected_row['row']}: {rejected_row['error']}")
+    print(
+        f"добавлено: {result['inserted']}, обновлено: {result['updated']}, "
+        f"пропущено: {result['skipped']}, "
+        f"отклонено: {len(result['rejected'])}"
+    )
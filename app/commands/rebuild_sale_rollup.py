@@ -0,0 +1,20 @@
+"""
+Command recalculates the daily rollup of sales from sales.
+
+Usage: python -m app.commands.rebuild_sale_rollup
+"""
+
+import asyncio
+
+from app.db.database import database
+from app.api.sales.repository import SaleRepository
+
+
+async def rebuild_sale_rollup() -> None:
+    async with database.async_session_maker() as session:
+        await SaleRepository.rebuild_rollup(session=session)
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_sale_rollup())
+    print("итоги продаж по дням пересчитаны")
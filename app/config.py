@@ -15,6 +15,41 @@ class Settings(BaseSettings):
     DB_PORT: int
     ECHO: bool
     DB_STR_MAX_LEN: int = 255
+    PAGINATION_DEFAULT_LIMIT: int = 100
+    PAGINATION_MAX_LIMIT: int = 1000
+    EXPORT_CHUNK_SIZE: int = 1000
+    TIMESERIES_MAX_BUCKETS: int = 10000
+    QUERY_CACHE_SIZE: int = 512
+    SALES_BATCH_MAX_SIZE: int = 10000
+    # sales of batch are inserted by chunks, every chunk in own savepoint
+    SALES_BATCH_CHUNK_SIZE: int = 1000
+    PRODUCTS_BULK_MAX_SIZE: int = 100000
+    # prices are upserted by chunks, one statement per chunk
+    PRODUCTS_BULK_CHUNK_SIZE: int = 5000
+    # imported file is written to disk, when it exceeds this size in bytes
+    IMPORT_MEMORY_MAX_SIZE: int = 10 * 1024 * 1024
+    # urls of read replicas of the database, GET requests read from them
+    REPLICA_DATABASE_URLS: list[str] = []
+    # client reads from the primary database for this time after write
+    READ_YOUR_WRITES_SECONDS: int = 5
+    # connection pool of every database, see docs of create_engine
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    # seconds to wait for a connection, when the pool is exhausted
+    DB_POOL_TIMEOUT: float = 30
+    # connections older than this are reopened, -1 disables recycling
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    # prepared statements cached by every connection
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # PgBouncer in transaction pooling mode is between the application
+    # and the database, prepared statements are not cached, pool settings
+    # limit connections to PgBouncer
+    DB_PGBOUNCER: bool = False
+    # address of the database itself for LISTEN, which PgBouncer
+    # in transaction pooling mode doesn't support, DB_HOST by default
+    DB_LISTEN_HOST: str | None = None
+    DB_LISTEN_PORT: int | None = None
 
     TEST_POSTGRES_DB: str
     TEST_POSTGRES_USER: str
@@ -32,6 +67,14 @@ class Settings(BaseSettings):
             f"{self.DB_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def LISTEN_DATABASE_URL(self):
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:"
+            f"{self.POSTGRES_PASSWORD}@{self.DB_LISTEN_HOST or self.DB_HOST}:"
+            f"{self.DB_LISTEN_PORT or self.DB_PORT}/{self.POSTGRES_DB}"
+        )
+
     @property
     def TEST_DATABASE_URL(self):
         return (
@@ -31,7 +31,7 @@ class Base(DeclarativeBase):
         """method use in tests"""
         return {
             column.key: getattr(self, column.key)
-            for column in class_mapper(self.__class__).columns
+            for column in class_mapper(self.__class__).local_table.columns
             if column.name not in ("id", "created_at")
         }
 
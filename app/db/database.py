@@ -1,28 +1,137 @@
 from asyncio import current_task
-from sqlalchemy import NullPool
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from itertools import cycle
+from uuid import uuid4
+
+from fastapi import Request, Response
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
     async_scoped_session,
 )
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import settings
+from app.db.pool import InstrumentedNullPool, InstrumentedQueuePool
+
+
+def get_prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+# PgBouncer in transaction pooling mode runs every transaction on any
+# of its connections to the database, so prepared statements are named
+# uniquely and are not reused by other transactions. The application
+# still pools its connections to PgBouncer, because opening a connection
+# costs much more than a transaction, and PgBouncer shares connections
+# to the database between transactions of all pooled connections.
+PGBOUNCER_CONNECT_ARGS = {
+    "statement_cache_size": 0,
+    "prepared_statement_cache_size": 0,
+    "prepared_statement_name_func": get_prepared_statement_name,
+}
 
 # Determine the appropriate database URL
 # and configuration based on the application mode
 if settings.MODE == "TEST":
     DATABASE_URL = settings.TEST_DATABASE_URL
-    DATABASE_KWARGS = {"savemode": True, "poolclass": NullPool}
+    LISTEN_DATABASE_URL = None
+    REPLICA_DATABASE_URLS = []
+    DATABASE_KWARGS = {"savemode": True, "poolclass": InstrumentedNullPool}
 else:
     DATABASE_URL = settings.DATABASE_URL
-    DATABASE_KWARGS = {}
+    LISTEN_DATABASE_URL = settings.LISTEN_DATABASE_URL
+    REPLICA_DATABASE_URLS = settings.REPLICA_DATABASE_URLS
+    DATABASE_KWARGS = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+if settings.DB_PGBOUNCER:
+    DATABASE_KWARGS["connect_args"] = PGBOUNCER_CONNECT_ARGS
+else:
+    DATABASE_KWARGS["connect_args"] = {
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+# cookie of clients, which have written recently
+# and must read from the primary database
+READ_PRIMARY_COOKIE = "read_primary"
+# header and query parameter, by which clients without cookies
+# ask to read from the primary database
+READ_PRIMARY_HEADER = "X-Read-Primary"
+READ_PRIMARY_PARAMETER = "read_primary"
+READ_PRIMARY_VALUES = ("1", "true")
+# key of request state, which is set, when session of request commits
+COMMITTED_STATE = "committed"
+
+
+def reads_primary(request: Request) -> bool:
+    """Return whether client asks to read from the primary database."""
+    return (
+        READ_PRIMARY_COOKIE in request.cookies
+        or request.headers.get(READ_PRIMARY_HEADER, "").lower()
+        in READ_PRIMARY_VALUES
+        or request.query_params.get(READ_PRIMARY_PARAMETER, "").lower()
+        in READ_PRIMARY_VALUES
+    )
+
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware, which sets the read_primary cookie on response
+    to request, which session has committed, so the client reads
+    from the primary database for a while.
+    The cookie is set on any response, including error responses
+    of requests, which failed after commit.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # state is shared with requests of the endpoint and dependencies
+        state = scope.setdefault("state", {})
+
+        async def send_with_cookie(message: Message) -> None:
+            if (
+                message["type"] == "http.response.start"
+                and state.get(COMMITTED_STATE)
+            ):
+                cookie = Response()
+                cookie.set_cookie(
+                    READ_PRIMARY_COOKIE,
+                    "1",
+                    max_age=settings.READ_YOUR_WRITES_SECONDS,
+                    httponly=True,
+                )
+                MutableHeaders(scope=message).append(
+                    "set-cookie", cookie.headers["set-cookie"]
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
 
 
 class Database:
     """
     Class configures and provides access to
     the asynchronous SQLAlchemy database engine and sessions.
+    Reads can be routed to replicas of the database, round-robin.
     """
     def __init__(
         self, url:
@@ -30,9 +139,21 @@ class Database:
             echo:
             bool = False,
             savemode: bool = False,
+            replica_urls: Sequence[str] = (),
+            listen_url: str | None = None,
             **kwaqrgs
     ) -> None:
         self.engine = create_async_engine(url, echo=echo, **kwaqrgs)
+        # notifications are listened on the database itself,
+        # if the engine connects through a pooler
+        self.listen_url = (
+            make_url(listen_url) if listen_url else self.engine.url
+        )
+        self.replica_engines = [
+            create_async_engine(replica_url, echo=echo, **kwaqrgs)
+            for replica_url in replica_urls
+        ]
+        self.next_replica_engine = cycle(self.replica_engines)
         self.savemode = savemode
         self.async_session_maker = async_sessionmaker(
             self.engine,
@@ -48,16 +169,84 @@ class Database:
         )
         return session
 
-    async def session_dependency(self) -> AsyncSession:
-        async with database.engine.connect() as connection:
+    def get_read_engine(self, request: Request) -> AsyncEngine:
+        """
+        Return engine of the next replica.
+        Return engine of the primary, if there are no replicas
+        or client has written recently or asks to read from the primary,
+        so it reads its own writes.
+        """
+        if not self.replica_engines or reads_primary(request):
+            return self.engine
+        return next(self.next_replica_engine)
+
+    @asynccontextmanager
+    async def get_session(
+        self, engine: AsyncEngine
+    ) -> AsyncIterator[AsyncSession]:
+        """
+        Session, which checks out a connection of the engine on first use
+        and returns it to the pool on commit, rollback or close,
+        so requests, which don't use the database, don't hold connections.
+        Changes, which are not committed, are committed on exit.
+        """
+        if self.savemode:
+            async with self.get_savemode_session(engine) as session:
+                yield session
+            return
+
+        async with self.async_session_maker(bind=engine) as session:
+            yield session
+            if session.in_transaction():
+                await session.commit()
+
+    @asynccontextmanager
+    async def get_savemode_session(
+        self, engine: AsyncEngine
+    ) -> AsyncIterator[AsyncSession]:
+        """
+        Session of one connection, which transaction is rolled back
+        on exit, commits of the session don't end it.
+        """
+        async with engine.connect() as connection:
             async with connection.begin() as transaction:
                 scoped_session = self.get_scoped_session()
                 async with (
                     scoped_session(bind=connection) as session
                 ):
                     yield session
-                    if transaction.is_active and self.savemode:
+                    if transaction.is_active:
                         await transaction.rollback()
 
+    async def session_dependency(
+        self, request: Request
+    ) -> AsyncIterator[AsyncSession]:
+        """
+        Session of the primary database, for requests which write.
+        If there are replicas, commit of the session is marked in state
+        of the request, so ReadYourWritesMiddleware sets the cookie.
+        """
+        async with self.get_session(self.engine) as session:
+            if self.replica_engines:
+                def on_commit(committed_session) -> None:
+                    setattr(request.state, COMMITTED_STATE, True)
+
+                event.listen(session.sync_session, "after_commit", on_commit)
+            yield session
 
-database = Database(DATABASE_URL, settings.ECHO, **DATABASE_KWARGS)
+    async def read_session_dependency(
+        self, request: Request
+    ) -> AsyncIterator[AsyncSession]:
+        """Session of a replica or the primary database, for reads."""
+        engine = self.get_read_engine(request)
+        async with self.get_session(engine) as session:
+            yield session
+
+
+database = Database(
+    DATABASE_URL,
+    settings.ECHO,
+    replica_urls=REPLICA_DATABASE_URLS,
+    listen_url=LISTEN_DATABASE_URL,
+    **DATABASE_KWARGS,
+)
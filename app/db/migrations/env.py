@@ -23,6 +23,7 @@ from app.api.cities.models import City
 from app.api.stores.models import Store
 from app.api.products.models import Product
 from app.api.sales.models import Sale, SaleProducts
+from app.db.versions import TableVersion
 from app.config import settings
 
 target_metadata = Base.metadata
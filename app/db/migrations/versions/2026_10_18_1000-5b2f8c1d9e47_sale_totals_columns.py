@@ -0,0 +1,75 @@
+"""Sale totals columns
+
+Revision ID: 5b2f8c1d9e47
+Revises: 31ca556d1f01
+Create Date: 2026-10-18 10:00:12.418305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b2f8c1d9e47"
+down_revision: Union[str, None] = "31ca556d1f01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sale",
+        sa.Column(
+            "total_amount",
+            sa.DECIMAL(precision=14, scale=2),
+            server_default="0",
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "sale",
+        sa.Column(
+            "total_quantity",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+        ),
+    )
+
+    # backfill totals of existing sales
+    op.execute(
+        """
+        UPDATE sale
+        SET total_amount = totals.total_amount,
+            total_quantity = totals.total_quantity
+        FROM (
+            SELECT
+                sale_id,
+                sum(unit_price * quantity) AS total_amount,
+                sum(quantity) AS total_quantity
+            FROM sale_products
+            GROUP BY sale_id
+        ) AS totals
+        WHERE sale.id = totals.sale_id
+        """
+    )
+
+    op.create_index(
+        op.f("ix_sale_total_amount"), "sale", ["total_amount"], unique=False
+    )
+    op.create_index(
+        op.f("ix_sale_total_quantity"),
+        "sale",
+        ["total_quantity"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_sale_total_quantity"), table_name="sale")
+    op.drop_index(op.f("ix_sale_total_amount"), table_name="sale")
+    op.drop_column("sale", "total_quantity")
+    op.drop_column("sale", "total_amount")
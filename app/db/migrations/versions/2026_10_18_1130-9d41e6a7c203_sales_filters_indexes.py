@@ -0,0 +1,78 @@
+"""Sales filters indexes
+
+Revision ID: 9d41e6a7c203
+Revises: 5b2f8c1d9e47
+Create Date: 2026-10-18 11:30:41.027716
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d41e6a7c203"
+down_revision: Union[str, None] = "5b2f8c1d9e47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# CREATE INDEX CONCURRENTLY does not lock writes to large tables,
+# but can not run inside a transaction block
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_sale_store_id_created_at",
+            "sale",
+            ["store_id", "created_at"],
+            unique=False,
+            postgresql_include=["total_amount", "total_quantity"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_sale_created_at_brin",
+            "sale",
+            ["created_at"],
+            unique=False,
+            postgresql_using="brin",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_sale_products_product_id_sale_id",
+            "sale_products",
+            ["product_id", "sale_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f("ix_store_city_id"),
+            "store",
+            ["city_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f("ix_store_city_id"),
+            table_name="store",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_sale_products_product_id_sale_id",
+            table_name="sale_products",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_sale_created_at_brin",
+            table_name="sale",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_sale_store_id_created_at",
+            table_name="sale",
+            postgresql_concurrently=True,
+        )
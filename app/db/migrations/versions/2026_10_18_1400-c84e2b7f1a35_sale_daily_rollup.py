@@ -0,0 +1,119 @@
+"""Sale daily rollup
+
+Revision ID: c84e2b7f1a35
+Revises: 9d41e6a7c203
+Create Date: 2026-10-18 14:00:41.902114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c84e2b7f1a35"
+down_revision: Union[str, None] = "9d41e6a7c203"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sale_daily_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("store_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "revenue", sa.DECIMAL(precision=16, scale=2), nullable=False
+        ),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("sale_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["product_id"], ["product.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["store_id"], ["store.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "day",
+            "store_id",
+            "product_id",
+            name="idx_unique_sale_daily_rollup",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+    op.create_index(
+        op.f("ix_sale_daily_rollup_product_id"),
+        "sale_daily_rollup",
+        ["product_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_sale_daily_rollup_store_id"),
+        "sale_daily_rollup",
+        ["store_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_sale_daily_rollup_store_id_day_sales",
+        "sale_daily_rollup",
+        ["store_id", "day"],
+        unique=False,
+        postgresql_include=["revenue", "quantity", "sale_count"],
+        postgresql_where=sa.text("product_id IS NULL"),
+    )
+
+    # backfill rollup of existing sales
+    op.execute(
+        """
+        INSERT INTO sale_daily_rollup
+            (day, store_id, product_id, revenue, quantity, sale_count)
+        SELECT
+            day,
+            store_id,
+            product_id,
+            sum(revenue),
+            sum(quantity),
+            sum(sale_count)
+        FROM (
+            SELECT
+                created_at::date AS day,
+                store_id,
+                NULL::integer AS product_id,
+                total_amount AS revenue,
+                total_quantity AS quantity,
+                1 AS sale_count
+            FROM sale
+            UNION ALL
+            SELECT
+                sale.created_at::date,
+                sale.store_id,
+                sale_products.product_id,
+                sale_products.unit_price * sale_products.quantity,
+                sale_products.quantity,
+                1
+            FROM sale
+            JOIN sale_products ON sale.id = sale_products.sale_id
+        ) AS rollup_rows
+        GROUP BY day, store_id, product_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_sale_daily_rollup_store_id_day_sales",
+        table_name="sale_daily_rollup",
+    )
+    op.drop_index(
+        op.f("ix_sale_daily_rollup_store_id"), table_name="sale_daily_rollup"
+    )
+    op.drop_index(
+        op.f("ix_sale_daily_rollup_product_id"),
+        table_name="sale_daily_rollup",
+    )
+    op.drop_table("sale_daily_rollup")
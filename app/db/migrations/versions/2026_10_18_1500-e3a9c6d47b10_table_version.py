@@ -0,0 +1,32 @@
+"""Table version
+
+Revision ID: e3a9c6d47b10
+Revises: c84e2b7f1a35
+Create Date: 2026-10-18 15:00:12.530871
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a9c6d47b10"
+down_revision: Union[str, None] = "c84e2b7f1a35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_version",
+        sa.Column("name", sa.String(length=63), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("table_version")
@@ -0,0 +1,138 @@
+"""
+Module defines connection pools, which collect metrics of their usage:
+checked out connections, time of waiting for a connection, overflow
+and connection churn. Exhausted pool shows up in the metrics as growing
+waiting time and timeouts of checkouts.
+"""
+
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    NullPool,
+    Pool,
+    PoolProxiedConnection,
+)
+
+
+class PoolMetrics:
+    """Counters of usage of a pool since start of the process."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.max_checked_out = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.overflow_checkouts = 0
+        self.max_overflow = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.invalidations = 0
+
+    def on_wait(self, wait_seconds: float) -> None:
+        self.wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def on_checkout(self, checked_out: int, overflow: int) -> None:
+        self.checkouts += 1
+        self.max_checked_out = max(self.max_checked_out, checked_out)
+        if overflow > 0:
+            self.overflow_checkouts += 1
+            self.max_overflow = max(self.max_overflow, overflow)
+
+    def on_connect(self, *args: Any) -> None:
+        self.connects += 1
+
+    def on_close(self, *args: Any) -> None:
+        self.disconnects += 1
+
+    def on_invalidate(self, *args: Any) -> None:
+        self.invalidations += 1
+
+
+class InstrumentedPool(Pool):
+    """
+    Base of pools, which collect metrics.
+    Pool recreated on dispose of engine keeps metrics of the previous one.
+    """
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        # recreated pool gets listeners of the previous one by _dispatch
+        recreated = kwargs.get("_dispatch") is not None
+        super().__init__(*args, **kwargs)
+        if not recreated:
+            self.metrics = PoolMetrics()
+            event.listen(self, "connect", self.metrics.on_connect)
+            event.listen(self, "close", self.metrics.on_close)
+            event.listen(self, "close_detached", self.metrics.on_close)
+            event.listen(self, "invalidate", self.metrics.on_invalidate)
+
+    def recreate(self) -> "InstrumentedPool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self) -> PoolProxiedConnection:
+        # waiting includes opening a new connection and pre-ping
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.on_wait(time.perf_counter() - start)
+        self.metrics.on_checkout(self.get_checked_out(), self.get_overflow())
+        return connection
+
+    def get_size(self) -> int | None:
+        return None
+
+    def get_checked_out(self) -> int:
+        # every open connection of pool without size is checked out
+        return self.metrics.connects - self.metrics.disconnects
+
+    def get_overflow(self) -> int:
+        """Return count of connections opened over size of the pool."""
+        return 0
+
+    def get_status(self) -> dict[str, Any]:
+        metrics = self.metrics
+        return {
+            "pool": type(self).__name__,
+            "size": self.get_size(),
+            "checked_out": self.get_checked_out(),
+            "overflow": self.get_overflow(),
+            "checkouts": metrics.checkouts,
+            "max_checked_out": metrics.max_checked_out,
+            "timeouts": metrics.timeouts,
+            "wait_seconds": metrics.wait_seconds,
+            "max_wait_seconds": metrics.max_wait_seconds,
+            "overflow_checkouts": metrics.overflow_checkouts,
+            "max_overflow": metrics.max_overflow,
+            "connects": metrics.connects,
+            "disconnects": metrics.disconnects,
+            "invalidations": metrics.invalidations,
+        }
+
+
+class InstrumentedQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    def get_size(self) -> int | None:
+        return self.size()
+
+    def get_checked_out(self) -> int:
+        return self.checkedout()
+
+    def get_overflow(self) -> int:
+        # overflow of queue pool is negative, until the pool is filled
+        return max(self.overflow(), 0)
+
+
+class InstrumentedNullPool(InstrumentedPool, NullPool):
+    """Pool, which opens a connection on every checkout, as NullPool."""
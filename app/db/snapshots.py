@@ -0,0 +1,67 @@
+"""
+Module defines process-local snapshots of small, rarely changed tables.
+Snapshot is valid while version of the table is not changed
+and is loaded again after the table is changed.
+"""
+
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.db.abstract_models import Base
+from app.db.versions import table_versions
+
+
+class TableSnapshot:
+    """
+    Copy of all objects of the table, ordered by id.
+    Objects are shared between requests, so they must not be modified
+    or added to sessions.
+    """
+
+    def __init__(self, model: type[Base]) -> None:
+        self.model = model
+        self.version: int | None = None
+        self.objects: dict[int, Base] = {}
+        # only one request of the process loads the snapshot at a time
+        self.loading = asyncio.Lock()
+
+    async def get_objects(
+        self, engine: AsyncEngine, session: AsyncSession
+    ) -> dict[int, Base] | None:
+        """
+        Return objects of the table by ids, or None if the snapshot
+        can't be used, so objects must be read by the session:
+        if version of the table is unknown, or the snapshot is stale
+        and is not loaded for this request.
+        """
+        version = table_versions.get_version(self.model.__tablename__)
+        if version is None:
+            return None
+        if version == self.version:
+            return self.objects
+
+        # snapshot is loaded by own connection, to not see uncommitted
+        # changes of the current transaction, so it is loaded only
+        # while the session doesn't hold a connection, and a request
+        # never waits for a second connection of the pool. Meanwhile
+        # other requests read objects by theirs sessions, instead of
+        # waiting for loading or loading the same table again.
+        if session.in_transaction() or self.loading.locked():
+            return None
+
+        async with self.loading:
+            # version is taken before loading, so changes made during
+            # loading lead to one more loading, not to a stale snapshot
+            async with engine.connect() as connection:
+                result = await connection.execute(
+                    select(*self.model.__table__.columns)
+                    .order_by(self.model.id)
+                )
+                objects = {
+                    row.id: self.model(**row._mapping) for row in result
+                }
+            self.objects, self.version = objects, version
+
+        return self.objects
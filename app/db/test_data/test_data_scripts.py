@@ -1,14 +1,13 @@
 import asyncio
 import json
 
-from sqlalchemy import insert
-
 from app.db.abstract_models import Base
 from app.db.database import database
 from app.api.cities.models import City
 from app.api.stores.models import Store
 from app.api.products.models import Product
 from app.api.sales.models import Sale, SaleProducts
+from app.api.sales.repository import SaleRepository
 
 
 # order is important
@@ -29,13 +28,24 @@ async def select_test_data():
         await connection.run_sync(Base.metadata.create_all)
 
     async with database.async_session_maker() as session:
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
         for model in models:
             data = open_json(model.__tablename__)
-            add_query = insert(model).values(data)
-            await session.execute(add_query)
+            # COPY is used, because multi-row insert doesn't scale
+            columns = list(data[0])
+            await raw_connection.driver_connection.copy_records_to_table(
+                model.__tablename__,
+                records=[
+                    tuple(row[column] for column in columns) for row in data
+                ],
+                columns=columns,
+            )
 
         await session.commit()
 
+        await SaleRepository.rebuild_rollup(session=session)
+
 if __name__ == "__main__":
     asyncio.run(select_test_data())
     print("данные успешно вставлены")
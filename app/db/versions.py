@@ -0,0 +1,191 @@
+"""
+Module defines versions of tables.
+Version of table is increased by every write to the table and is
+delivered to every application process by postgres notifications,
+so processes know current versions without queries to the database.
+"""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+
+import asyncpg
+from sqlalchemy import (
+    BigInteger,
+    FromClause,
+    Insert,
+    String,
+    cast,
+    func,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.abstract_models import Base
+
+
+VERSIONS_CHANNEL = "table_version"
+
+# delay before reconnection of lost listening connection,
+# doubled after every failed attempt up to the maximum
+RECONNECT_DELAY_SECONDS = 0.5
+RECONNECT_MAX_DELAY_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class TableVersion(Base):
+    __tablename__ = "table_version"
+
+    name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger)
+
+
+class TableVersions:
+    """
+    Current versions of tables, received from notifications.
+    Versions are unknown, while notifications are not listened.
+    Lost listening connection is reconnected in background,
+    and versions are loaded again after reconnection.
+    """
+
+    def __init__(self) -> None:
+        self.versions: dict[str, int] = {}
+        self.connection: asyncpg.Connection | None = None
+        self.url: str | None = None
+        self.reconnection: asyncio.Task | None = None
+
+    @property
+    def listening(self) -> bool:
+        return self.connection is not None
+
+    async def listen(
+        self, engine: AsyncEngine, url: URL | None = None
+    ) -> None:
+        """
+        Load versions of tables and listen to theirs changes.
+        url of the database is passed, if the engine connects
+        through a pooler, which doesn't support LISTEN.
+        """
+        url = (url or engine.url).set(drivername="postgresql")
+        self.url = url.render_as_string(hide_password=False)
+        await self.connect()
+
+    async def connect(self) -> None:
+        # listening connection is not taken from the pool,
+        # because it is kept open while application works
+        connection = await asyncpg.connect(self.url)
+        try:
+            connection.add_termination_listener(self.on_termination)
+            await connection.add_listener(
+                VERSIONS_CHANNEL, self.on_notification
+            )
+
+            # versions are loaded after listening is started,
+            # so changes between loading and listening are not lost
+            for name, version in await connection.fetch(
+                f"SELECT name, version FROM {TableVersion.__tablename__}"
+            ):
+                self.set_version(name, version)
+        except BaseException:
+            await connection.close()
+            raise
+        self.connection = connection
+
+    async def reconnect(self) -> None:
+        """Connect again, until connected, with growing delays."""
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.connect()
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                delay = min(delay * 2, RECONNECT_MAX_DELAY_SECONDS)
+                logger.warning(
+                    "Reconnection to listen to versions of tables failed, "
+                    "next attempt in %.1f s",
+                    delay,
+                    exc_info=True,
+                )
+            else:
+                logger.info("Versions of tables are listened again")
+                self.reconnection = None
+                return
+
+    async def close(self) -> None:
+        if self.reconnection is not None:
+            reconnection, self.reconnection = self.reconnection, None
+            reconnection.cancel()
+            await asyncio.gather(reconnection, return_exceptions=True)
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            await connection.close()
+        self.versions.clear()
+
+    def get_version(self, table: str) -> int | None:
+        if not self.listening:
+            return None
+        return self.versions.get(table, 0)
+
+    def set_version(self, table: str, version: int) -> None:
+        # notifications of different transactions can come in any order
+        self.versions[table] = max(self.versions.get(table, 0), version)
+
+    def on_notification(self, connection, pid, channel, payload) -> None:
+        table, version = payload.rsplit(":", 1)
+        self.set_version(table, int(version))
+
+    def on_termination(self, connection) -> None:
+        if connection is not self.connection:
+            # connection was closed by close() or failed connect()
+            return
+        # notifications are lost, so versions can't be trusted anymore,
+        # until they are loaded again by new connection
+        self.connection = None
+        self.versions.clear()
+        logger.warning(
+            "Connection listening to versions of tables is lost, "
+            "versions are unknown until reconnection"
+        )
+        self.reconnection = asyncio.create_task(self.reconnect())
+
+    @staticmethod
+    def get_bump_query(
+        tables: Iterable[str], written: FromClause | None = None
+    ) -> Insert:
+        """
+        Return query, which increases versions of tables,
+        returns new versions and notifies about them on commit.
+        If written rows are passed, for example a CTE of write query,
+        versions are increased only if there are any.
+        """
+        # names are passed as an array, one parameter for any tables;
+        # sorted, so concurrent writes lock versions in the same order
+        names = literal(sorted(set(tables)), ARRAY(String))
+        rows = select(func.unnest(names), literal(1))
+        if written is not None:
+            rows = rows.where(select(literal(1)).select_from(written).exists())
+        return (
+            insert(TableVersion)
+            .from_select(("name", "version"), rows)
+            .on_conflict_do_update(
+                index_elements=[TableVersion.name],
+                set_={"version": TableVersion.version + 1},
+            )
+            .returning(
+                TableVersion.name,
+                TableVersion.version,
+                func.pg_notify(
+                    VERSIONS_CHANNEL,
+                    TableVersion.name
+                    + ":"
+                    + cast(TableVersion.version, String),
+                ).label("notified"),
+            )
+        )
+
+table_versions = TableVersions()
@@ -1,7 +1,20 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 import uvicorn
 
 from app.api import routers
+from app.db.database import ReadYourWritesMiddleware, database
+from app.db.versions import table_versions
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # versions of tables are used as ETags of reference data
+    await table_versions.listen(database.engine, database.listen_url)
+    yield
+    await table_versions.close()
+
 
 app = FastAPI(
     title="Sales API",
@@ -9,7 +22,10 @@ app = FastAPI(
         "Sales API — это FastAPI приложение для управления продажами "
         "в сети магазинов бытовой техники"
     ),
+    lifespan=lifespan,
 )
+# clients, which have written, read from the primary database for a while
+app.add_middleware(ReadYourWritesMiddleware)
 
 [app.include_router(router) for router in routers]
 
@@ -1,13 +1,58 @@
-
 from httpx import AsyncClient
 import pytest
 
+from app.db.versions import VERSIONS_CHANNEL, table_versions
+
 
 async def test_get_cities(ac: AsyncClient):
     response = await ac.get("/cities")
     assert response.status_code == 200
 
 
+async def test_get_cities_not_modified(ac: AsyncClient):
+    response = await ac.get("/cities")
+    etag = response.headers["ETag"]
+
+    response = await ac.get("/cities", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+async def test_get_city_modified(ac: AsyncClient, monkeypatch):
+    response = await ac.get("/cities/1")
+    etag = response.headers["ETag"]
+
+    # versions are restored after the test, so other tests don't see
+    # the version, which is not in the database
+    monkeypatch.setattr(
+        table_versions, "versions", dict(table_versions.versions)
+    )
+    # notification about new version, as write to cities sends on commit
+    version = table_versions.get_version("city")
+    table_versions.on_notification(
+        None, None, VERSIONS_CHANNEL, f"city:{version + 1}"
+    )
+
+    response = await ac.get("/cities/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize(
+    ("params", "status_code"),
+    (
+        pytest.param({"limit": 1}, 200, id="limit param"),
+        pytest.param({"limit": 1, "after": "MQ=="}, 200, id="cursor param"),
+        pytest.param({"limit": 0}, 422, id="zero limit"),
+        pytest.param({"after": "abc"}, 400, id="invalid cursor"),
+    )
+)
+async def test_get_cities_page(ac: AsyncClient, params, status_code):
+    response = await ac.get("/cities", params=params)
+    assert response.status_code == status_code
+
+
 @pytest.mark.parametrize(
     ("request_data", "status_code"),
     (
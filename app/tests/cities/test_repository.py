@@ -1,8 +1,10 @@
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import select
 
 from app.api.cities.models import City
 from app.api.cities.repository import CityRepository
+from app.db.versions import TableVersion
 from app.utils.exceptions import DBIntegrityException
 
 
@@ -106,3 +108,44 @@ async def test_dont_delete_not_existing_object(session):
             object_id=city_id,
         )
         assert isinstance(e, DBIntegrityException)
+
+
+async def test_writes_increase_versions(session, city_add_data):
+    async def get_versions() -> dict[str, int]:
+        result = await session.execute(
+            select(TableVersion.name, TableVersion.version)
+        )
+        return dict(result.all())
+
+    versions = await get_versions()
+    city_id = await CityRepository.create_object(
+        session=session,
+        data=city_add_data,
+    )
+    await CityRepository.delete_object(session=session, object_id=city_id)
+
+    new_versions = await get_versions()
+    assert new_versions["city"] == versions.get("city", 0) + 2
+    # stores of city are deleted by cascade
+    assert new_versions["store"] == versions.get("store", 0) + 1
+
+
+async def test_not_found_writes_dont_increase_versions(
+    session, city_update_data
+):
+    result = await session.execute(
+        select(TableVersion.version).filter_by(name="city")
+    )
+    version = result.scalar_one_or_none()
+
+    with pytest.raises(HTTPException):
+        await CityRepository.update_partial_object(
+            session=session, object_id=-1, data=city_update_data
+        )
+    with pytest.raises(HTTPException):
+        await CityRepository.delete_object(session=session, object_id=-1)
+
+    result = await session.execute(
+        select(TableVersion.version).filter_by(name="city")
+    )
+    assert result.scalar_one_or_none() == version
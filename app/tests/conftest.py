@@ -6,7 +6,7 @@ from httpx import AsyncClient, ASGITransport
 from app.db.test_data.test_data_scripts import select_test_data
 from app.db.database import database
 
-from app.main import app as fastapi_app
+from app.main import app as fastapi_app, lifespan
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -17,11 +17,14 @@ async def prepare_database():
 @pytest.fixture(scope="session")
 async def ac():
     transport = ASGITransport(app=fastapi_app)
-    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+    async with (
+        lifespan(fastapi_app),
+        AsyncClient(transport=transport, base_url="http://test") as ac,
+    ):
         yield ac
 
 
 @pytest.fixture(scope="function")
 async def session():
-    async for db_session in database.session_dependency():
+    async with database.get_session(database.engine) as db_session:
         yield db_session
@@ -7,6 +7,16 @@ async def test_get_products(ac: AsyncClient):
     assert response.status_code == 200
 
 
+async def test_get_product_not_modified(ac: AsyncClient):
+    response = await ac.get("/products/1")
+    etag = response.headers["ETag"]
+
+    response = await ac.get(
+        "/products/1", headers={"If-None-Match": f'"abc", W/{etag}'}
+    )
+    assert response.status_code == 304
+
+
 @pytest.mark.parametrize(
     ("request_data", "status_code"),
     (
@@ -171,3 +181,79 @@ async def test_delete_product(ac: AsyncClient, id, status_code):
     response = await ac.delete(f"/products/{id}")
     print(response._content)
     assert response.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    ("params", "result"),
+    (
+        pytest.param(
+            {},
+            {
+                "inserted": 0,
+                "updated": 0,
+                "skipped": 0,
+                "rejected": [{"row": 1, "error": "name exists"}],
+            },
+            id="rejected by default",
+        ),
+        pytest.param(
+            {"on_conflict": "skip"},
+            {"inserted": 0, "updated": 0, "skipped": 1, "rejected": []},
+            id="skip",
+        ),
+        pytest.param(
+            {"on_conflict": "update"},
+            {"inserted": 0, "updated": 1, "skipped": 0, "rejected": []},
+            id="update",
+        ),
+    ),
+)
+async def test_import_products_with_existing_name(
+    ac: AsyncClient, params, result
+):
+    product = (await ac.get("/products/1")).json()
+
+    response = await ac.post(
+        "/products/import",
+        params=params,
+        content=f"name,price\n{product['name']},12.34\n",
+    )
+    assert response.status_code == 200
+    assert response.json() == result
+
+
+async def test_import_products_with_invalid_on_conflict(ac: AsyncClient):
+    response = await ac.post(
+        "/products/import",
+        params={"on_conflict": "overwrite"},
+        content="name,price\n",
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize(
+    ("request_data", "status_code"),
+    (
+        pytest.param([], 200, id="empty list"),
+        pytest.param(
+            [{"name": "такого нет в датасете", "price": "9.99"}],
+            200,
+            id="new product",
+        ),
+        pytest.param(
+            [{"name": "такого нет в датасете", "price": "9.999"}],
+            422,
+            id="price with 3 decimal places",
+        ),
+        pytest.param(
+            [{"name": "такого нет в датасете", "price": 0}],
+            422,
+            id="price is 0",
+        ),
+    ),
+)
+async def test_upsert_products(ac: AsyncClient, request_data, status_code):
+    response = await ac.put("/products/bulk", json=request_data)
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert response.json()["inserted"] == len(request_data)
@@ -1,8 +1,11 @@
+from decimal import Decimal
+
 import pytest
 from fastapi import HTTPException
 
 from app.api.products.models import Product
 from app.api.products.repository import ProductRepository
+from app.api.products.schemas import ProductSchemaCreate
 from app.utils.exceptions import DBIntegrityException
 
 
@@ -111,3 +114,26 @@ async def test_dont_delete_not_existing_object(session):
             object_id=product_id,
         )
         assert isinstance(e, DBIntegrityException)
+
+
+async def test_upsert_prices(session, products):
+    changed, unchanged = products[0], products[1]
+    data = [
+        ProductSchemaCreate(name="новый товар", price=1),
+        ProductSchemaCreate(name=changed["name"], price=1),
+        ProductSchemaCreate(name=changed["name"], price="2.5"),
+        ProductSchemaCreate(name=unchanged["name"], price=unchanged["price"]),
+    ]
+
+    result = await ProductRepository.upsert_prices(
+        session=session, data=data, chunk_size=2
+    )
+
+    assert result == {"inserted": 1, "updated": 1, "unchanged": 1}
+    prices = {
+        product.name: product.price
+        for product in await ProductRepository.get_objects(session=session)
+    }
+    assert prices["новый товар"] == 1
+    assert prices[changed["name"]] == Decimal("2.5")
+    assert prices[unchanged["name"]] == Decimal(str(unchanged["price"]))
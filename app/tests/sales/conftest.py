@@ -1,5 +1,10 @@
 import pytest
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
+from app.api.cities.models import City
+from app.api.products.models import Product
 from app.api.sales.models import Sale, SaleProducts
 from app.api.sales.schemas import (
     SaleSchemaCreate,
@@ -7,6 +12,8 @@ from app.api.sales.schemas import (
     SaleSchemaUpdatePartial,
     SaleProductSchemaUpdatePartial
 )
+from app.api.stores.models import Store
+from app.config import settings
 from app.db.test_data.test_data_scripts import open_json
 
 
@@ -89,3 +96,50 @@ async def product_update_data(
     return SaleProductSchemaUpdatePartial(
         quantity=121,
     )
+
+
+@pytest.fixture()
+async def committed_session_maker():
+    """
+    Sessions of own connections, which commit, unlike the session fixture,
+    so changes of one session are seen by others.
+    """
+    engine = create_async_engine(
+        settings.TEST_DATABASE_URL, poolclass=NullPool
+    )
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture()
+async def committed_sale(committed_session_maker):
+    """
+    Committed sale without products in a new store, and a new product.
+    Return ids of the sale and the product, which are deleted
+    with the store and its city after the test.
+    """
+    async with committed_session_maker() as session:
+        city_id = await session.scalar(
+            insert(City).values(name="committed city").returning(City.id)
+        )
+        store_id = await session.scalar(
+            insert(Store)
+            .values(name="committed store", city_id=city_id)
+            .returning(Store.id)
+        )
+        sale_id = await session.scalar(
+            insert(Sale).values(store_id=store_id).returning(Sale.id)
+        )
+        product_id = await session.scalar(
+            insert(Product)
+            .values(name="committed product", price=2)
+            .returning(Product.id)
+        )
+        await session.commit()
+
+    yield sale_id, product_id
+
+    async with committed_session_maker() as session:
+        await session.execute(delete(City).filter_by(id=city_id))
+        await session.execute(delete(Product).filter_by(id=product_id))
+        await session.commit()
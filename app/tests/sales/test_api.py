@@ -1,6 +1,12 @@
+import csv
+import io
+import json
+
 from httpx import AsyncClient
 import pytest
 
+from app.config import settings
+
 
 @pytest.mark.parametrize(
     ("params", "status_code"),
@@ -18,6 +24,22 @@ import pytest
         pytest.param(
             {"max_quantity": "abc"}, 422, id="max_quantity str param"
         ),
+        pytest.param({"limit": 2}, 200, id="limit param"),
+        pytest.param({"limit": 0}, 422, id="zero limit"),
+        pytest.param({"limit": "abc"}, 422, id="limit str param"),
+        pytest.param({"after": "abc"}, 400, id="invalid cursor"),
+        pytest.param({"store_id": [1, 7]}, 200, id="store_id list param"),
+        pytest.param(
+            {"product_id": [1, "abc"]}, 422, id="product_id str in list"
+        ),
+        pytest.param({"fields": "id,total_amount"}, 200, id="fields param"),
+        pytest.param({"fields": "id,products"}, 400, id="products field"),
+        pytest.param({"fields": "abc"}, 400, id="unknown field"),
+        pytest.param({"view": "summary"}, 200, id="summary view"),
+        pytest.param({"view": "abc"}, 422, id="unknown view"),
+        pytest.param({"count": "exact"}, 200, id="exact count"),
+        pytest.param({"count": "estimated"}, 200, id="estimated count"),
+        pytest.param({"count": "abc"}, 422, id="unknown count"),
     ),
 )
 async def test_get_sales(ac: AsyncClient, params, status_code):
@@ -25,6 +47,228 @@ async def test_get_sales(ac: AsyncClient, params, status_code):
     assert response.status_code == status_code
 
 
+async def test_get_sales_by_several_stores(ac: AsyncClient):
+    response = await ac.get("/sales", params={"store_id": [1, 2]})
+    sales = response.json()["items"]
+
+    sales_by_store = []
+    for store_id in (1, 2):
+        response = await ac.get("/sales", params={"store_id": store_id})
+        sales_by_store.extend(response.json()["items"])
+
+    assert sales == sorted(sales_by_store, key=lambda sale: sale["id"])
+
+
+async def test_get_sales_summary(ac: AsyncClient):
+    response = await ac.get("/sales", params={"store_id": 1})
+    sales = response.json()["items"]
+    for sale in sales:
+        del sale["products"]
+
+    response = await ac.get(
+        "/sales", params={"store_id": 1, "view": "summary"}
+    )
+    assert response.json()["items"] == sales
+
+    response = await ac.get(
+        "/sales", params={"store_id": 1, "fields": "total_amount"}
+    )
+    assert response.json()["items"] == [
+        {"id": sale["id"], "total_amount": sale["total_amount"]}
+        for sale in sales
+    ]
+
+
+async def test_get_sales_total_count(ac: AsyncClient):
+    response = await ac.get("/sales", params={"store_id": 1})
+    assert "X-Total-Count" not in response.headers
+    sales = response.json()["items"]
+
+    response = await ac.get(
+        "/sales", params={"store_id": 1, "limit": 1, "count": "exact"}
+    )
+    assert response.headers["X-Total-Count"] == str(len(sales))
+
+    response = await ac.get(
+        "/sales", params={"store_id": 1, "count": "estimated"}
+    )
+    assert int(response.headers["X-Total-Count"]) >= 0
+
+
+async def test_get_sales_pages(ac: AsyncClient):
+    response = await ac.get("/sales")
+    all_sales = response.json()["items"]
+
+    paged_sales = []
+    params = {"limit": 2}
+    while True:
+        response = await ac.get("/sales", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        paged_sales.extend(page["items"])
+        if page["next_cursor"] is None:
+            break
+        params["after"] = page["next_cursor"]
+
+    assert paged_sales == all_sales
+
+
+@pytest.mark.parametrize(
+    ("params", "status_code"),
+    (
+        pytest.param({}, 200, id="empty params"),
+        pytest.param({"format": "ndjson"}, 200, id="ndjson format"),
+        pytest.param({"format": "csv"}, 200, id="csv format"),
+        pytest.param({"format": "xml"}, 422, id="unknown format"),
+        pytest.param({"store_id": 1}, 200, id="store_id param"),
+        pytest.param({"store_id": "abc"}, 422, id="store_id str param"),
+    ),
+)
+async def test_export_sales(ac: AsyncClient, params, status_code):
+    response = await ac.get("/sales/export", params=params)
+    assert response.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    "params",
+    (
+        pytest.param({}, id="without filters"),
+        pytest.param({"store_id": 1}, id="store_id filter"),
+        pytest.param({"product_id": 1}, id="product_id filter"),
+        pytest.param({"min_amount": 1000}, id="min_amount filter"),
+    ),
+)
+async def test_export_sales_ndjson(ac: AsyncClient, monkeypatch, params):
+    # several chunks must be fetched from the cursor
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 2)
+    response = await ac.get("/sales", params=params)
+    sales = response.json()["items"]
+
+    response = await ac.get(
+        "/sales/export", params={**params, "format": "ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported_sales = [json.loads(line) for line in response.text.splitlines()]
+    assert exported_sales == sales
+
+
+async def test_export_sales_csv(ac: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 2)
+    response = await ac.get("/sales")
+    sales = response.json()["items"]
+
+    response = await ac.get("/sales/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert rows == [
+        {
+            "id": str(sale["id"]),
+            "store_id": str(sale["store_id"]),
+            "total_amount": sale["total_amount"],
+            "total_quantity": str(sale["total_quantity"]),
+        }
+        for sale in sales
+    ]
+
+
+async def test_export_sales_csv_empty(ac: AsyncClient):
+    response = await ac.get(
+        "/sales/export", params={"format": "csv", "store_id": 0}
+    )
+    assert response.status_code == 200
+    assert response.text.splitlines() == [
+        "id,store_id,total_amount,total_quantity"
+    ]
+
+
+@pytest.mark.parametrize("group_by", ("city", "store", "product"))
+@pytest.mark.parametrize(
+    ("params", "status_code"),
+    (
+        pytest.param({}, 200, id="empty params"),
+        pytest.param({"city_id": 1, "days": 30}, 200, id="filters params"),
+        pytest.param({"city_id": "abc"}, 422, id="city_id str param"),
+        pytest.param({"min_amount": "abc"}, 422, id="min_amount str param"),
+    ),
+)
+async def test_get_sales_report(
+    ac: AsyncClient, group_by, params, status_code
+):
+    response = await ac.get(f"/sales/reports/by-{group_by}", params=params)
+    assert response.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    ("params", "status_code"),
+    (
+        pytest.param(
+            {"from": "2024-01-01", "to": "2024-02-01"}, 200, id="period"
+        ),
+        pytest.param(
+            {
+                "from": "2024-01-01T00:00:00+03:00",
+                "to": "2024-01-02T00:00:00+03:00",
+                "bucket": "hour",
+                "city_id": 1,
+                "store_id": 1,
+                "product_id": 1,
+            },
+            200,
+            id="all params",
+        ),
+        pytest.param({"from": "2024-01-01"}, 422, id="without end"),
+        pytest.param(
+            {"from": "2024-01-01", "to": "abc"}, 422, id="end str param"
+        ),
+        pytest.param(
+            {"from": "2024-01-01", "to": "2024-02-01", "bucket": "month"},
+            422,
+            id="unknown bucket",
+        ),
+        pytest.param(
+            {"from": "2024-02-01", "to": "2024-01-01"},
+            400,
+            id="start after end",
+        ),
+    ),
+)
+async def test_get_sales_timeseries(ac: AsyncClient, params, status_code):
+    response = await ac.get("/sales/timeseries", params=params)
+    assert response.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    ("request_data", "status_code"),
+    (
+        pytest.param([], 200, id="empty batch"),
+        pytest.param(
+            [
+                {
+                    "store_id": 1,
+                    "products": [{"product_id": 1, "quantity": 1}],
+                },
+                {"store_id": -1, "products": []},
+            ],
+            200,
+            id="valid and invalid sales",
+        ),
+        pytest.param(
+            [{"store_id": 1, "products": [{"product_id": 1, "quantity": 0}]}],
+            422,
+            id="invalid quantity",
+        ),
+        pytest.param({"store_id": 1, "products": []}, 422, id="not list"),
+    ),
+)
+async def test_create_sales_batch(ac: AsyncClient, request_data, status_code):
+    response = await ac.post("/sales/batch", json=request_data)
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert len(response.json()) == len(request_data)
+
+
 @pytest.mark.parametrize(
     ("request_data", "status_code"),
     (
@@ -295,6 +539,80 @@ async def test_add_product(ac: AsyncClient, request_data, is_422):
     assert (response.status_code == 422) or not is_422
 
 
+@pytest.mark.parametrize(
+    ("sale_id", "request_data", "status_code"),
+    (
+        pytest.param(
+            1,
+            [
+                {"op": "add", "product_id": 1, "quantity": 1},
+                {"op": "set", "product_id": 2, "quantity": 2},
+                {"op": "remove", "product_id": 3},
+            ],
+            200,
+            id="correct",
+        ),
+        pytest.param(1, [], 200, id="no operations"),
+        pytest.param(
+            -1, [{"op": "remove", "product_id": 1}], 404, id="no sale"
+        ),
+        pytest.param(
+            1,
+            [{"op": "set", "product_id": -1, "quantity": 1}],
+            404,
+            id="no product",
+        ),
+        pytest.param(
+            1,
+            [
+                {"op": "add", "product_id": 1, "quantity": 1},
+                {"op": "remove", "product_id": 1},
+            ],
+            422,
+            id="repeated product",
+        ),
+        pytest.param(
+            1, [{"op": "set", "product_id": 1}], 422, id="no quantity"
+        ),
+        pytest.param(
+            1,
+            [{"op": "move", "product_id": 1, "quantity": 1}],
+            422,
+            id="invalid operation",
+        ),
+    ),
+)
+async def test_change_products(
+    ac: AsyncClient, sale_id, request_data, status_code
+):
+    response = await ac.patch(
+        f"/sales/{sale_id}/products", json=request_data
+    )
+    assert response.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    ("sale_id", "request_data", "status_code"),
+    (
+        pytest.param(1, {"product_id": 1, "quantity": 2}, 200, id="correct"),
+        pytest.param(-1, {"product_id": 1, "quantity": 2}, 404, id="no sale"),
+        pytest.param(
+            1, {"product_id": -1, "quantity": 2}, 404, id="no product"
+        ),
+        pytest.param(
+            1, {"product_id": 1, "quantity": 0}, 422, id="zero quantity"
+        ),
+    ),
+)
+async def test_increment_product(
+    ac: AsyncClient, sale_id, request_data, status_code
+):
+    response = await ac.post(
+        f"/sales/{sale_id}/products/increment", json=request_data
+    )
+    assert response.status_code == status_code
+
+
 @pytest.mark.parametrize(
     ("request_data", "is_422"),
     (
@@ -356,3 +674,19 @@ async def test_delete_product_in_sale(ac: AsyncClient, id, status_code):
     response = await ac.delete(f"/sales/{id}/products/{id}")
     print(response._content)
     assert response.status_code == status_code
+
+
+async def test_get_query_cache(ac: AsyncClient):
+    await ac.get("/sales", params={"store_id": 1})
+    response = await ac.get("/internal/query-cache")
+    assert response.status_code == 200
+    cache_info = response.json()
+
+    # the same set of filters with other values is built from the cache
+    await ac.get("/sales", params={"store_id": 2})
+    response = await ac.get("/internal/query-cache")
+    assert response.json() == {
+        "hits": cache_info["hits"] + 1,
+        "misses": cache_info["misses"],
+        "size": cache_info["size"],
+    }
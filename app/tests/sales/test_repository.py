@@ -1,16 +1,28 @@
+import asyncio
 from datetime import timedelta, datetime
+from decimal import Decimal
 from typing import Any
 
 import pytest
 from fastapi import HTTPException
-from sqlalchemy import Result, select
+from sqlalchemy import Result, delete, insert, select, text, true, update
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import selectinload, joinedload
 
 from app.api.products.repository import ProductRepository
 from app.api.products.schemas import ProductSchemaUpdatePartial
-from app.api.sales.models import Sale, SaleProducts
+from app.api.sales.models import Sale, SaleDailyRollup, SaleProducts
 from app.api.sales.repository import SaleRepository
-from app.utils.exceptions import DBIntegrityException
+from app.api.sales.schemas import (
+    SaleProductOperationSchema,
+    SaleProductRemoveSchema,
+    SaleProductSchemaCreate,
+    SaleSchemaCreate,
+    SaleSchemaUpdatePartial,
+)
+from app.api.stores.repository import StoreRepository
+from app.utils.exceptions import DBIntegrityException, NotFoundException
+from app.utils.pagination import encode_cursor
 
 
 async def test_get_objects(session, sales):
@@ -22,6 +34,114 @@ async def test_get_objects(session, sales):
     assert sales_from_rep == sales
 
 
+async def test_get_objects_totals(session):
+    sales_models: list[Sale] = await SaleRepository.get_objects(
+        session=session
+    )
+
+    for sale in sales_models:
+        assert sale.total_amount == sum(
+            product.total_price for product in sale.products
+        )
+        assert sale.total_quantity == sum(
+            product.quantity for product in sale.products
+        )
+
+
+async def test_get_page(session, sales):
+    sales_models: list[Sale] = []
+    after = None
+    while True:
+        page = await SaleRepository.get_page(
+            session=session, limit=4, after=after
+        )
+        assert len(page["items"]) <= 4
+        sales_models.extend(page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    sales_from_rep = [sale_model.to_dict() for sale_model in sales_models]
+    assert sales_from_rep == sales
+
+
+async def test_get_page_with_filters(session):
+    sales_models: list[Sale] = await SaleRepository.get_objects(
+        session=session, store_id=1
+    )
+    page = await SaleRepository.get_page(
+        session=session,
+        limit=1,
+        after=encode_cursor(sales_models[0].id),
+        store_id=1,
+    )
+    assert page["items"] == sales_models[1:2]
+
+
+@pytest.mark.parametrize(
+    "fields",
+    (
+        ("id",),
+        ("total_amount",),
+        ("store_id", "total_amount", "total_quantity"),
+    ),
+)
+async def test_get_objects_fields(session, fields):
+    sales_models: list[Sale] = await SaleRepository.get_objects(
+        session=session, store_id=1
+    )
+    rows = await SaleRepository.get_objects(
+        session=session, store_id=1, fields=fields
+    )
+
+    assert [row._asdict() for row in rows] == [
+        {
+            field: getattr(sale, field)
+            for field in ("id", *fields)
+        }
+        for sale in sales_models
+    ]
+
+
+def test_get_objects_fields_query():
+    query, _ = SaleRepository.get_objects_query(
+        fields=("total_amount",), product_id=1
+    )
+    assert [column.name for column in query.selected_columns] == [
+        "id",
+        "total_amount",
+    ]
+    # products of sales are not loaded
+    assert not query._with_options
+
+    with pytest.raises(HTTPException):
+        SaleRepository.get_objects_query(fields=("products",))
+
+
+@pytest.mark.parametrize(
+    "filters",
+    (
+        {},
+        {"store_id": 1},
+        {"city_id": [1, 2], "product_id": 1},
+        {"min_amount": 100, "max_quantity": 5},
+        {"store_id": 1, "min_amount": 10 ** 9},
+    ),
+)
+async def test_count_objects(session, filters):
+    sales_models: list[Sale] = await SaleRepository.get_objects(
+        session=session, **filters
+    )
+    count = await SaleRepository.count_objects(session=session, **filters)
+    assert count == len(sales_models)
+
+    estimated_count = await SaleRepository.count_objects(
+        session=session, estimated=True, **filters
+    )
+    assert isinstance(estimated_count, int)
+    assert estimated_count >= 0
+
+
 async def test_get_object(session, sales):
     sale_model: Sale = await SaleRepository.get_object(
         session=session, object_id=1
@@ -184,6 +304,112 @@ async def test_dont_add_not_existing_product(
         assert isinstance(e, DBIntegrityException)
 
 
+async def test_increment_product(session, sale_add_data):
+    sale_id = await SaleRepository.create_object(
+        session=session,
+        data=sale_add_data,
+    )
+    product_id = sale_add_data.products[0].product_id
+    quantity = sale_add_data.products[0].quantity
+    product = await ProductRepository.get_object(
+        session=session, object_id=product_id
+    )
+
+    # product is already in sale, then added again
+    for increment in (2, 3):
+        sale_product = await SaleRepository.increment_product(
+            session=session,
+            sale_id=sale_id,
+            product_data=SaleProductSchemaCreate(
+                product_id=product_id, quantity=increment
+            ),
+        )
+        quantity += increment
+        assert tuple(sale_product) == (product_id, quantity, product.price)
+
+    sale_product = await SaleRepository.increment_product(
+        session=session,
+        sale_id=sale_id,
+        product_data=SaleProductSchemaCreate(product_id=2, quantity=1),
+    )
+    assert sale_product.quantity == 1
+
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+
+@pytest.mark.parametrize(
+    ("sale_id", "product_id"),
+    (
+        pytest.param(-1, 1, id="not existing sale"),
+        pytest.param(1, -1, id="not existing product"),
+    ),
+)
+async def test_dont_increment_not_existing_product(
+    session, sale_id, product_id
+):
+    rollup = await get_rollup(session)
+
+    with pytest.raises(HTTPException) as e:
+        await SaleRepository.increment_product(
+            session=session,
+            sale_id=sale_id,
+            product_data=SaleProductSchemaCreate(
+                product_id=product_id, quantity=1
+            ),
+        )
+    assert e.value is NotFoundException
+    assert await get_rollup(session) == rollup
+
+
+async def test_change_products(session):
+    sale_id = await SaleRepository.create_object(
+        session=session,
+        data=make_sale_data(1, (1, 1), (2, 2), (3, 3)),
+    )
+
+    sale = await SaleRepository.change_products(
+        session=session,
+        sale_id=sale_id,
+        operations=[
+            SaleProductOperationSchema(op="add", product_id=1, quantity=2),
+            SaleProductOperationSchema(op="set", product_id=2, quantity=5),
+            SaleProductRemoveSchema(op="remove", product_id=3),
+            SaleProductOperationSchema(op="set", product_id=4, quantity=1),
+            SaleProductRemoveSchema(op="remove", product_id=5),
+        ],
+    )
+
+    assert {
+        product.id: product.quantity for product in sale.products_details
+    } == {1: 3, 2: 5, 4: 1}
+    assert sale.total_quantity == 9
+    assert sale.total_amount == sum(
+        product.unit_price * product.quantity
+        for product in sale.products_details
+    )
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+
+async def test_dont_change_products_with_not_existing_product(session):
+    rollup = await get_rollup(session)
+
+    with pytest.raises(HTTPException) as e:
+        await SaleRepository.change_products(
+            session=session,
+            sale_id=1,
+            operations=[
+                SaleProductOperationSchema(op="add", product_id=2, quantity=1),
+                SaleProductOperationSchema(
+                    op="add", product_id=-1, quantity=1
+                ),
+            ],
+        )
+    assert e.value is NotFoundException
+    assert await get_rollup(session) == rollup
+
+
 async def test_update_partial_product(session, product_update_data):
     # test depends on test_get_object
     sale_id = 1
@@ -236,6 +462,277 @@ async def test_delete_product(
     assert len(updated_product) == 0
 
 
+async def test_totals_consistent_after_products_changes(
+    session, sale_add_data, product_add_data, product_update_data
+):
+    sale_id = await SaleRepository.create_object(
+        session=session,
+        data=sale_add_data,
+    )
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+
+    await SaleRepository.add_product(
+        session=session,
+        sale_id=sale_id,
+        product_data=product_add_data,
+    )
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+
+    await SaleRepository.update_partial_product(
+        session=session,
+        sale_id=sale_id,
+        product_id=product_add_data.product_id,
+        product_data=product_update_data,
+    )
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+
+    await SaleRepository.delete_product(
+        session=session,
+        sale_id=sale_id,
+        product_id=product_add_data.product_id,
+    )
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+
+
+async def test_totals_consistent_after_product_delete(session):
+    product_id = 1
+
+    await ProductRepository.delete_object(
+        session=session,
+        object_id=product_id,
+    )
+
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+
+
+async def test_product_delete_waits_for_concurrently_added_line(
+    committed_session_maker, committed_sale
+):
+    sale_id, product_id = committed_sale
+
+    async with committed_session_maker() as adding_session:
+        # line is added as by add_product, but is not committed yet
+        await SaleRepository.lock_object(
+            session=adding_session, object_id=sale_id
+        )
+        await adding_session.execute(
+            insert(SaleProducts).values(
+                sale_id=sale_id, product_id=product_id, quantity=3,
+                unit_price=2,
+            )
+        )
+        await adding_session.execute(
+            update(Sale).filter_by(id=sale_id).values(
+                total_amount=Sale.total_amount + 6,
+                total_quantity=Sale.total_quantity + 3,
+            )
+        )
+
+        async def delete_product():
+            async with committed_session_maker() as deleting_session:
+                await ProductRepository.delete_object(
+                    session=deleting_session, object_id=product_id
+                )
+
+        deleting = asyncio.create_task(delete_product())
+        await asyncio.sleep(0.5)
+        # deletion waits for the lock of the product
+        assert not deleting.done()
+
+        await adding_session.commit()
+    await deleting
+
+    async with committed_session_maker() as session:
+        sale = await session.get(Sale, sale_id)
+        assert sale.total_amount == 0
+        assert sale.total_quantity == 0
+
+
+async def test_recalculate_totals(session):
+    sale_id = 2
+    await session.execute(
+        update(Sale).filter_by(id=sale_id).values(
+            total_amount=0, total_quantity=0
+        )
+    )
+
+    inconsistent_totals = await SaleRepository.get_inconsistent_totals(
+        session=session
+    )
+    assert [totals[0] for totals in inconsistent_totals] == [sale_id]
+
+    await SaleRepository.recalculate_totals(
+        session=session, sale_ids=[sale_id]
+    )
+    assert await SaleRepository.get_inconsistent_totals(session=session) == []
+
+
+async def get_rollup(session) -> list[tuple]:
+    query = (
+        select(
+            SaleDailyRollup.day,
+            SaleDailyRollup.store_id,
+            SaleDailyRollup.product_id,
+            SaleDailyRollup.revenue,
+            SaleDailyRollup.quantity,
+            SaleDailyRollup.sale_count,
+        )
+        # rows of deleted sales remain with zero values
+        .filter(
+            (SaleDailyRollup.sale_count != 0)
+            | (SaleDailyRollup.revenue != 0)
+            | (SaleDailyRollup.quantity != 0)
+        )
+    )
+    result: Result = await session.execute(query)
+    return sorted(result.tuples().all(), key=str)
+
+
+async def get_actual_rollup(session) -> list[tuple]:
+    query = SaleRepository.get_rollup_rows_query(true())
+    result: Result = await session.execute(query)
+    return sorted(result.tuples().all(), key=str)
+
+
+async def test_rollup_consistent_after_changes(
+    session,
+    sale_add_data,
+    product_add_data,
+    product_update_data,
+):
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+    sale_id = await SaleRepository.create_object(
+        session=session,
+        data=sale_add_data,
+    )
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+    await SaleRepository.add_product(
+        session=session,
+        sale_id=sale_id,
+        product_data=product_add_data,
+    )
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+    await SaleRepository.update_partial_product(
+        session=session,
+        sale_id=sale_id,
+        product_id=product_add_data.product_id,
+        product_data=product_update_data,
+    )
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+    await SaleRepository.update_partial_object(
+        session=session,
+        object_id=sale_id,
+        data=SaleSchemaUpdatePartial(store_id=2),
+    )
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+    await SaleRepository.delete_product(
+        session=session,
+        sale_id=sale_id,
+        product_id=product_add_data.product_id,
+    )
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+    await SaleRepository.delete_object(session=session, object_id=sale_id)
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+
+async def test_rollup_consistent_after_product_delete(session):
+    await ProductRepository.delete_object(session=session, object_id=1)
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+
+async def test_rebuild_rollup(session):
+    rollup = await get_rollup(session)
+    await session.execute(delete(SaleDailyRollup))
+
+    await SaleRepository.rebuild_rollup(session=session)
+    assert await get_rollup(session) == rollup
+
+
+def make_sale_data(store_id: int, *products: tuple[int, int]):
+    return SaleSchemaCreate(
+        store_id=store_id,
+        products=[
+            SaleProductSchemaCreate(product_id=product_id, quantity=quantity)
+            for product_id, quantity in products
+        ],
+    )
+
+
+async def test_create_objects(session):
+    data = [
+        make_sale_data(1, (1, 2), (2, 1)),
+        make_sale_data(-1, (1, 1)),
+        make_sale_data(2),
+        make_sale_data(1, (1, 1), (-1, 1)),
+        make_sale_data(3, (3, 5)),
+    ]
+    results = await SaleRepository.create_objects(
+        session=session, data=data, chunk_size=2
+    )
+
+    assert [result["error"] for result in results] == [
+        None, "store not found", None, "product not found", None
+    ]
+    assert results[1]["id"] is None and results[3]["id"] is None
+
+    for sale_data, result in zip(data, results):
+        if result["id"] is None:
+            continue
+        sale: Sale = await SaleRepository.get_object(
+            session=session, object_id=result["id"]
+        )
+        assert sale.store_id == sale_data.store_id
+        lines = {line.product_id: line for line in sale.products}
+        assert lines.keys() == set(sale_data.products_ids)
+        for product_data in sale_data.products:
+            product = await ProductRepository.get_object(
+                session=session, object_id=product_data.product_id
+            )
+            line = lines[product_data.product_id]
+            assert line.quantity == product_data.quantity
+            assert line.unit_price == product.price
+        assert sale.total_amount == sum(
+            (line.total_price for line in sale.products), Decimal(0)
+        )
+        assert sale.total_quantity == sum(
+            line.quantity for line in sale.products
+        )
+
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+
+async def test_create_objects_failed_chunk(session, monkeypatch):
+    async def get_existing_ids(*, session, ids, cached=False):
+        # store is deleted after stores are selected
+        return set(ids)
+
+    monkeypatch.setattr(StoreRepository, "get_existing_ids", get_existing_ids)
+    data = [
+        make_sale_data(1, (1, 1)),
+        make_sale_data(-1, (1, 1)),
+        make_sale_data(2, (2, 1)),
+    ]
+    results = await SaleRepository.create_objects(
+        session=session, data=data, chunk_size=2
+    )
+
+    assert results[0] == results[1] == {
+        "id": None, "error": DBIntegrityException.detail
+    }
+    assert results[2]["error"] is None
+    sale: Sale = await SaleRepository.get_object(
+        session=session, object_id=results[2]["id"]
+    )
+    assert sale.store_id == 2
+    assert await get_rollup(session) == await get_actual_rollup(session)
+
+
 async def test_save_product_price(session, sales_products):
     # test depends on test_update_partial_object and get_sale_product
     sale_id = 1
@@ -413,6 +910,18 @@ async def test_save_product_price(session, sales_products):
             },
             id="amount and product_id combine",
         ),
+        pytest.param({"city_id": [1, 2]}, id="city_id list"),
+        pytest.param({"store_id": [1, 3, -1]}, id="store_id list"),
+        pytest.param({"product_id": [1, 2]}, id="product_id list"),
+        pytest.param({"product_id": []}, id="empty list"),
+        pytest.param(
+            {
+                "city_id": [1, 2],
+                "store_id": [2, 3],
+                "product_id": [1, 3],
+            },
+            id="lists combination",
+        ),
     ),
 )
 async def test_parametrize_query(session, filters):
@@ -426,11 +935,17 @@ async def test_parametrize_query(session, filters):
     assert sales_sql_filtered == sales_python_filtered
 
 
+def as_list(filter_val: int | list[int]) -> list[int]:
+    return filter_val if isinstance(filter_val, list) else [filter_val]
+
+
 filters_conditions = {
-    "city_id": lambda filter_val, sale: sale.store.city_id == filter_val,
-    "store_id": lambda filter_val, sale: sale.store_id == filter_val,
-    "product_id": lambda filter_val, sale: (
-        filter_val in list(map(lambda x: x.product_id, sale.products))
+    "city_id": lambda filter_val, sale: (
+        sale.store.city_id in as_list(filter_val)
+    ),
+    "store_id": lambda filter_val, sale: sale.store_id in as_list(filter_val),
+    "product_id": lambda filter_val, sale: bool(
+        set(as_list(filter_val)) & {x.product_id for x in sale.products}
     ),
     "days": lambda filter_val, sale: (
         sale.created_at >= datetime.utcnow() - timedelta(days=filter_val)
@@ -468,3 +983,388 @@ async def filter_on_python(session, filters: dict[str, Any]) -> list[Sale]:
             filtered_sales.append(sale)
 
     return filtered_sales
+
+
+def get_plan_scans(plan: dict[str, Any]) -> list[tuple[str, str]]:
+    scans = []
+    if "Index Name" in plan:
+        scans.append((plan["Node Type"], plan["Index Name"]))
+    elif "Relation Name" in plan:
+        scans.append((plan["Node Type"], plan["Relation Name"]))
+
+    for subplan in plan.get("Plans", []):
+        scans.extend(get_plan_scans(subplan))
+    return scans
+
+
+@pytest.mark.parametrize(
+    ("filters", "indexes"),
+    (
+        pytest.param(
+            {"store_id": 1},
+            {"ix_sale_store_id_created_at"},
+            id="store_id",
+        ),
+        pytest.param(
+            {"store_id": 1, "days": 1},
+            {"ix_sale_store_id_created_at"},
+            id="store_id and days",
+        ),
+        pytest.param(
+            {"days": 1},
+            {"ix_sale_created_at_brin"},
+            id="days",
+        ),
+        pytest.param(
+            {"product_id": 1},
+            {"ix_sale_products_product_id_sale_id"},
+            id="product_id",
+        ),
+        pytest.param(
+            {"city_id": 1},
+            {"ix_store_city_id", "ix_sale_store_id_created_at"},
+            id="city_id",
+        ),
+        pytest.param(
+            {"min_amount": 1000},
+            {"ix_sale_total_amount"},
+            id="min_amount",
+        ),
+        pytest.param(
+            {"max_quantity": 2},
+            {"ix_sale_total_quantity"},
+            id="max_quantity",
+        ),
+        pytest.param(
+            {"city_id": 1, "product_id": 1, "days": 3},
+            {
+                "ix_store_city_id",
+                "ix_sale_store_id_created_at",
+                "ix_sale_products_product_id_sale_id",
+            },
+            id="city_id, product_id and days",
+        ),
+    ),
+)
+async def test_filters_use_indexes(session, filters, indexes):
+    # test data is tiny, so forbid planner to prefer sequential scans
+    await session.execute(text("SET LOCAL enable_seqscan = off"))
+
+    query, params = SaleRepository.get_objects_query(**filters)
+    query = query.params(params).compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True},
+    )
+    result: Result = await session.execute(
+        text(f"EXPLAIN (FORMAT JSON) {query}")
+    )
+    plan = result.scalar_one()[0]["Plan"]
+
+    scans = get_plan_scans(plan)
+    assert all(node_type != "Seq Scan" for node_type, _ in scans)
+    assert indexes <= {name for _, name in scans}
+
+
+def report_on_python(
+    sales: list[Sale], group_by: str, filters: dict[str, Any]
+) -> list[dict]:
+    groups: dict[int, dict] = {}
+
+    def add_to_group(group_id: int, revenue: Decimal, quantity: int):
+        group = groups.setdefault(
+            group_id,
+            {"id": group_id, "revenue": 0, "quantity": 0, "sales_count": 0},
+        )
+        group["revenue"] += revenue
+        group["quantity"] += quantity
+        group["sales_count"] += 1
+
+    for sale in sales:
+        if group_by == "product":
+            for product in sale.products:
+                if "product_id" not in filters or (
+                    product.product_id in as_list(filters["product_id"])
+                ):
+                    add_to_group(
+                        product.product_id,
+                        product.total_price,
+                        product.quantity,
+                    )
+        else:
+            group_id = (
+                sale.store.city_id if group_by == "city" else sale.store_id
+            )
+            add_to_group(group_id, sale.total_amount, sale.total_quantity)
+
+    return [groups[group_id] for group_id in sorted(groups)]
+
+
+@pytest.mark.parametrize("group_by", ("city", "store", "product"))
+@pytest.mark.parametrize(
+    "filters",
+    (
+        pytest.param({}, id="without filters"),
+        pytest.param({"city_id": 1}, id="city_id"),
+        pytest.param({"store_id": 2}, id="store_id"),
+        pytest.param({"product_id": 1}, id="product_id"),
+        pytest.param({"days": 1}, id="days"),
+        pytest.param({"min_amount": 1000}, id="min_amount"),
+        pytest.param({"max_quantity": 2}, id="max_quantity"),
+        pytest.param(
+            {"city_id": 1, "product_id": 1, "min_quantity": 1},
+            id="combination",
+        ),
+        pytest.param({"store_id": [1, 2]}, id="store_id list"),
+        pytest.param({"product_id": [1, 2]}, id="product_id list"),
+        pytest.param(
+            {"min_amount": 1000, "max_amount": 500},
+            id="mutually exclusive amount",
+        ),
+    ),
+)
+async def test_get_report(session, group_by, filters):
+    report = await SaleRepository.get_report(
+        session=session, group_by=group_by, **filters
+    )
+    sales_python_filtered: list[Sale] = await filter_on_python(
+        session=session, filters=filters
+    )
+
+    assert report == report_on_python(sales_python_filtered, group_by, filters)
+
+
+@pytest.mark.parametrize(
+    ("group_by", "filters", "from_rollup"),
+    (
+        pytest.param("city", {}, True, id="city without filters"),
+        pytest.param("store", {"city_id": 1}, True, id="store by city"),
+        pytest.param("product", {"product_id": 1}, True, id="product"),
+        pytest.param("city", {"product_id": 1}, False, id="city by product"),
+        pytest.param("store", {"days": 1}, False, id="store by days"),
+        pytest.param(
+            "product", {"min_amount": 1}, False, id="product by amount"
+        ),
+    ),
+)
+def test_report_from_rollup(group_by, filters, from_rollup):
+    query = SaleRepository.get_report_query(group_by, **filters)
+    assert ("sale_daily_rollup" in str(query)) == from_rollup
+
+
+def truncate_to_bucket(value: datetime, bucket: str) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if bucket != "hour":
+        value = value.replace(hour=0)
+    if bucket == "week":
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def timeseries_on_python(
+    sales: list[Sale],
+    bucket: str,
+    start: datetime,
+    end: datetime,
+    filters: dict[str, Any],
+) -> list[dict]:
+    step = SaleRepository.timeseries_buckets[bucket]
+    timeseries = {}
+    bucket_start = truncate_to_bucket(start, bucket)
+    while bucket_start < end:
+        timeseries[bucket_start] = {
+            "bucket": bucket_start,
+            "revenue": 0,
+            "quantity": 0,
+            "sales_count": 0,
+        }
+        bucket_start += step
+
+    for sale in sales:
+        if not start <= sale.created_at < end:
+            continue
+        totals = timeseries[truncate_to_bucket(sale.created_at, bucket)]
+        if "product_id" in filters:
+            # only lines of filtered products are summed,
+            # but the sale is counted once
+            products = [
+                product for product in sale.products
+                if product.product_id in as_list(filters["product_id"])
+            ]
+            for product in products:
+                totals["revenue"] += product.total_price
+                totals["quantity"] += product.quantity
+            totals["sales_count"] += bool(products)
+        else:
+            totals["revenue"] += sale.total_amount
+            totals["quantity"] += sale.total_quantity
+            totals["sales_count"] += 1
+
+    return list(timeseries.values())
+
+
+@pytest.mark.parametrize("bucket", ("hour", "day", "week"))
+@pytest.mark.parametrize(
+    "filters",
+    (
+        pytest.param({}, id="without filters"),
+        pytest.param({"city_id": 1}, id="city_id"),
+        pytest.param({"store_id": 2}, id="store_id"),
+        pytest.param({"product_id": 1}, id="product_id"),
+        pytest.param({"city_id": 1, "product_id": 1}, id="combination"),
+        pytest.param({"city_id": [1, 2]}, id="city_id list"),
+        pytest.param({"product_id": [1, 2]}, id="product_id list"),
+    ),
+)
+@pytest.mark.parametrize(
+    "shift",
+    (
+        pytest.param(timedelta(0), id="whole days"),
+        pytest.param(timedelta(minutes=30), id="part of day"),
+    ),
+)
+async def test_get_timeseries(session, bucket, filters, shift):
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    start = today - timedelta(days=8) + shift
+    end = today + timedelta(days=1) + shift
+
+    timeseries = await SaleRepository.get_timeseries(
+        session=session, bucket=bucket, start=start, end=end, **filters
+    )
+    sales_python_filtered: list[Sale] = await filter_on_python(
+        session=session, filters=filters
+    )
+
+    assert timeseries == timeseries_on_python(
+        sales_python_filtered, bucket, start, end, filters
+    )
+
+
+@pytest.mark.parametrize(
+    "bucket", ("hour", "day"), ids=("from sales", "whole days")
+)
+async def test_timeseries_counts_sale_with_several_products_once(
+    session, bucket
+):
+    sale_id = await SaleRepository.create_object(
+        session=session,
+        data=SaleSchemaCreate(
+            store_id=1,
+            products=[
+                SaleProductSchemaCreate(product_id=1, quantity=1),
+                SaleProductSchemaCreate(product_id=2, quantity=1),
+            ],
+        ),
+    )
+    sale = await SaleRepository.get_object(session=session, object_id=sale_id)
+    start = truncate_to_bucket(sale.created_at, "day")
+    end = start + timedelta(days=1)
+    filters = {"product_id": [1, 2]}
+
+    timeseries = await SaleRepository.get_timeseries(
+        session=session, bucket=bucket, start=start, end=end, **filters
+    )
+    sales_python_filtered: list[Sale] = await filter_on_python(
+        session=session, filters=filters
+    )
+
+    assert sale_id in [sale.id for sale in sales_python_filtered]
+    assert timeseries == timeseries_on_python(
+        sales_python_filtered, bucket, start, end, filters
+    )
+
+
+@pytest.mark.parametrize(
+    ("bucket", "start", "end"),
+    (
+        pytest.param(
+            "day",
+            datetime(2024, 1, 2),
+            datetime(2024, 1, 1),
+            id="start after end",
+        ),
+        pytest.param(
+            "day",
+            datetime(2024, 1, 1),
+            datetime(2024, 1, 1),
+            id="empty period",
+        ),
+        pytest.param(
+            "hour",
+            datetime(2000, 1, 1),
+            datetime(2024, 1, 1),
+            id="too many buckets",
+        ),
+        pytest.param(
+            "month",
+            datetime(2024, 1, 1),
+            datetime(2024, 2, 1),
+            id="unknown bucket",
+        ),
+    ),
+)
+def test_timeseries_invalid_params(bucket, start, end):
+    with pytest.raises(HTTPException) as error:
+        SaleRepository.get_timeseries_query(bucket, start, end)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    ("bucket", "start", "filters", "from_rollup"),
+    (
+        pytest.param("day", datetime(2024, 1, 1), {}, True, id="days"),
+        pytest.param(
+            "week", datetime(2024, 1, 1), {"city_id": 1}, True, id="weeks"
+        ),
+        pytest.param("hour", datetime(2024, 1, 1), {}, False, id="hours"),
+        pytest.param(
+            "day", datetime(2024, 1, 1, 12), {}, False, id="part of day"
+        ),
+        pytest.param(
+            "day",
+            datetime(2024, 1, 1),
+            {"product_id": [1, 2]},
+            False,
+            id="several products",
+        ),
+        pytest.param(
+            "day",
+            datetime(2024, 1, 1),
+            {"product_id": [1]},
+            True,
+            id="one product of list",
+        ),
+    ),
+)
+def test_timeseries_from_rollup(bucket, start, filters, from_rollup):
+    query = SaleRepository.get_timeseries_query(
+        bucket, start, datetime(2024, 2, 1), **filters
+    )
+    assert ("sale_daily_rollup" in str(query)) == from_rollup
+
+
+def test_product_filter_semi_join():
+    query, _ = SaleRepository.get_objects_query(product_id=[1, 2])
+    query = str(query)
+    assert "EXISTS" in query
+    assert "JOIN" not in query
+
+
+def test_objects_query_cache():
+    query, params = SaleRepository.get_objects_query(
+        store_id=1, min_amount=10, limit=5
+    )
+    cache_info = SaleRepository.get_query_cache_info()
+
+    same_query, same_params = SaleRepository.get_objects_query(
+        store_id=[2, 3], min_amount=20, limit=10
+    )
+    assert same_query is query
+    assert same_params == {"store_id": [2, 3], "min_amount": 20, "limit": 10}
+    assert params == {"store_id": [1], "min_amount": 10, "limit": 5}
+
+    new_cache_info = SaleRepository.get_query_cache_info()
+    assert new_cache_info["hits"] == cache_info["hits"] + 1
+    assert new_cache_info["misses"] == cache_info["misses"]
+
+    other_query, _ = SaleRepository.get_objects_query(store_id=1)
+    assert other_query is not query
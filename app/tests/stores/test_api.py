@@ -118,3 +118,42 @@ async def test_delete_store(ac: AsyncClient, id, status_code):
     response = await ac.delete(f"/stores/{id}")
     print(response._content)
     assert response.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    ("format", "content", "status_code", "inserted", "rejected_rows"),
+    (
+        pytest.param(
+            "csv",
+            "name,city_id\nимпорт 1,1\nимпорт 2,-1\nимпорт 3,abc\n",
+            200,
+            1,
+            [2, 3],
+            id="csv",
+        ),
+        pytest.param(
+            "ndjson",
+            '{"name": "импорт 1", "city_id": 1}\n\n{"name": "импорт 2"}\n',
+            200,
+            1,
+            [2],
+            id="ndjson",
+        ),
+        pytest.param("csv", "name,city_id\n", 200, 0, [], id="empty file"),
+        pytest.param("csv", b"\xff\xfe", 400, None, None, id="not utf-8"),
+        pytest.param("xml", "", 422, None, None, id="invalid format"),
+    ),
+)
+async def test_import_stores(
+    ac: AsyncClient, format, content, status_code, inserted, rejected_rows
+):
+    response = await ac.post(
+        "/stores/import", params={"format": format}, content=content
+    )
+    assert response.status_code == status_code
+    if status_code == 200:
+        result = response.json()
+        assert result["inserted"] == inserted
+        assert [
+            rejected_row["row"] for rejected_row in result["rejected"]
+        ] == rejected_rows
@@ -1,8 +1,11 @@
+from operator import itemgetter
+
 import pytest
 from fastapi import HTTPException
 
 from app.api.stores.models import Store
 from app.api.stores.repository import StoreRepository
+from app.api.stores.schemas import StoreSchemaCreate
 from app.utils.exceptions import DBIntegrityException
 
 
@@ -133,3 +136,50 @@ async def test_dont_delete_not_existing_object(session):
             object_id=store_id,
         )
         assert isinstance(e, DBIntegrityException)
+
+
+@pytest.mark.parametrize(
+    ("on_conflict", "updated", "skipped", "conflict_rejected", "city_id"),
+    (
+        pytest.param("reject", 0, 0, [2], 1, id="reject"),
+        pytest.param("skip", 0, 1, [], 1, id="skip"),
+        pytest.param("update", 1, 0, [], 2, id="update"),
+    ),
+)
+async def test_import_objects(
+    session, stores, on_conflict, updated, skipped, conflict_rejected, city_id
+):
+    existing_store = stores[0]
+    assert existing_store["city_id"] != 2
+    objects = [
+        (1, StoreSchemaCreate(name="импортированный", city_id=1)),
+        (2, StoreSchemaCreate(name=existing_store["name"], city_id=2)),
+        (4, StoreSchemaCreate(name="импортированный", city_id=2)),
+        (5, StoreSchemaCreate(name="без города", city_id=-1)),
+    ]
+
+    result = await StoreRepository.import_objects(
+        session=session, objects=objects, on_conflict=on_conflict
+    )
+
+    assert result["inserted"] == 1
+    assert result["updated"] == updated
+    assert result["skipped"] == skipped
+    assert sorted(result["rejected"], key=itemgetter("row")) == sorted(
+        [
+            {"row": 4, "error": "name duplicated"},
+            {"row": 5, "error": "city not found"},
+            *(
+                {"row": row, "error": "name exists"}
+                for row in conflict_rejected
+            ),
+        ],
+        key=itemgetter("row"),
+    )
+    imported_stores = {
+        store.name: store.city_id
+        for store in await StoreRepository.get_objects(session=session)
+    }
+    assert imported_stores["импортированный"] == 1
+    assert imported_stores[existing_store["name"]] == city_id
+    assert "без города" not in imported_stores
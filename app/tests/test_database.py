@@ -0,0 +1,219 @@
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Request
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import NullPool, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.database import (
+    COMMITTED_STATE,
+    PGBOUNCER_CONNECT_ARGS,
+    READ_PRIMARY_COOKIE,
+    READ_PRIMARY_HEADER,
+    Database,
+    ReadYourWritesMiddleware,
+)
+
+
+def make_request(
+    cookies: dict[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+    query_string: str = "",
+) -> Request:
+    cookie = "; ".join(
+        f"{key}={value}" for key, value in (cookies or {}).items()
+    )
+    return Request(
+        {
+            "type": "http",
+            "headers": [
+                (b"cookie", cookie.encode()),
+                *(
+                    (key.lower().encode(), value.encode())
+                    for key, value in (headers or {}).items()
+                ),
+            ],
+            "query_string": query_string.encode(),
+        }
+    )
+
+
+@pytest.fixture()
+async def replicated_database():
+    database = Database(
+        settings.TEST_DATABASE_URL,
+        savemode=True,
+        replica_urls=[settings.TEST_DATABASE_URL] * 2,
+        poolclass=NullPool,
+    )
+    yield database
+    for engine in (database.engine, *database.replica_engines):
+        await engine.dispose()
+
+
+async def test_reads_from_replicas_round_robin(replicated_database):
+    engines = [
+        replicated_database.get_read_engine(make_request())
+        for _ in range(4)
+    ]
+    first, second = replicated_database.replica_engines
+    assert engines == [first, second, first, second]
+
+
+async def test_reads_from_primary_after_write(replicated_database):
+    request = make_request()
+    async for session in replicated_database.session_dependency(request):
+        await session.execute(text("SELECT 1"))
+        assert COMMITTED_STATE not in request.scope.get("state", {})
+        await session.commit()
+    assert request.scope["state"][COMMITTED_STATE]
+
+    request = make_request({READ_PRIMARY_COOKIE: "1"})
+    engine = replicated_database.get_read_engine(request)
+    assert engine is replicated_database.engine
+
+
+@pytest.mark.parametrize(
+    ("headers", "query_string"),
+    (
+        pytest.param({READ_PRIMARY_HEADER: "true"}, "", id="header"),
+        pytest.param({}, "read_primary=true", id="query parameter"),
+    ),
+)
+async def test_reads_from_primary_on_request(
+    replicated_database, headers, query_string
+):
+    request = make_request(headers=headers, query_string=query_string)
+    engine = replicated_database.get_read_engine(request)
+    assert engine is replicated_database.engine
+
+
+async def test_read_primary_cookie_is_set_after_commit(replicated_database):
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.post("/{fail}")
+    async def write(
+        fail: bool,
+        session: AsyncSession = Depends(
+            replicated_database.session_dependency
+        ),
+    ) -> None:
+        await session.execute(text("SELECT 1"))
+        await session.commit()
+        if fail:
+            raise HTTPException(status_code=409)
+
+    @app.post("/")
+    async def not_write(
+        session: AsyncSession = Depends(
+            replicated_database.session_dependency
+        ),
+    ) -> None:
+        pass
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        for fail, status_code in ((False, 200), (True, 409)):
+            response = await ac.post(f"/{str(fail).lower()}")
+            assert response.status_code == status_code
+            assert READ_PRIMARY_COOKIE in response.headers["set-cookie"]
+            assert (
+                f"Max-Age={settings.READ_YOUR_WRITES_SECONDS}"
+                in response.headers["set-cookie"]
+            )
+            ac.cookies.clear()
+
+        response = await ac.post("/")
+        assert "set-cookie" not in response.headers
+
+
+async def test_read_session_of_replica(replicated_database):
+    request = make_request()
+    async for session in replicated_database.read_session_dependency(
+        request
+    ):
+        result = await session.execute(text("SELECT 1"))
+        assert result.scalar_one() == 1
+        assert session.bind.engine in replicated_database.replica_engines
+
+
+async def test_reads_from_primary_without_replicas():
+    database = Database(settings.TEST_DATABASE_URL, poolclass=NullPool)
+    assert database.get_read_engine(make_request()) is database.engine
+
+    request = make_request()
+    async for session in database.session_dependency(request):
+        await session.commit()
+    assert COMMITTED_STATE not in request.scope.get("state", {})
+    await database.engine.dispose()
+
+
+async def test_session_checks_out_connection_on_first_use():
+    database = Database(settings.TEST_DATABASE_URL)
+    pool = database.engine.pool
+    commits = []
+    event.listen(
+        database.engine.sync_engine,
+        "commit",
+        lambda connection: commits.append(connection),
+    )
+
+    async for session in database.session_dependency(make_request()):
+        assert pool.checkedout() == 0
+        await session.execute(text("SELECT 1"))
+        assert pool.checkedout() == 1
+
+        # connection is returned to the pool on commit
+        await session.commit()
+        assert pool.checkedout() == 0
+        await session.execute(text("SELECT 1"))
+        assert pool.checkedout() == 1
+
+    # transaction, which is not committed, is committed on exit
+    assert pool.checkedout() == 0
+    assert len(commits) == 2
+    await database.engine.dispose()
+
+
+async def test_session_without_queries_doesnt_check_out_connection():
+    database = Database(settings.TEST_DATABASE_URL)
+    checkouts = []
+    event.listen(
+        database.engine.sync_engine,
+        "checkout",
+        lambda *args: checkouts.append(args),
+    )
+
+    async for _ in database.read_session_dependency(make_request()):
+        pass
+    assert checkouts == []
+    await database.engine.dispose()
+
+
+async def test_pgbouncer_prepared_statements_are_not_reused():
+    database = Database(
+        settings.TEST_DATABASE_URL,
+        poolclass=NullPool,
+        connect_args=PGBOUNCER_CONNECT_ARGS,
+    )
+    names = []
+    async with database.engine.connect() as connection:
+        for _ in range(3):
+            result = await connection.execute(
+                text("SELECT name FROM pg_prepared_statements")
+            )
+            names.extend(result.scalars())
+    assert len(set(names)) == 3
+    await database.engine.dispose()
+
+
+async def test_listen_url():
+    database = Database(settings.TEST_DATABASE_URL, poolclass=NullPool)
+    assert database.listen_url == database.engine.url
+
+    url = "postgresql+asyncpg://user:password@db:5432/sales"
+    database = Database(
+        settings.TEST_DATABASE_URL, poolclass=NullPool, listen_url=url
+    )
+    assert database.listen_url.host == "db"
@@ -0,0 +1,72 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.db.pool import InstrumentedQueuePool
+
+
+@pytest.fixture()
+async def engine():
+    engine = create_async_engine(
+        settings.TEST_DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+    )
+    yield engine
+    await engine.dispose()
+
+
+async def test_pool_metrics(engine):
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+        async with engine.connect() as other_connection:
+            await other_connection.execute(text("SELECT 1"))
+            status = engine.pool.get_status()
+            assert status["checked_out"] == 2
+            assert status["overflow"] == 1
+
+            with pytest.raises(TimeoutError):
+                async with engine.connect() as third_connection:
+                    await third_connection.execute(text("SELECT 1"))
+
+    status = engine.pool.get_status()
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 2
+    assert status["max_checked_out"] == 2
+    assert status["timeouts"] == 1
+    assert status["max_wait_seconds"] >= 0.1
+    assert status["overflow_checkouts"] == 1
+    assert status["max_overflow"] == 1
+    assert status["connects"] == 2
+    # connection over size of the pool is closed on checkin
+    assert status["disconnects"] == 1
+
+
+async def test_pool_metrics_are_kept_on_dispose(engine):
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    await engine.dispose()
+
+    status = engine.pool.get_status()
+    assert status["checkouts"] == 1
+    assert status["connects"] == 1
+    assert status["disconnects"] == 1
+
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    assert engine.pool.get_status()["connects"] == 2
+
+
+async def test_get_pool(ac: AsyncClient):
+    await ac.get("/products/1")
+    response = await ac.get("/internal/pool")
+    assert response.status_code == 200
+
+    status = response.json()
+    assert status["primary"]["checkouts"] > 0
+    assert status["replicas"] == []
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from app.db.database import database
+
+
+@contextmanager
+def count_statements():
+    """Count statements executed by the database engine."""
+    statements = []
+
+    def before_cursor_execute(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = database.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.parametrize(
+    ("method", "url", "request_data", "status_code", "statements_count"),
+    (
+        pytest.param(
+            "POST", "/cities", {"name": "new city"}, 200, 1,
+            id="create city",
+        ),
+        pytest.param(
+            "PATCH", "/cities/1", {"name": "new city"}, 200, 1,
+            id="update city",
+        ),
+        pytest.param("DELETE", "/cities/1", None, 200, 1, id="delete city"),
+        pytest.param(
+            "POST", "/stores", {"name": "new store", "city_id": 1}, 200, 1,
+            id="create store",
+        ),
+        pytest.param(
+            "PATCH", "/stores/1", {"name": "new store"}, 200, 1,
+            id="update store",
+        ),
+        pytest.param("DELETE", "/stores/1", None, 200, 1, id="delete store"),
+        pytest.param(
+            "POST", "/products", {"name": "new product", "price": 1}, 200, 1,
+            id="create product",
+        ),
+        pytest.param(
+            "PATCH", "/products/1", {"price": 2}, 200, 1,
+            id="update product",
+        ),
+        # product and its sales are locked, then sales lines of product
+        # are subtracted from sales before delete
+        pytest.param(
+            "DELETE", "/products/1", None, 200, 4, id="delete product",
+        ),
+        pytest.param(
+            "PATCH", "/cities/-1", {"name": "new city"}, 404, 1,
+            id="update not existing",
+        ),
+        pytest.param(
+            "DELETE", "/cities/-1", None, 404, 1, id="delete not existing",
+        ),
+        pytest.param(
+            "POST", "/stores", {"name": "new store", "city_id": -1}, 409, 1,
+            id="create with invalid foreign key",
+        ),
+    ),
+)
+async def test_write_statements_count(
+    ac: AsyncClient, method, url, request_data, status_code, statements_count
+):
+    with count_statements() as statements:
+        response = await ac.request(method, url, json=request_data)
+
+    assert response.status_code == status_code
+    assert len(statements) == statements_count
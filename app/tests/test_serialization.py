@@ -0,0 +1,84 @@
+import pytest
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.api.products.repository import ProductRepository
+from app.api.products.schemas import ProductSchema
+from app.api.sales.repository import SaleRepository
+from app.api.sales.schemas import (
+    SaleReportSchema,
+    SaleSchemaSparse,
+    SaleTimeseriesSchema,
+)
+from app.utils.serialization import serialize, serialized_response
+from app.utils.shemas import PageSchema
+
+
+def validate_and_serialize(type_, content, exclude_unset=False) -> bytes:
+    """Serialize content as FastAPI does with response model."""
+    adapter = TypeAdapter(type_)
+    value = adapter.validate_python(content, from_attributes=True)
+    return adapter.dump_json(value, exclude_unset=exclude_unset)
+
+
+@pytest.mark.parametrize(
+    "fields",
+    (
+        pytest.param(None, id="sales"),
+        pytest.param(["total_amount", "total_quantity"], id="sales fields"),
+    ),
+)
+async def test_serialize_sales(session, fields):
+    type_ = PageSchema[SaleSchemaSparse]
+    page = await SaleRepository.get_page(
+        session=session, limit=10, fields=fields
+    )
+    assert serialize(type_, page, exclude_unset=True) == (
+        validate_and_serialize(type_, page, exclude_unset=True)
+    )
+
+
+async def test_serialize_products(session):
+    type_ = PageSchema[ProductSchema]
+    page = await ProductRepository.get_page(session=session, limit=10)
+    assert serialize(type_, page) == validate_and_serialize(type_, page)
+
+
+async def test_serialize_rows(session):
+    report = await SaleRepository.get_report(
+        session=session, group_by="store"
+    )
+    assert serialize(list[SaleReportSchema], report) == (
+        validate_and_serialize(list[SaleReportSchema], report)
+    )
+
+    timeseries = [
+        {
+            "bucket": "2024-01-01T00:00:00Z",
+            "revenue": "1.10",
+            "quantity": 1,
+            "sales_count": 1,
+        }
+    ]
+    value = TypeAdapter(list[SaleTimeseriesSchema]).validate_python(
+        timeseries
+    )
+    assert serialize(list[SaleTimeseriesSchema], value) == (
+        validate_and_serialize(list[SaleTimeseriesSchema], value)
+    )
+
+
+async def test_serialized_response_keeps_headers():
+    @serialized_response()
+    async def endpoint(response: Response) -> list[int]:
+        response.headers["X-Total-Count"] = "2"
+        return [1, 2]
+
+    response = Response()
+    response.status_code = None
+    serialized = await endpoint(response=response)
+
+    assert serialized.status_code == 200
+    assert serialized.body == b"[1,2]"
+    assert serialized.headers["X-Total-Count"] == "2"
+    assert serialized.media_type == "application/json"
@@ -0,0 +1,176 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.products.models import Product
+from app.api.products.repository import ProductRepository
+from app.api.products.schemas import ProductSchemaCreate
+from app.api.sales.repository import SaleRepository
+from app.api.sales.schemas import SaleProductSchemaCreate, SaleSchemaCreate
+from app.db.database import database
+from app.db.versions import VERSIONS_CHANNEL, table_versions
+
+
+@pytest.fixture()
+async def listening_versions():
+    """Make versions of tables known, so snapshots are used."""
+    listening = table_versions.listening
+    if not listening:
+        await table_versions.listen(database.engine)
+    yield
+    if not listening:
+        await table_versions.close()
+
+
+async def test_get_cached_objects(session, listening_versions):
+    products: list[Product] = await ProductRepository.get_objects(
+        session=session
+    )
+    cached_products = await ProductRepository.get_objects(
+        session=session, cached=True
+    )
+    assert [product.to_dict() for product in cached_products] == [
+        product.to_dict() for product in products
+    ]
+
+    page = await ProductRepository.get_objects(
+        session=session, limit=2, after=products[0].id, cached=True
+    )
+    assert [product.id for product in page] == [
+        product.id for product in products[1:3]
+    ]
+
+
+async def test_get_cached_object(session, listening_versions):
+    product: Product = await ProductRepository.get_object(
+        session=session, object_id=1, cached=True
+    )
+    assert product.to_dict() == (
+        await ProductRepository.get_object(session=session, object_id=1)
+    ).to_dict()
+
+    with pytest.raises(HTTPException):
+        await ProductRepository.get_object(
+            session=session, object_id=-1, cached=True
+        )
+
+    products = await ProductRepository.get_products_by_ids(
+        session=session, ids=[2, -1, 1], cached=True
+    )
+    assert [product.id for product in products] == [2, 1]
+
+
+@pytest.fixture()
+def new_product_version(listening_versions, monkeypatch):
+    """
+    Notify about new version of products, which is not in the database.
+    Versions are restored after the test.
+    """
+    monkeypatch.setattr(
+        table_versions, "versions", dict(table_versions.versions)
+    )
+
+    def notify() -> int:
+        version = table_versions.get_version(Product.__tablename__) + 1
+        table_versions.on_notification(
+            None, None, VERSIONS_CHANNEL, f"{Product.__tablename__}:{version}"
+        )
+        return version
+
+    return notify
+
+
+async def test_snapshot_is_reloaded_on_new_version(
+    session, new_product_version
+):
+    objects = await ProductRepository.get_snapshot_objects(session=session)
+    assert (
+        await ProductRepository.get_snapshot_objects(session=session)
+        is objects
+    )
+
+    version = new_product_version()
+    new_objects = await ProductRepository.get_snapshot_objects(
+        session=session
+    )
+    assert new_objects is not objects
+    assert ProductRepository.snapshot.version == version
+
+
+async def test_snapshot_is_not_loaded_in_transaction(
+    session, new_product_version
+):
+    await ProductRepository.get_snapshot_objects(session=session)
+    version = new_product_version()
+
+    # session holds a connection, so objects are read by the session
+    await ProductRepository.get_object(session=session, object_id=1)
+    assert session.in_transaction()
+    assert await ProductRepository.get_snapshot_objects(
+        session=session
+    ) is None
+    assert ProductRepository.snapshot.version != version
+
+    products = await ProductRepository.get_products_by_ids(
+        session=session, ids=[1], cached=True
+    )
+    assert [product.id for product in products] == [1]
+
+
+async def test_snapshot_is_loaded_once_concurrently(
+    session, new_product_version
+):
+    version = new_product_version()
+
+    # while other request loads the snapshot, objects are read
+    # by the session without waiting for loading
+    async with ProductRepository.snapshot.loading:
+        assert await ProductRepository.get_snapshot_objects(
+            session=session
+        ) is None
+
+    objects = await ProductRepository.get_snapshot_objects(session=session)
+    assert objects is ProductRepository.snapshot.objects
+    assert ProductRepository.snapshot.version == version
+
+
+async def test_snapshot_is_not_used_without_versions(session, monkeypatch):
+    monkeypatch.setattr(table_versions, "connection", None)
+    assert await ProductRepository.get_snapshot_objects(
+        session=session
+    ) is None
+
+
+async def test_created_objects_are_found_without_snapshot(
+    session, listening_versions
+):
+    await ProductRepository.get_snapshot_objects(session=session)
+    # product is not committed, so the snapshot doesn't have it
+    product_id = await ProductRepository.create_object(
+        session=session,
+        data=ProductSchemaCreate(name="новый товар", price=3),
+    )
+    assert product_id not in ProductRepository.snapshot.objects
+
+    product = await ProductRepository.get_object(
+        session=session, object_id=product_id, cached=True
+    )
+    assert product.id == product_id
+    products = await ProductRepository.get_products_by_ids(
+        session=session, ids=[1, product_id], cached=True
+    )
+    assert [product.id for product in products] == [1, product_id]
+    assert await ProductRepository.get_existing_ids(
+        session=session, ids=[product_id, -1], cached=True
+    ) == {product_id}
+
+    sale_id = await SaleRepository.create_object(
+        session=session,
+        data=SaleSchemaCreate(
+            store_id=1,
+            products=[
+                SaleProductSchemaCreate(product_id=product_id, quantity=2)
+            ],
+        ),
+    )
+    sale = await SaleRepository.get_object(session=session, object_id=sale_id)
+    assert sale.total_amount == 6
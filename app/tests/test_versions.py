@@ -0,0 +1,159 @@
+import asyncio
+
+import asyncpg
+import pytest
+from sqlalchemy import select, text
+
+from app.api.cities.repository import CityRepository
+from app.api.cities.schemas import CitySchemaCreate
+from app.db import versions as versions_module
+from app.db.database import database
+from app.db.versions import TableVersion, TableVersions, table_versions
+
+
+async def wait_version(
+    versions: TableVersions, table: str, version: int | None
+) -> None:
+    for _ in range(100):
+        if versions.get_version(table) == version:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_versions_are_notified():
+    versions = TableVersions()
+    assert versions.get_version("city") is None
+
+    await versions.listen(database.engine)
+    version = versions.get_version("city")
+
+    async with database.engine.connect() as connection:
+        await connection.execute(
+            TableVersions.get_bump_query(("city", "store"))
+        )
+        await connection.commit()
+
+    await wait_version(versions, "city", version + 1)
+    assert versions.get_version("city") == version + 1
+
+    # versions are loaded on start of listening
+    other_versions = TableVersions()
+    await other_versions.listen(database.engine)
+    assert other_versions.versions == versions.versions
+
+    await other_versions.close()
+    await versions.close()
+    assert versions.get_version("city") is None
+
+
+async def test_versions_are_not_notified_on_rollback():
+    versions = TableVersions()
+    await versions.listen(database.engine)
+    version = versions.get_version("store")
+
+    async with database.engine.connect() as connection:
+        await connection.execute(TableVersions.get_bump_query(("store",)))
+        await connection.rollback()
+        # notifications are delivered in order, so the last one
+        # shows that previous notifications were delivered too
+        await connection.execute(
+            text("SELECT pg_notify('table_version', 'sale:1')")
+        )
+        await connection.commit()
+
+    await wait_version(versions, "sale", 1)
+    assert versions.get_version("store") == version
+    await versions.close()
+
+
+async def wait_listening(versions: TableVersions) -> None:
+    for _ in range(100):
+        if versions.listening:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_versions_are_loaded_after_reconnection(monkeypatch):
+    monkeypatch.setattr(versions_module, "RECONNECT_DELAY_SECONDS", 0.01)
+    versions = TableVersions()
+    await versions.listen(database.engine)
+    version = versions.get_version("city")
+
+    async with database.engine.connect() as connection:
+        connect = asyncpg.connect
+        attempts = []
+
+        async def connect_after_failure(*args, **kwargs):
+            # the first reconnection attempt fails
+            attempts.append(args)
+            if len(attempts) == 1:
+                raise ConnectionRefusedError
+            return await connect(*args, **kwargs)
+
+        monkeypatch.setattr(asyncpg, "connect", connect_after_failure)
+
+        await connection.execute(
+            text("SELECT pg_terminate_backend(:pid)"),
+            {"pid": versions.connection.get_server_pid()},
+        )
+        await wait_version(versions, "city", None)
+        assert versions.get_version("city") is None
+
+        # change is made, while notifications are not listened
+        await connection.execute(TableVersions.get_bump_query(("city",)))
+        await connection.commit()
+
+    await wait_listening(versions)
+    assert len(attempts) == 2
+    assert versions.get_version("city") == version + 1
+    await versions.close()
+
+
+async def test_close_stops_reconnection(monkeypatch):
+    monkeypatch.setattr(versions_module, "RECONNECT_DELAY_SECONDS", 60)
+    versions = TableVersions()
+    await versions.listen(database.engine)
+
+    versions.connection.terminate()
+    await asyncio.sleep(0.01)
+    reconnection = versions.reconnection
+    assert reconnection is not None
+
+    await versions.close()
+    assert reconnection.cancelled()
+    assert not versions.listening
+
+
+@pytest.fixture()
+def known_versions(monkeypatch) -> dict[str, int]:
+    """
+    Versions of tables, which are known without notifications,
+    so only versions set by the process itself are there.
+    """
+    versions = {}
+    monkeypatch.setattr(table_versions, "connection", object())
+    monkeypatch.setattr(table_versions, "versions", versions)
+    return versions
+
+
+async def test_committed_versions_are_set(known_versions):
+    async with database.async_session_maker() as session:
+        city_id = await CityRepository.create_object(
+            session=session, data=CitySchemaCreate(name="версия города")
+        )
+        version = await session.scalar(
+            select(TableVersion.version).filter_by(name="city")
+        )
+        assert known_versions == {"city": version}
+
+        await CityRepository.delete_object(session=session, object_id=city_id)
+        assert known_versions["city"] == version + 1
+
+
+async def test_versions_of_rolled_back_session_are_not_set(
+    session, known_versions
+):
+    await CityRepository.create_object(
+        session=session, data=CitySchemaCreate(name="версия города")
+    )
+    assert known_versions == {}
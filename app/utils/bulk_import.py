@@ -0,0 +1,106 @@
+"""Module defines helpers for bulk import of pydantic schemas from files."""
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Iterator
+from operator import itemgetter
+from tempfile import TemporaryFile
+from typing import Any, BinaryIO, Literal, TextIO
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.utils.exceptions import InvalidFileException
+
+
+IMPORT_FORMAT = Literal["ndjson", "csv"]
+# what is done with objects, which names exist in the table:
+# reported as rejected rows, not imported or updated
+IMPORT_ON_CONFLICT = Literal["reject", "skip", "update"]
+
+
+async def spool_chunks(chunks: AsyncIterator[bytes]) -> TextIO:
+    """
+    Write chunks of bytes to a temporary file and return it as text file.
+    File is kept in memory, until it exceeds IMPORT_MEMORY_MAX_SIZE.
+    """
+    # SpooledTemporaryFile can't be wrapped by TextIOWrapper before 3.11
+    file: BinaryIO = io.BytesIO()
+    async for chunk in chunks:
+        if (
+            isinstance(file, io.BytesIO)
+            and file.tell() + len(chunk) > settings.IMPORT_MEMORY_MAX_SIZE
+        ):
+            memory_file, file = file, TemporaryFile()
+            file.write(memory_file.getbuffer())
+        file.write(chunk)
+    file.seek(0)
+    return io.TextIOWrapper(file, encoding="utf-8", newline="")
+
+
+def get_error(exception: ValidationError) -> str:
+    """Return errors of validation as one line, prefixed by fields."""
+    errors = []
+    for error in exception.errors():
+        field = ".".join(map(str, error["loc"]))
+        errors.append(f"{field}: {error['msg']}" if field else error["msg"])
+    return "; ".join(errors)
+
+
+def read_objects(
+    file: TextIO,
+    format: IMPORT_FORMAT,
+    schema: type[BaseModel],
+    rejected: list[dict[str, Any]],
+) -> Iterator[tuple[int, BaseModel]]:
+    """
+    Parse rows of the file in the given format and validate them by schema.
+    Rows are numbered from 1, not counting header of csv and empty lines
+    of ndjson. Invalid rows are added to rejected with theirs errors.
+    """
+    try:
+        if format == "csv":
+            rows = csv.DictReader(file)
+        else:
+            rows = (line for line in file if line.strip())
+
+        for row_number, row in enumerate(rows, start=1):
+            try:
+                if format == "csv":
+                    yield row_number, schema.model_validate(row)
+                else:
+                    yield row_number, schema.model_validate_json(row)
+            except ValidationError as exception:
+                rejected.append({
+                    "row": row_number, "error": get_error(exception)
+                })
+    except (UnicodeDecodeError, csv.Error):
+        raise InvalidFileException
+
+
+async def import_file(
+    *,
+    session: AsyncSession,
+    repository: Any,
+    file: TextIO,
+    format: IMPORT_FORMAT,
+    schema: type[BaseModel],
+    on_conflict: IMPORT_ON_CONFLICT = "reject",
+) -> dict[str, Any]:
+    """
+    Import objects of the file by the repository.
+    Return counts of inserted, updated and skipped objects
+    and rejected rows.
+    """
+    rejected = []
+    result = await repository.import_objects(
+        session=session,
+        objects=read_objects(file, format, schema, rejected),
+        on_conflict=on_conflict,
+    )
+    result["rejected"] = sorted(
+        rejected + result["rejected"], key=itemgetter("row")
+    )
+    return result
@@ -0,0 +1,45 @@
+"""Module defines conditional responses by ETag of tables versions."""
+
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import HTTPException, Request, Response
+
+from app.db.versions import table_versions
+
+
+def get_etag(tables: tuple[str, ...]) -> str | None:
+    """Return ETag of current versions of tables, if they are known."""
+    versions = []
+    for table in tables:
+        version = table_versions.get_version(table)
+        if version is None:
+            return None
+        versions.append(f"{table}.{version}")
+    return '"' + "-".join(versions) + '"'
+
+
+def etag_dependency(
+    *tables: str,
+) -> Callable[[Request, Response], Coroutine[Any, Any, None]]:
+    """
+    Return dependency, which responds 304 Not Modified, if ETag of tables
+    matches If-None-Match header, and sets ETag header otherwise.
+    Session of the request checks out a connection on first use,
+    so not modified response doesn't touch the database.
+    """
+    async def check_etag(request: Request, response: Response) -> None:
+        etag = get_etag(tables)
+        if etag is None:
+            return
+
+        # If-None-Match uses weak comparison, so W/ prefix is ignored
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        )
+        if etag in tags:
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    return check_etag
@@ -16,6 +16,11 @@ InvalidParameterException = HTTPException(
     detail="invalid request parameter",
 )
 
+InvalidFileException = HTTPException(
+    status_code=400,
+    detail="invalid file",
+)
+
 
 def get_http_exceptions_description(
     *http_exceptions: HTTPException,
@@ -0,0 +1,46 @@
+"""Module defines helpers for streaming export of pydantic schemas."""
+
+import csv
+import io
+from collections.abc import AsyncIterator, Sequence
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+EXPORT_FORMAT = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def export_chunks(
+    chunks: AsyncIterator[Sequence[BaseModel]],
+    format: EXPORT_FORMAT,
+    csv_fields: Sequence[str],
+) -> AsyncIterator[str]:
+    """
+    Convert chunks of schemas to chunks of text in the given format.
+    Only csv_fields are exported in csv, because it can't contain nested data.
+    """
+    if format == "ndjson":
+        async for chunk in chunks:
+            yield "".join(schema.model_dump_json() + "\n" for schema in chunk)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(csv_fields)
+    async for chunk in chunks:
+        for schema in chunk:
+            data = schema.model_dump(mode="json", include=set(csv_fields))
+            writer.writerow(data[field] for field in csv_fields)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # header must be sent even if there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
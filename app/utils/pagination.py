@@ -0,0 +1,26 @@
+"""Module defines helpers for keyset (cursor) pagination."""
+
+import base64
+from typing import Annotated
+
+from fastapi import Query
+
+from app.config import settings
+from app.utils.exceptions import InvalidParameterException
+
+
+PAGINATION_LIMIT = Annotated[
+    int,
+    Query(ge=1, le=settings.PAGINATION_MAX_LIMIT),
+]
+
+
+def encode_cursor(object_id: int) -> str:
+    return base64.urlsafe_b64encode(str(object_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise InvalidParameterException
@@ -1,33 +1,162 @@
 """Module defines repository class with base CRUD operations."""
 
+from itertools import islice
+from collections.abc import Iterable, Sequence
 from typing import Any
 
-from sqlalchemy import select
+from sqlalchemy import (
+    JSON,
+    Column,
+    Delete,
+    Insert,
+    Integer,
+    MetaData,
+    Select,
+    Table,
+    Update,
+    any_,
+    delete,
+    exists,
+    func,
+    literal,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.engine import Result
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.expression import ClauseElement, ColumnElement, Executable
 
 from pydantic import BaseModel
 
-from app.db.abstract_models import Base
+from app.db.abstract_models import Base, UniqueNamed
+from app.db.database import database
+from app.db.snapshots import TableSnapshot
+from app.db.versions import TableVersions, table_versions
+from app.utils.bulk_import import IMPORT_ON_CONFLICT
 from app.utils.exceptions import DBIntegrityException, NotFoundException
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def any_of(ids: int | list[int] | ColumnElement):
+    """
+    Return ANY(array) of one or several ids, to compare column with.
+    ids can be a bind parameter of array.
+    """
+    if isinstance(ids, ColumnElement):
+        return any_(ids)
+    if not isinstance(ids, list):
+        ids = [ids]
+    return any_(literal(ids, ARRAY(Integer)))
+
+
+def select_rows(
+    table: Table, columns: Sequence[str], rows: list[dict[str, Any]]
+) -> Select:
+    """
+    Return select of rows, which have values of columns of the table.
+    Rows are passed as one array per column, so the query doesn't
+    depend on count of rows, and is compiled and prepared once.
+    """
+    values = func.unnest(*(
+        literal(
+            [row[column] for row in rows],
+            ARRAY(table.c[column].type),
+        )
+        for column in columns
+    )).table_valued(*columns).render_derived()
+    return select(*values.c)
+
+
+# returned by INSERT ... ON CONFLICT DO UPDATE, tells inserted rows
+# from updated ones: xmax of updated row is id of the transaction
+inserted_column = (literal_column("xmax") == 0).label("inserted")
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) of the query.
+    Parameters of the query are passed on execution, as for the query itself.
+    """
+
+    # compiled EXPLAIN can't be cached, because its result columns
+    # are not the columns of the query
+    inherit_cache = False
+
+    def __init__(self, query: ClauseElement):
+        self.query = query
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.query, **kwargs)
 
 
 class BaseRepository:
     model: Base
+    # if versioned, writes increase version of the table,
+    # and of cascade_tables on delete
+    versioned: bool = False
+    cascade_tables: tuple[str, ...] = ()
+    # process-local copy of versioned table,
+    # objects are read from it if cached is passed
+    snapshot: TableSnapshot | None = None
 
     @classmethod
     async def get_objects(
-        cls, *, session: AsyncSession, options: Any = None
+        cls,
+        *,
+        session: AsyncSession,
+        options: Any = None,
+        limit: int | None = None,
+        after: int | None = None,
+        cached: bool = False,
     ) -> list[Base]:
+        if cached and options is None:
+            snapshot_objects = await cls.get_snapshot_objects(session=session)
+            if snapshot_objects is not None:
+                model_objects = (
+                    model_object
+                    for object_id, model_object in snapshot_objects.items()
+                    if after is None or object_id > after
+                )
+                return list(islice(model_objects, limit))
 
         query = select(cls.model).order_by(cls.model.id)
         query = cls.apply_options_to_query(query, options)
+        query = cls.apply_pagination_to_query(query, limit, after)
 
         result: Result = await session.execute(query)
         model_objects = result.scalars().all()
         return list(model_objects)
 
+    @classmethod
+    async def get_page(
+        cls,
+        *,
+        session: AsyncSession,
+        limit: int,
+        after: str | None = None,
+        **kwargs,
+    ) -> dict[str, Any]:
+        after_id = decode_cursor(after) if after is not None else None
+
+        # select one extra object to know if there is a next page
+        model_objects = await cls.get_objects(
+            session=session, limit=limit + 1, after=after_id, **kwargs
+        )
+
+        next_cursor = None
+        if len(model_objects) > limit:
+            model_objects = model_objects[:limit]
+            next_cursor = encode_cursor(model_objects[-1].id)
+
+        return {"items": model_objects, "next_cursor": next_cursor}
+
     @classmethod
     async def get_object(
         cls,
@@ -35,7 +164,16 @@ class BaseRepository:
         session: AsyncSession,
         object_id: int,
         options: Any = None,
+        cached: bool = False,
     ) -> Base:
+        if cached and options is None:
+            snapshot_objects = await cls.get_snapshot_objects(session=session)
+            if snapshot_objects is not None:
+                model_object = snapshot_objects.get(object_id)
+                # object can be created after the snapshot was loaded,
+                # so missing one is selected from the database
+                if model_object is not None:
+                    return model_object
 
         query = select(cls.model).filter_by(id=object_id)
         query = cls.apply_options_to_query(query, options)
@@ -48,15 +186,46 @@ class BaseRepository:
 
         return model_object
 
+    @classmethod
+    async def get_existing_ids(
+        cls, *, session: AsyncSession, ids: list[int], cached: bool = False
+    ) -> set[int]:
+        """Return those of ids, which objects exist."""
+        existing_ids = set()
+        if cached:
+            snapshot_objects = await cls.get_snapshot_objects(session=session)
+            if snapshot_objects is not None:
+                existing_ids = snapshot_objects.keys() & set(ids)
+                # objects can be created after the snapshot was loaded,
+                # so missing ones are selected from the database
+                ids = [
+                    object_id for object_id in ids
+                    if object_id not in existing_ids
+                ]
+                if not ids:
+                    return existing_ids
+
+        result: Result = await session.execute(
+            select(cls.model.id).filter(cls.model.id == any_of(ids))
+        )
+        return existing_ids | set(result.scalars().all())
+
+    @classmethod
+    async def get_snapshot_objects(
+        cls, *, session: AsyncSession
+    ) -> dict[int, Base] | None:
+        """Return objects of the snapshot by ids, if it can be used."""
+        if cls.snapshot is None:
+            return None
+        return await cls.snapshot.get_objects(database.engine, session)
+
     @classmethod
     async def create_object(
         cls, *, session: AsyncSession, data: BaseModel
     ) -> int:
-        model_object = cls.model(**data.model_dump())
-        session.add(model_object)
-
-        model_object = await cls.refresh_object(
-            session=session, model_object=model_object
+        model_object = await cls.write_object(
+            session=session,
+            query=insert(cls.model).values(**data.model_dump()),
         )
         return model_object.id
 
@@ -64,28 +233,115 @@ class BaseRepository:
     async def update_partial_object(
         cls, *, session: AsyncSession, object_id: int, data: BaseModel
     ) -> Base:
-        model_object = await cls.get_object(
-            session=session, object_id=object_id
-        )
-        for key, value in data.model_dump(exclude_unset=True).items():
-            setattr(model_object, key, value)
+        values = data.model_dump(exclude_unset=True)
+        if not values:
+            return await cls.get_object(session=session, object_id=object_id)
 
-        return await cls.refresh_object(
+        return await cls.write_object(
             session=session,
-            model_object=model_object
+            query=(
+                update(cls.model)
+                .where(cls.model.id == object_id)
+                .values(**values)
+            ),
         )
 
     @classmethod
     async def delete_object(
         cls, *, session: AsyncSession, object_id: int
     ) -> Base:
-        model_object = await cls.get_object(
-            session=session, object_id=object_id
+        # dependent rows are deleted by ON DELETE CASCADE of foreign keys
+        model_object = await cls.write_object(
+            session=session,
+            query=delete(cls.model).where(cls.model.id == object_id),
+            tables=cls.cascade_tables,
         )
-        await session.delete(model_object)
-        await session.commit()
+        session.expunge(model_object)
         return model_object
 
+    @classmethod
+    async def write_object(
+        cls,
+        *,
+        session: AsyncSession,
+        query: Insert | Update | Delete,
+        tables: tuple[str, ...] = (),
+    ) -> Base:
+        """
+        Execute INSERT, UPDATE or DELETE of one object and commit.
+        The object is returned by the same statement, which increases
+        versions of the table and tables, if versioned,
+        so the write is one round trip to the database.
+        """
+        written = query.returning(*cls.model.__table__.columns).cte("written")
+        select_query = (
+            select(aliased(cls.model, written))
+            # objects of the session are updated by written values
+            .execution_options(populate_existing=True)
+        )
+        if cls.versioned:
+            bumped = TableVersions.get_bump_query(
+                (cls.model.__tablename__, *tables), written=written
+            ).cte("bumped")
+            select_query = select_query.add_columns(
+                select(
+                    func.json_object_agg(
+                        bumped.c.name, bumped.c.version, type_=JSON
+                    )
+                ).scalar_subquery()
+            )
+
+        try:
+            result: Result = await session.execute(select_query)
+        except IntegrityError:
+            await session.rollback()
+            raise DBIntegrityException
+        row = result.one_or_none()
+
+        if row is None:
+            raise NotFoundException
+
+        await session.commit()
+        if cls.versioned:
+            cls.set_committed_versions(session=session, versions=row[1])
+        return row[0]
+
+    @classmethod
+    async def bump_versions(
+        cls, *, session: AsyncSession, tables: tuple[str, ...] = ()
+    ) -> dict[str, int]:
+        """
+        Increase versions of the table and tables, if versioned.
+        Return new versions, which are set by set_committed_versions
+        after commit.
+        """
+        if not cls.versioned:
+            return {}
+        result: Result = await session.execute(
+            TableVersions.get_bump_query((cls.model.__tablename__, *tables))
+        )
+        return {row.name: row.version for row in result}
+
+    @staticmethod
+    def set_committed_versions(
+        *, session: AsyncSession, versions: dict[str, int] | None
+    ) -> None:
+        """
+        Set versions of tables written by the committed session,
+        so the next reads of this process see the write, for example
+        snapshots are loaded again, without waiting for notifications.
+        Session bound to a connection commits into transaction
+        of the connection, which can be rolled back, as in TEST mode,
+        so its versions are not set.
+        """
+        if (
+            versions
+            and table_versions.listening
+            and not isinstance(session.bind, AsyncConnection)
+        ):
+            for table, version in versions.items():
+                table_versions.set_version(table, version)
+
     @classmethod
     async def refresh_object(
         cls, *, session: AsyncSession, model_object: Any
@@ -98,8 +354,158 @@ class BaseRepository:
             await session.rollback()
             raise DBIntegrityException
 
+    @classmethod
+    async def flush_objects(cls, *, session: AsyncSession) -> None:
+        try:
+            await session.flush()
+        except IntegrityError:
+            await session.rollback()
+            raise DBIntegrityException
+
     @staticmethod
     def apply_options_to_query(query, options):
         if options:
             query = query.options(options)
         return query
+
+    @classmethod
+    def apply_pagination_to_query(cls, query, limit, after):
+        if after is not None:
+            query = query.filter(cls.model.id > after)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+
+class UniqueNamedRepository(BaseRepository):
+    """Repository of model with unique name, which can be imported."""
+
+    model: UniqueNamed
+
+    @classmethod
+    async def import_objects(
+        cls,
+        *,
+        session: AsyncSession,
+        objects: Iterable[tuple[int, BaseModel]],
+        on_conflict: IMPORT_ON_CONFLICT = "reject",
+    ) -> dict[str, Any]:
+        """
+        Import numbered objects by COPY to a temporary table
+        and merge them into the table by name. Objects with existing names
+        are rejected, skipped or update existing objects by on_conflict.
+        Of objects with the same name only the first one is imported,
+        objects with missing foreign keys are rejected.
+        Return counts of inserted, updated and skipped objects
+        and rejected rows.
+        """
+        table = cls.model.__table__
+        columns = [
+            column for column in table.columns if not column.primary_key
+        ]
+        staging = Table(
+            f"import_{table.name}",
+            MetaData(),
+            Column("row", Integer, primary_key=True),
+            *(Column(column.name, column.type) for column in columns),
+            prefixes=["TEMPORARY"],
+            postgresql_on_commit="DROP",
+        )
+
+        connection = await session.connection()
+        await connection.run_sync(staging.create, checkfirst=False)
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            staging.name,
+            records=(
+                (row, *(getattr(data, column.name) for column in columns))
+                for row, data in objects
+            ),
+            columns=[column.name for column in staging.columns],
+        )
+
+        rejected = []
+        first = staging.alias("first")
+        result: Result = await session.execute(
+            delete(staging)
+            .where(staging.c.name == first.c.name, staging.c.row > first.c.row)
+            .returning(staging.c.row)
+        )
+        rejected.extend(
+            {"row": row, "error": "name duplicated"}
+            for row in result.scalars()
+        )
+        for foreign_key in table.foreign_keys:
+            result = await session.execute(
+                delete(staging)
+                .where(
+                    ~exists().where(
+                        foreign_key.column
+                        == staging.c[foreign_key.parent.name]
+                    )
+                )
+                .returning(staging.c.row)
+            )
+            error = f"{foreign_key.column.table.name} not found"
+            rejected.extend(
+                {"row": row, "error": error} for row in result.scalars()
+            )
+
+        names = [column.name for column in columns]
+        query = insert(table).from_select(
+            names,
+            select(*(staging.c[name] for name in names))
+            .order_by(staging.c.row),
+        )
+        updated_count = skipped_count = 0
+        if on_conflict == "update":
+            query = query.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={name: query.excluded[name] for name in names},
+            ).returning(inserted_column)
+            result = await session.execute(query)
+            merged = result.scalars().all()
+            inserted_count = sum(merged)
+            updated_count = len(merged) - inserted_count
+        else:
+            # conflicts are found by the insert itself, so objects
+            # inserted concurrently are not overwritten either
+            inserted = (
+                query.on_conflict_do_nothing(index_elements=[table.c.name])
+                .returning(table.c.name)
+                .cte("inserted")
+            )
+            result = await session.execute(
+                select(
+                    staging.c.row,
+                    exists().where(inserted.c.name == staging.c.name),
+                ).order_by(staging.c.row)
+            )
+            conflicted_rows = []
+            inserted_count = 0
+            for row, is_inserted in result:
+                if is_inserted:
+                    inserted_count += 1
+                else:
+                    conflicted_rows.append(row)
+            if on_conflict == "skip":
+                skipped_count = len(conflicted_rows)
+            else:
+                rejected.extend(
+                    {"row": row, "error": "name exists"}
+                    for row in conflicted_rows
+                )
+
+        await connection.run_sync(staging.drop, checkfirst=False)
+        versions = {}
+        if inserted_count or updated_count:
+            versions = await cls.bump_versions(session=session)
+        await session.commit()
+        cls.set_committed_versions(session=session, versions=versions)
+
+        return {
+            "inserted": inserted_count,
+            "updated": updated_count,
+            "skipped": skipped_count,
+            "rejected": rejected,
+        }
@@ -0,0 +1,175 @@
+"""
+Module defines JSON serialization of endpoint results without validation.
+
+FastAPI validates result of endpoint by its return type, converts it
+to JSON compatible data and then encodes it to JSON, so every object read
+from the database is passed three times and validators of schemas run
+for every field. Results of trusted data are serialized by serializers
+built once for every return type instead: attributes of objects are
+read by fields of schemas and encoded by pydantic_core.to_json at once.
+"""
+
+import inspect
+import types
+from collections.abc import Callable
+from functools import lru_cache, wraps
+from typing import Any, Union, get_args, get_origin
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+# name of parameter, which is added to endpoint to receive its response
+# from FastAPI, headers and status code of it are copied to serialized
+# response
+RESPONSE_PARAMETER = "serialized_response"
+
+Serializer = Callable[[Any], Any]
+
+
+def serialize_value(value: Any) -> Any:
+    return value
+
+
+def get_value(data: Any, name: str, default: Any) -> Any:
+    if isinstance(data, dict):
+        return data.get(name, default)
+    return getattr(data, name, default)
+
+
+@lru_cache
+def get_serializer(type_: Any, exclude_unset: bool = False) -> Serializer:
+    """
+    Return function, which converts data of type_ to JSON compatible data
+    as pydantic would do after validation of data from attributes.
+    Data of schemas can be objects, rows or dicts. If exclude_unset,
+    fields, which data doesn't have, are excluded as unset.
+    """
+    origin = get_origin(type_)
+    if origin in (Union, types.UnionType):
+        serializers = [
+            get_serializer(arg, exclude_unset)
+            for arg in get_args(type_)
+            if arg is not type(None)
+        ]
+        # only optional types are supported, not unions of types
+        serializer, = serializers
+
+        def serialize_optional(data: Any) -> Any:
+            return None if data is None else serializer(data)
+
+        return serialize_optional
+
+    if origin is list:
+        item_serializer = get_serializer(get_args(type_)[0], exclude_unset)
+        if item_serializer is serialize_value:
+            return list
+
+        def serialize_list(data: Any) -> list[Any]:
+            return [item_serializer(item) for item in data]
+
+        return serialize_list
+
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        return get_model_serializer(type_, exclude_unset)
+
+    return serialize_value
+
+
+def get_model_serializer(
+    model: type[BaseModel], exclude_unset: bool
+) -> Serializer:
+    missing = object()
+    fields = [
+        (
+            name,
+            get_serializer(field.annotation, exclude_unset),
+            field.is_required(),
+            field.get_default(call_default_factory=True),
+        )
+        for name, field in model.model_fields.items()
+    ]
+
+    def serialize_model(data: Any) -> dict[str, Any]:
+        serialized = {}
+        for name, serializer, required, default in fields:
+            value = get_value(data, name, missing)
+            if value is missing:
+                if required:
+                    raise ValueError(
+                        f"{name} of {model.__name__} is missing"
+                    )
+                if exclude_unset:
+                    continue
+                value = default
+            serialized[name] = serializer(value)
+        return serialized
+
+    return serialize_model
+
+
+def serialize(
+    type_: Any, content: Any, exclude_unset: bool = False
+) -> bytes:
+    return to_json(get_serializer(type_, exclude_unset)(content))
+
+
+class SerializedJSONResponse(Response):
+    media_type = "application/json"
+
+
+def serialized_response(
+    exclude_unset: bool = False,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Return decorator of endpoint, which serializes its result by its return
+    type without validation. Return type is still the response model
+    of the endpoint, so OpenAPI schema is not changed.
+    Must be applied before the route decorator.
+    """
+    def decorator(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(endpoint)
+        type_ = signature.return_annotation
+
+        # FastAPI passes response to one parameter only,
+        # so response parameter of endpoint is used, if it has one
+        response_parameter = next(
+            (
+                parameter.name
+                for parameter in signature.parameters.values()
+                if parameter.annotation is Response
+            ),
+            None,
+        )
+        if response_parameter is None:
+            signature = signature.replace(
+                parameters=[
+                    *signature.parameters.values(),
+                    inspect.Parameter(
+                        RESPONSE_PARAMETER,
+                        inspect.Parameter.KEYWORD_ONLY,
+                        annotation=Response,
+                    ),
+                ]
+            )
+
+        @wraps(endpoint)
+        async def serialized_endpoint(*args: Any, **kwargs: Any) -> Response:
+            if response_parameter is None:
+                response: Response = kwargs.pop(RESPONSE_PARAMETER)
+            else:
+                response = kwargs[response_parameter]
+            content = await endpoint(*args, **kwargs)
+            serialized = SerializedJSONResponse(
+                serialize(type_, content, exclude_unset),
+                status_code=response.status_code or 200,
+            )
+            # headers set by dependencies and endpoint, for example ETag
+            serialized.headers.raw.extend(response.headers.raw)
+            return serialized
+
+        serialized_endpoint.__signature__ = signature
+        return serialized_endpoint
+
+    return decorator
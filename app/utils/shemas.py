@@ -1,7 +1,29 @@
 """Module defines utils pydantic schemas for app."""
 
+from typing import Generic, TypeVar
+
 from pydantic import BaseModel
 
 
+T = TypeVar("T")
+
+
 class CreateResultSchema(BaseModel):
     id: int
+
+
+class PageSchema(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None
+
+
+class RejectedRowSchema(BaseModel):
+    row: int
+    error: str
+
+
+class ImportResultSchema(BaseModel):
+    inserted: int
+    updated: int
+    skipped: int
+    rejected: list[RejectedRowSchema]